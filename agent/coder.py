@@ -1,12 +1,17 @@
 from ..llm.llm import OpenAIClient, AnthropicClient
 from ..state.state import State
-from typing import Union
+from typing import Optional, Union
+from ..llm.context import ContextBudget
 from ..agent.react_agent import ReactAgent
 from ..tools.python_repl import PythonREPLTool
 
 
 class Coder:
-    def __init__(self, llm_client: Union[OpenAIClient, AnthropicClient]):
+    def __init__(
+        self,
+        llm_client: Union[OpenAIClient, AnthropicClient],
+        budget: Optional[ContextBudget] = None,
+    ):
         coder_tools = [PythonREPLTool()]
         coder_config = {"locale": "en-US"}
         self.coder_agent = ReactAgent(
@@ -14,6 +19,7 @@ class Coder:
             llm_client=llm_client,
             tools=coder_tools,
             config=coder_config,
+            budget=budget,
         )
 
     def code(self, query: str, state: State) -> str:
@@ -22,4 +28,11 @@ class Coder:
         state: the state of the workflow
         """
         res = self.coder_agent.run(query, state)
-        return res
\ No newline at end of file
+        return res
+
+    async def acode(self, query: str, state: State) -> str:
+        """
+        async version of `code`
+        """
+        res = await self.coder_agent.arun(query, state)
+        return res
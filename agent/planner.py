@@ -1,8 +1,8 @@
-from typing import List, Union
-from ..llm.llm import OpenAIClient, AnthropicClient
-from ..prompt.planner_model import Plan
+from typing import Dict, List, Optional, Union
+from ..llm.llm import OpenAIClient, AnthropicClient, agenerate
 from ..state.state import State
 from ..prompt.utils import load_prompt
+from ..llm.context import ContextBudget, default_budget
 
 
 class Planner:
@@ -11,12 +11,29 @@ class Planner:
         llm_client: Union[OpenAIClient, AnthropicClient],
         max_step_num: int = 3,
         locale: str = "en-US",
+        budget: Optional[ContextBudget] = None,
     ):
         self.system_prompt = load_prompt(
             "planner", {"max_step_num": max_step_num, "locale": locale}
         )
         self.llm_client = llm_client
+        self.budget = budget or default_budget("planner")
+
+    def _messages(self, query: str, state: State = None) -> List[Dict[str, str]]:
+        """The query followed by the workflow messages, within the token budget."""
+        messages = [{"role": "user", "content": query}] if query else []
+        if state:
+            messages.extend(state.get("messages", []))
+        return self.budget.fit(messages, self.system_prompt)
 
     def plan(self, query: str, state: State = None) -> List[str]:
-        response = self.llm_client.generate(query, self.system_prompt, state)
-        return Plan.model_validate_json(response)
\ No newline at end of file
+        from ..prompt.planner_model import Plan
+
+        response = self.llm_client.generate(self._messages(query, state), self.system_prompt)
+        return Plan.model_validate_json(response)
+
+    async def aplan(self, query: str, state: State = None) -> List[str]:
+        from ..prompt.planner_model import Plan
+
+        response = await agenerate(self.llm_client, self._messages(query, state), self.system_prompt)
+        return Plan.model_validate_json(response)
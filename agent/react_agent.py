@@ -1,15 +1,24 @@
+import asyncio
 import json
-from typing import Dict, List, Any, Optional, Union
+from contextlib import closing
+from typing import Dict, List, Any, Optional, Tuple, Union
 from dataclasses import dataclass, field
-from ..tools import Tool
+from ..tools.tools import Tool, tool_context
+from ..llm.llm import generate_stream, agenerate_stream
+from ..llm.context import ContextBudget, default_budget
 from ..prompt.utils import load_prompt
 from ..state.state import State
+from .. import tracing
+from ..llm.ledger import attribute
 
 
 @dataclass
 class AgentState:
 
     messages: List[Dict[str, str]] = field(default_factory=list)
+    # append-only chat transcript sent to the LLM: the task turn, then one assistant
+    # turn and one observation turn per iteration
+    transcript: List[Dict[str, str]] = field(default_factory=list)
     intermediate_steps: List[Dict[str, str]] = field(default_factory=list)
     action: Optional[str] = None
     action_input: Optional[Dict[str, Any]] = None
@@ -20,7 +29,12 @@ class ReactAgent:
     """Implementation of a React agent that reasons and acts in cycles."""
 
     def __init__(
-        self, name: str, llm_client, tools: List[Tool], config: Dict[str, Any]
+        self,
+        name: str,
+        llm_client,
+        tools: List[Tool],
+        config: Dict[str, Any],
+        budget: Optional[ContextBudget] = None,
     ):
         """Initialize the React agent.
 
@@ -28,44 +42,30 @@ class ReactAgent:
             llm_client: Client for LLM API
             tools: List of tools available to the agent
             prompt: The prompt for the agent
+            budget: Token budget of every LLM call, the agent's default if None
         """
         self.name = name
         self.llm_client = llm_client
+        self.budget = budget or default_budget(name)
         self.tools = tools
         self.tool_map = {tool.name: tool for tool in tools}
         tool_config = [
             {"name": tool.name, "description": tool.description} for tool in tools
         ]
         config["tools"] = tool_config
-        self.prompt = load_prompt(name, config)
+        self.prompt = load_prompt(name, config) + "\n" + self._format_instructions()
 
-    def _create_prompt(
-        self, agent_input: str, intermediate_steps: List[Dict[str, str]]
-    ) -> str:
-        """Create the prompt for the LLM including the React format instructions.
+    def _format_instructions(self) -> str:
+        """The React format instructions, part of the static system prompt.
 
-        Args:
-            agent_input: The input to the agent
-            intermediate_steps: List of previous steps taken
+        They only depend on the tool list, so together with the rendered agent
+        prompt they form a prefix that is identical on every call and can be
+        served from the provider's prompt cache.
 
         Returns:
-            Complete prompt string for the LLM
+            Format instructions appended to the system prompt
         """
-        # Tools section
-        tool_descriptions = "\n".join(
-            [f"- {tool.name}: {tool.description}" for tool in self.tools]
-        )
-
-        # Format intermediate steps for prompt
-        steps_text = ""
-        for step in intermediate_steps:
-            steps_text += f"Thought: {step.get('thought', '')}\n"
-            steps_text += f"Action: {step.get('action', '')}\n"
-            steps_text += f"Action Input: {step.get('action_input', '')}\n"
-            steps_text += f"Observation: {step.get('observation', '')}\n"
-
-        prompt = f"""{self.prompt}
-Human query: {agent_input}
+        return f"""
 Follow this format:
 Thought: Think about the current situation and what to do
 Action: The action to take (must be one of: {', '.join([tool.name for tool in self.tools])})
@@ -74,10 +74,25 @@ Observation: The result of the action
 ... (this Thought/Action/Observation cycle can repeat multiple times)
 Thought: I now know the final answer
 Final Answer: The final answer to the original input question
-
-{steps_text}
 """
-        return prompt
+
+    def _create_prompt(self, agent_input: str) -> str:
+        """Create the opening user turn.
+
+        Only dynamic content goes here, the format instructions live in the
+        system prompt. Past steps are not rendered either: every iteration
+        appends its own assistant and observation turns to the transcript.
+
+        Args:
+            agent_input: The input to the agent
+
+        Returns:
+            Prompt string for the first user turn
+        """
+        return f"Human query: {agent_input}"
+
+    def _observation_message(self, observation: Any) -> Dict[str, str]:
+        return {"role": "user", "content": f"Observation: {observation}"}
 
     def _parse_llm_response(self, response: str) -> Dict[str, Any]:
         """Parse the LLM response into structured components.
@@ -137,6 +152,7 @@ Final Answer: The final answer to the original input question
                         .strip('"')
                     )
 
+                action_input_text = self._strip_code_fence(action_input_text)
                 if (
                     action_input_text.startswith("{")
                     and action_input_text.endswith("}")
@@ -153,10 +169,71 @@ Final Answer: The final answer to the original input question
 
         return result
 
+    @staticmethod
+    def _strip_code_fence(text: str) -> str:
+        """The code inside a markdown fence (```python ... ```), or `text` unchanged."""
+        if not text.startswith("```"):
+            return text
+        body = text[3:]
+        newline_idx = body.find("\n")
+        body = body[newline_idx + 1 :] if newline_idx != -1 else ""
+        if body.rstrip().endswith("```"):
+            body = body.rstrip()[:-3]
+        return body.strip("\n")
+
+    def _stream_cutoff(self, response: str) -> Optional[int]:
+        """Find where a partially streamed response can be cut off.
+
+        The response is complete once the model starts an observation of its own or
+        once the `Action Input` is a full JSON value. Plain-text input ends with its
+        line only for tools that take a single line (search queries, urls); other input,
+        such as the coder's multi-line code, runs until the `Observation:` stop or the
+        end of the stream. A final answer runs until the end of the stream.
+
+        Args:
+            response: The text streamed so far
+
+        Returns:
+            Length of the usable prefix, or None if more text is needed
+        """
+        observation_idx = response.find("Observation:")
+        if observation_idx != -1:
+            return observation_idx
+        if "Final Answer:" in response:
+            return None
+
+        action_input_idx = response.find("Action Input:")
+        if action_input_idx == -1:
+            return None
+        start = action_input_idx + len("Action Input:")
+        text = response[start:].lstrip()
+        offset = len(response) - len(text)
+        if text.startswith("{") or text.startswith("["):
+            try:
+                _, end = json.JSONDecoder().raw_decode(text)
+                return offset + end
+            except json.JSONDecodeError:
+                return None
+        action = response[response.find("Action:") + len("Action:") : action_input_idx].strip()
+        tool = self.tool_map.get(action)
+        if tool is None or not tool.single_line_input:
+            return None
+        newline_idx = text.find("\n")
+        if text.strip() and newline_idx != -1:
+            return offset + newline_idx
+        return None
+
+    def _fit(self, prompt: Union[str, List[Dict[str, str]]]) -> Union[str, List[Dict[str, str]]]:
+        """Shorten or drop old turns of the transcript that do not fit the token budget."""
+        if isinstance(prompt, str):
+            return prompt
+        return self.budget.fit(prompt, self.prompt)
+
     def _call_llm(self, prompt: Union[str, List[Dict[str, str]]]) -> str:
         """Call the LLM with the given prompt.
 
-        This is an abstract method that should be implemented based on the specific LLM client.
+        The completion is streamed and the stream is closed as soon as a complete
+        action has been generated.
 
         Args:
             prompt: The prompt to send to the LLM
@@ -164,9 +241,42 @@ Final Answer: The final answer to the original input question
         Returns:
             Raw text response from the LLM
         """
-        response = self.llm_client.generate(
-            prompt, system_prompt=self.prompt, stop=["Observation:"]
+        response, answering = "", False
+        prompt = self._fit(prompt)
+        tokens = generate_stream(
+            self.llm_client, prompt, system_prompt=self.prompt, stop=["Observation:"], partial_ok=True
         )
+        with closing(tokens):
+            for token in tokens:
+                response += token
+                # a final answer is consumed to the end, no need to rescan it
+                if answering:
+                    continue
+                answering = "Final Answer:" in response
+                cutoff = self._stream_cutoff(response)
+                if cutoff is not None:
+                    return response[:cutoff]
+        return response
+
+    async def _acall_llm(self, prompt: Union[str, List[Dict[str, str]]]) -> str:
+        """Async counterpart of `_call_llm`."""
+        response, answering = "", False
+        prompt = self._fit(prompt)
+        tokens = agenerate_stream(
+            self.llm_client, prompt, system_prompt=self.prompt, stop=["Observation:"], partial_ok=True
+        )
+        try:
+            async for token in tokens:
+                response += token
+                # a final answer is consumed to the end, no need to rescan it
+                if answering:
+                    continue
+                answering = "Final Answer:" in response
+                cutoff = self._stream_cutoff(response)
+                if cutoff is not None:
+                    return response[:cutoff]
+        finally:
+            await tokens.aclose()
         return response
 
     def _execute_tool(self, action: str, action_input: Any) -> str:
@@ -182,62 +292,98 @@ Final Answer: The final answer to the original input question
         if action not in self.tool_map:
             return f"Error: Tool '{action}' not found. Available tools: {', '.join(self.tool_map.keys())}"
 
-        try:
-            tool_result = self.tool_map[action](action_input)
+        with tracing.span(action, "tool", input_chars=len(str(action_input))) as span:
+            try:
+                tool_result = self.tool_map[action](action_input)
+            except Exception as e:
+                span.set(error=f"{type(e).__name__}: {e}")
+                return f"Error executing tool '{action}': {str(e)}"
+            span.set(output_chars=len(str(tool_result)))
             return tool_result
-        except Exception as e:
-            return f"Error executing tool '{action}': {str(e)}"
-
-    def run(
-        self, agent_input: str, workflow_state: State, max_iterations: int = 10
-    ) -> Dict[str, Any]:
-        """Run the React agent on a user query.
-
-        Args:
-            agent_input: the input to the agent
-            max_iterations: Maximum number of thought-action-observation cycles
 
-        Returns:
-            Complete result with all intermediate steps and final answer
-        """
+    def _start(self, agent_input: str) -> AgentState:
         agent_state = AgentState()
         agent_state.messages.append({"role": "user", "content": agent_input})
-        observations = workflow_state.get("observations", [])
+        agent_state.transcript.append(
+            {"role": "user", "content": self._create_prompt(agent_input)}
+        )
+        return agent_state
+
+    def _finish_if_answered(
+        self, agent_state: AgentState, parsed_response: Dict[str, Any]
+    ) -> bool:
+        """Record the final answer, if the LLM gave one, and report whether the loop is done."""
+        if "final_answer" in parsed_response:
+            agent_state.is_done = True
+            agent_state.messages.append(
+                {"role": "assistant", "content": parsed_response["final_answer"]}
+            )
+        return agent_state.is_done
+
+    def _record_step(
+        self,
+        agent_state: AgentState,
+        workflow_state: State,
+        parsed_response: Dict[str, Any],
+        observation: Any,
+        observations: List[Any],
+        i: int,
+        max_iterations: int,
+    ) -> None:
+        thought = parsed_response.get("thought", "")
+        action = parsed_response.get("action", "")
+        action_input = parsed_response.get("action_input", "")
+
+        print(f"thought: {thought}")
+        print(f"action: {action}")
+        print(f"action_input: {action_input}")
+        print(f"observation: {observation}")
+        print(f"react agent iter: {i}, max_iterations: {max_iterations}")
+        print("--------------------------------")
+        observations.append(observation)
+
+        step = {
+            "thought": thought,
+            "action": action,
+            "action_input": action_input,
+            "observation": observation,
+        }
+        agent_state.intermediate_steps.append(step)
+        agent_state.transcript.append(self._observation_message(observation))
 
-        for i in range(max_iterations):
-            prompt = self._create_prompt(agent_input, agent_state.intermediate_steps)
-            llm_response = self._call_llm(prompt)
-
-            parsed_response = self._parse_llm_response(llm_response)
-
-            if "final_answer" in parsed_response:
-                agent_state.is_done = True
-                agent_state.messages.append(
-                    {"role": "assistant", "content": parsed_response["final_answer"]}
-                )
-                break
-
-            thought = parsed_response.get("thought", "")
-            action = parsed_response.get("action", "")
-            action_input = parsed_response.get("action_input", "")
-
-            observation = self._execute_tool(action, action_input)
-            print(f"thought: {thought}")
-            print(f"action: {action}")
-            print(f"action_input: {action_input}")
-            print(f"observation: {observation}")
-            print(f"react agent iter: {i}, max_iterations: {max_iterations}")
-            print("--------------------------------")
-            observations.append(observation)
-
-            step = {
-                "thought": thought,
-                "action": action,
-                "action_input": action_input,
-                "observation": observation,
-            }
-            agent_state.intermediate_steps.append(step)
+        # shared with the other steps, the reporter retrieves from it
+        index = workflow_state.get("observation_index")
+        if index is not None:
+            for text, source in self._documents(observation):
+                index.add(text, source=source or f"{action}: {action_input}")
 
+    @classmethod
+    def _documents(cls, observation: Any) -> List[Tuple[str, str]]:
+        """
+        The (text, source) documents of a tool observation to index: one per search
+        result or crawled page, from their text fields, so the chunker sees the
+        paragraphs of the content instead of the repr of a dict. Errors are skipped.
+        """
+        if isinstance(observation, list):
+            return [document for item in observation for document in cls._documents(item)]
+        if not isinstance(observation, dict):
+            return [(f"{observation}", "")] if observation else []
+        if "error" in observation:
+            return []
+        if isinstance(observation.get("results"), list):
+            return cls._documents(observation["results"])
+        url = observation.get("url", "")
+        if "crawled_content" in observation:
+            return [(observation["crawled_content"], url)]
+        content = observation.get("raw_content") or observation.get("content")
+        if content:
+            title = observation.get("title")
+            return [(f"{title}\n\n{content}" if title else content, url)]
+        return [(json.dumps(observation, ensure_ascii=False, default=str), url)]
+
+    def _finish(
+        self, agent_state: AgentState, workflow_state: State, observations: List[Any]
+    ) -> Dict[str, Any]:
         if not agent_state.is_done:
             agent_state.messages.append(
                 {
@@ -256,3 +402,88 @@ Final Answer: The final answer to the original input question
         messages.append(agent_state.messages[-1])
         workflow_state.set("messages", messages)
         return result
+
+    def run(
+        self, agent_input: str, workflow_state: State, max_iterations: int = 10
+    ) -> Dict[str, Any]:
+        """Run the React agent on a user query.
+
+        Args:
+            agent_input: the input to the agent
+            max_iterations: Maximum number of thought-action-observation cycles
+
+        Returns:
+            Complete result with all intermediate steps and final answer
+        """
+        agent_state = self._start(agent_input)
+        observations = workflow_state.get("observations", [])
+
+        # lets tools rank what they return by the task at hand
+        with tool_context(
+            agent_input,
+            workflow_state.get("observation_index"),
+            workflow_state.get("artifacts"),
+        ), attribute(agent=self.name):
+            for i in range(max_iterations):
+                with tracing.span("iteration", "agent", agent=self.name, iteration=i):
+                    llm_response = self._call_llm(agent_state.transcript)
+                    agent_state.transcript.append(
+                        {"role": "assistant", "content": llm_response.strip()}
+                    )
+
+                    parsed_response = self._parse_llm_response(llm_response)
+                    if self._finish_if_answered(agent_state, parsed_response):
+                        break
+
+                    observation = self._execute_tool(
+                        parsed_response.get("action", ""),
+                        parsed_response.get("action_input", ""),
+                    )
+                    self._record_step(
+                        agent_state, workflow_state, parsed_response, observation, observations, i, max_iterations
+                    )
+
+        return self._finish(agent_state, workflow_state, observations)
+
+    async def arun(
+        self, agent_input: str, workflow_state: State, max_iterations: int = 10
+    ) -> Dict[str, Any]:
+        """Async version of `run`: LLM calls are awaited and tools run in worker threads.
+
+        Args:
+            agent_input: the input to the agent
+            max_iterations: Maximum number of thought-action-observation cycles
+
+        Returns:
+            Complete result with all intermediate steps and final answer
+        """
+        agent_state = self._start(agent_input)
+        observations = workflow_state.get("observations", [])
+
+        # lets tools rank what they return by the task at hand
+        with tool_context(
+            agent_input,
+            workflow_state.get("observation_index"),
+            workflow_state.get("artifacts"),
+        ), attribute(agent=self.name):
+            for i in range(max_iterations):
+                with tracing.span("iteration", "agent", agent=self.name, iteration=i):
+                    llm_response = await self._acall_llm(agent_state.transcript)
+                    agent_state.transcript.append(
+                        {"role": "assistant", "content": llm_response.strip()}
+                    )
+
+                    parsed_response = self._parse_llm_response(llm_response)
+                    if self._finish_if_answered(agent_state, parsed_response):
+                        break
+
+                    observation = await asyncio.to_thread(
+                        self._execute_tool,
+                        parsed_response.get("action", ""),
+                        parsed_response.get("action_input", ""),
+                    )
+                    self._record_step(
+                        agent_state, workflow_state, parsed_response, observation, observations, i, max_iterations
+                    )
+
+        return self._finish(agent_state, workflow_state, observations)
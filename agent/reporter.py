@@ -1,19 +1,46 @@
-from typing import List, Union
-import os
-from jinja2 import Environment, FileSystemLoader
-from ..llm.llm import OpenAIClient, AnthropicClient
-from ..prompt.planner_model import Plan
+from typing import Dict, Iterator, List, Optional, Union
+from ..llm.llm import OpenAIClient, AnthropicClient, agenerate, generate_stream
 from ..state.state import State
 from ..prompt.utils import load_prompt
+from ..llm.context import ContextBudget, default_budget
 
 class Reporter:
     def __init__(
-        self, llm_client: Union[OpenAIClient, AnthropicClient], locale: str = "en-US"
+        self,
+        llm_client: Union[OpenAIClient, AnthropicClient],
+        locale: str = "en-US",
+        budget: Optional[ContextBudget] = None,
+        top_k: int = 5,
     ):
         self.system_prompt = load_prompt("reporter", {"locale": locale})
         self.llm_client = llm_client
+        self.budget = budget or default_budget("reporter")
+        self.top_k = top_k
 
-    def report(self, state: State = None) -> List[str]:
+    def _observations(self, state: State) -> List[str]:
+        """
+        The top-k observation chunks for the plan title and for each step, so the prompt
+        grows with the number of steps but not with the number of pages crawled.
+        All observations when the state has no index.
+        """
+        index = state.get("observation_index")
+        if index is None or not len(index):
+            return [f"{observation}" for observation in state.get("observations", [])]
+        current_plan = state.get("current_plan")
+        queries = [f"{current_plan.title}\n{current_plan.thought}"]
+        queries += [f"{step.title}\n{step.description}" for step in current_plan.steps]
+        if len(index) <= self.top_k * len(queries):
+            # everything fits in what retrieval would return
+            chunks = list(index.chunks)
+        else:
+            chunks = []
+            for query in queries:
+                for chunk in index.search(query, self.top_k):
+                    if chunk not in chunks:
+                        chunks.append(chunk)
+        return [f"Source: {chunk.source}\n\n{chunk.text}" for chunk in chunks]
+
+    def _messages(self, state: State) -> List[Dict[str, str]]:
         human_messages = []
         current_plan = state.get("current_plan")
         human_messages.append(
@@ -22,12 +49,23 @@ class Reporter:
                 "content": f"# Research Requirements\n\n## Task\n\n{current_plan.title}\n\n## Description\n\n{current_plan.thought}",
             }
         )
-        for observation in state.get("observations", []):
+        for observation in self._observations(state):
             human_messages.append(
                 {
                     "role": "user",
                     "content": f"Below are some observations for the research task:\n\n{observation}",
                 }
             )
-        response = self.llm_client.generate(human_messages, self.system_prompt)
+        return self.budget.fit(human_messages, self.system_prompt)
+
+    def report(self, state: State = None) -> List[str]:
+        response = self.llm_client.generate(self._messages(state), self.system_prompt)
+        return response
+
+    def report_stream(self, state: State = None) -> Iterator[str]:
+        """yield the report as it is being generated"""
+        yield from generate_stream(self.llm_client, self._messages(state), self.system_prompt)
+
+    async def areport(self, state: State = None) -> List[str]:
+        response = await agenerate(self.llm_client, self._messages(state), self.system_prompt)
         return response
\ No newline at end of file
@@ -1,12 +1,17 @@
 from ..llm.llm import OpenAIClient, AnthropicClient
 from ..state.state import State
-from typing import Union
+from typing import Optional, Union
+from ..llm.context import ContextBudget
 from ..agent.react_agent import ReactAgent
 from ..tools.search import TavilySearchTool
 from ..tools.crawler import CrawlerTool
 
 class Researcher:
-    def __init__(self, llm_client: Union[OpenAIClient, AnthropicClient]):
+    def __init__(
+        self,
+        llm_client: Union[OpenAIClient, AnthropicClient],
+        budget: Optional[ContextBudget] = None,
+    ):
         researcher_tools = [TavilySearchTool(), CrawlerTool()]
         researcher_config = {"locale": "en-US"}
         self.research_agent = ReactAgent(
@@ -14,6 +19,7 @@ class Researcher:
             llm_client=llm_client,
             tools=researcher_tools,
             config=researcher_config,
+            budget=budget,
         )
 
     def research(self, query: str, state: State) -> str:
@@ -23,3 +29,10 @@ class Researcher:
         """
         res = self.research_agent.run(query, state)
         return res
+
+    async def aresearch(self, query: str, state: State) -> str:
+        """
+        async version of `research`
+        """
+        res = await self.research_agent.arun(query, state)
+        return res
@@ -0,0 +1,224 @@
+"""
+Run many research queries in one process:
+
+    python -m ReMind.batch queries.jsonl --workers 8 --output output_reports/batch
+
+Each line of the input is {"id": "...", "query": "..."} or a plain JSON string. The
+runs share one LLM client, the LLM/crawl/search caches, the HTTP connection pools and
+the extraction and Python worker pools, and interleave on one event loop, so a batch
+is bounded by provider limits rather than process startup. Every report is written
+to `<output>/<id>.md` with its token usage and cost in `<output>/<id>.usage.json`,
+timings, costs and errors to `<output>/summary.json`.
+
+Runs are checkpointed under a run id made of the batch name and the query id:
+running the same file again resumes interrupted queries and does not repeat finished ones.
+With --no-checkpoint nothing is saved and every query runs from the start each time.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from .main import add_runtime_arguments, configure_runtime, export_traces
+from .state_machine.checkpoint import Checkpointer, prune_runs
+from .state_machine.state_machine import Node, StateMachine
+from .tools.crawler import MAX_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT_DIR = "output_reports/batch"
+DEFAULT_WORKERS = 4
+SUMMARY_FILE = "summary.json"
+
+
+@dataclass
+class BatchQuery:
+    id: str
+    query: str
+
+
+@dataclass
+class BatchResult:
+    id: str
+    query: str
+    status: str
+    seconds: float
+    run_id: str
+    resumed: bool = False
+    report_path: Optional[str] = None
+    error: Optional[str] = None
+    usage: Optional[Dict[str, Any]] = None
+
+
+def read_queries(path: str) -> List[BatchQuery]:
+    """The queries of a JSONL file, ids default to the line number."""
+    queries = []
+    seen = set()
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"query": record}
+            if not record.get("query"):
+                raise ValueError(f"{path}:{line_number}: missing query")
+            query_id = str(record.get("id", line_number))
+            if query_id in seen:
+                raise ValueError(f"{path}:{line_number}: duplicate id {query_id!r}")
+            seen.add(query_id)
+            queries.append(BatchQuery(query_id, record["query"]))
+    return queries
+
+
+def _slug(query_id: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", query_id).strip("._") or "query"
+
+
+class BatchRunner:
+    """Runs queries concurrently on one event loop, at most `workers` at a time."""
+
+    def __init__(
+        self,
+        llm_client,
+        name: str = "batch",
+        output_dir: str = DEFAULT_OUTPUT_DIR,
+        workers: int = DEFAULT_WORKERS,
+        max_parallel_steps: int = 4,
+        context_budget: Optional[int] = None,
+        checkpoint_dir: Optional[str] = None,
+        checkpoint: bool = True,
+    ):
+        self.llm_client = llm_client
+        self.name = name
+        self.output_dir = output_dir
+        self.workers = workers
+        self.max_parallel_steps = max_parallel_steps
+        self.context_budget = context_budget
+        self.checkpoint_dir = checkpoint_dir or os.path.join(output_dir, "runs")
+        self.checkpoint = checkpoint
+
+    def _machine(self, item: BatchQuery, checkpointer: Optional[Checkpointer]) -> StateMachine:
+        machine = StateMachine(
+            item.query,
+            self.llm_client,
+            max_parallel_steps=self.max_parallel_steps,
+            context_budget=self.context_budget,
+            checkpointer=checkpointer,
+        )
+        if checkpointer is not None and checkpointer.exists():
+            checkpoint = checkpointer.load()
+            # an id reused for another query starts over
+            if checkpoint["query"] == item.query:
+                machine.resume(checkpoint)
+        return machine
+
+    async def run_one(self, item: BatchQuery) -> BatchResult:
+        run_id = f"{self.name}-{_slug(item.id)}"
+        checkpointer = Checkpointer(run_id, self.checkpoint_dir) if self.checkpoint else None
+        start = time.perf_counter()
+        result = BatchResult(item.id, item.query, "ok", 0.0, run_id)
+        machine = None
+        try:
+            machine = self._machine(item, checkpointer)
+            result.resumed = machine.current_node != Node.PLANNER
+            report = await machine.arun_until_end()
+            if report:
+                result.report_path = os.path.join(self.output_dir, f"{_slug(item.id)}.md")
+                with open(result.report_path, "w", encoding="utf-8") as f:
+                    f.write(report)
+            else:
+                result.status = "empty"
+        except Exception as e:
+            logger.exception(f"Query {item.id} failed")
+            result.status = "error"
+            result.error = f"{type(e).__name__}: {e}"
+        if machine is not None:
+            result.usage = machine.ledger.total().to_dict()
+            machine.ledger.write(os.path.join(self.output_dir, f"{_slug(item.id)}.usage.json"))
+        result.seconds = round(time.perf_counter() - start, 3)
+        return result
+
+    async def arun(self, queries: List[BatchQuery]) -> List[BatchResult]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        slots = asyncio.Semaphore(self.workers)
+
+        async def run(item: BatchQuery) -> BatchResult:
+            async with slots:
+                result = await self.run_one(item)
+            logger.info(f"[{result.status}] {item.id} in {result.seconds:.1f}s")
+            return result
+
+        return await asyncio.gather(*(run(item) for item in queries))
+
+    def run(self, queries: List[BatchQuery]) -> List[BatchResult]:
+        start = time.perf_counter()
+        results = asyncio.run(self.arun(queries))
+        self.write_summary(results, time.perf_counter() - start)
+        return results
+
+    def write_summary(self, results: List[BatchResult], seconds: float) -> str:
+        durations = sorted(result.seconds for result in results)
+        summary = {
+            "queries": len(results),
+            "ok": sum(result.status == "ok" for result in results),
+            "failed": sum(result.status != "ok" for result in results),
+            "workers": self.workers,
+            "wall_seconds": round(seconds, 3),
+            "queries_per_minute": round(60 * len(results) / seconds, 2) if seconds else None,
+            "median_seconds": durations[len(durations) // 2] if durations else None,
+            "cost": round(sum(result.usage["cost"] for result in results if result.usage), 6),
+            "results": [asdict(result) for result in results],
+        }
+        path = os.path.join(self.output_dir, SUMMARY_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ReMind - run research queries from a JSONL file")
+    parser.add_argument("input", help="JSONL file, one {\"id\": ..., \"query\": ...} per line")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, metavar="DIR", help=f"Directory for the reports and {SUMMARY_FILE} (default: {DEFAULT_OUTPUT_DIR})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, metavar="N", help=f"Queries researched concurrently (default: {DEFAULT_WORKERS})")
+    add_runtime_arguments(parser)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    queries = read_queries(args.input)
+    prune_runs(args.checkpoint_dir, args.keep_runs)
+    # crawls of all workers go through the same reader host
+    llm_client, caches = configure_runtime(args, http_connections=args.workers * MAX_CONCURRENCY)
+    runner = BatchRunner(
+        llm_client,
+        name=_slug(os.path.splitext(os.path.basename(args.input))[0]),
+        output_dir=args.output,
+        workers=args.workers,
+        max_parallel_steps=args.max_parallel_steps,
+        context_budget=args.context_budget,
+        checkpoint_dir=args.checkpoint_dir,
+        checkpoint=not args.no_checkpoint,
+    )
+    try:
+        results = runner.run(queries)
+    finally:
+        for path in export_traces(args):
+            logger.info(f"Trace written to {path}")
+    for name, cache in caches.items():
+        logger.info(f"{name}: {cache.stats()}")
+    logger.info(f"LLM governor: {llm_client.governor.stats()}")
+    logger.info(f"LLM latency: {llm_client.latency.summary()}")
+    failed = [result.id for result in results if result.status != "ok"]
+    logger.info(f"{len(results) - len(failed)}/{len(results)} queries done, summary in {os.path.join(args.output, SUMMARY_FILE)}")
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,123 @@
+# Compares the HTML extraction backends on a corpus of saved pages.
+#
+#   python -m ReMind.benchmarks.extractors --fetch https://example.com/a ... --corpus pages/
+#   python -m ReMind.benchmarks.extractors --corpus pages/ [--backends lxml readability] [--json out.json]
+#
+# Every `<name>.html` in the corpus is extracted by each backend. Latency covers
+# extraction and markdown conversion. Quality is the token F1 against `<name>.txt`
+# when such a reference text exists, and against the first backend otherwise.
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..crawler.extractor import EXTRACTORS, get_extractor
+from ..retrieval.index import tokenize
+
+
+def token_f1(text: str, reference: str) -> Dict[str, float]:
+    tokens, expected = Counter(tokenize(text)), Counter(tokenize(reference))
+    overlap = sum((tokens & expected).values())
+    precision = overlap / sum(tokens.values()) if tokens else 0.0
+    recall = overlap / sum(expected.values()) if expected else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def fetch(urls: List[str], corpus: Path) -> None:
+    """Save the raw HTML of `urls` into the corpus, through the same client the crawler uses."""
+    from urllib.parse import urlsplit
+    from ..crawler.jina_client import JinaClient
+
+    corpus.mkdir(parents=True, exist_ok=True)
+    client = JinaClient()
+    for url in urls:
+        parts = urlsplit(url)
+        name = f"{parts.hostname}{parts.path}".strip("/").replace("/", "_") or "index"
+        (corpus / f"{name}.html").write_text(client.crawl(url, return_format="html"), encoding="utf-8")
+        print(f"saved {url} -> {name}.html")
+
+
+def extract(backend: str, html: str, repeat: int) -> Dict:
+    extractor = get_extractor(backend)
+    timings, markdown, error = [], "", None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            markdown = extractor.extract_article(html).to_markdown()
+        except Exception as e:
+            error = repr(e)
+            break
+        timings.append(time.perf_counter() - start)
+    return {"markdown": markdown, "timings": timings, "error": error}
+
+
+def run(corpus: Path, backends: List[str], repeat: int) -> Dict:
+    pages = sorted(corpus.glob("*.html"))
+    if not pages:
+        raise SystemExit(f"no .html pages in {corpus}")
+    results: Dict[str, Dict] = {backend: {"pages": {}} for backend in backends}
+    for page in pages:
+        html = page.read_text(encoding="utf-8", errors="replace")
+        reference_file = page.with_suffix(".txt")
+        reference: Optional[str] = (
+            reference_file.read_text(encoding="utf-8") if reference_file.exists() else None
+        )
+        outputs = {backend: extract(backend, html, repeat) for backend in backends}
+        baseline = reference if reference is not None else outputs[backends[0]]["markdown"]
+        for backend, output in outputs.items():
+            results[backend]["pages"][page.name] = {
+                "latency_ms": 1000 * statistics.median(output["timings"]) if output["timings"] else None,
+                "chars": len(output["markdown"]),
+                "quality": token_f1(output["markdown"], baseline),
+                "against": "reference" if reference is not None else backends[0],
+                "error": output["error"],
+            }
+
+    for backend, result in results.items():
+        latencies = sorted(p["latency_ms"] for p in result["pages"].values() if p["latency_ms"] is not None)
+        f1 = [p["quality"]["f1"] for p in result["pages"].values()]
+        result["summary"] = {
+            "pages": len(result["pages"]),
+            "errors": sum(p["error"] is not None for p in result["pages"].values()),
+            "latency_p50_ms": statistics.median(latencies) if latencies else None,
+            "latency_p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else None,
+            "latency_total_ms": sum(latencies),
+            "mean_f1": statistics.mean(f1) if f1 else 0.0,
+        }
+    return results
+
+
+def print_report(results: Dict) -> None:
+    print(f"{'backend':<14}{'pages':>6}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'total ms':>11}{'mean F1':>9}")
+    for backend, result in results.items():
+        s = result["summary"]
+        p50 = f"{s['latency_p50_ms']:.1f}" if s["latency_p50_ms"] is not None else "-"
+        p95 = f"{s['latency_p95_ms']:.1f}" if s["latency_p95_ms"] is not None else "-"
+        print(
+            f"{backend:<14}{s['pages']:>6}{s['errors']:>8}{p50:>10}{p95:>10}"
+            f"{s['latency_total_ms']:>11.1f}{s['mean_f1']:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the HTML extraction backends")
+    parser.add_argument("--corpus", type=Path, required=True, help="Directory of saved .html pages (and optional .txt references)")
+    parser.add_argument("--backends", nargs="+", default=list(EXTRACTORS), choices=list(EXTRACTORS), help="Backends to compare, the first one is the quality baseline without references")
+    parser.add_argument("--repeat", type=int, default=3, help="Extractions per page and backend, the median is reported")
+    parser.add_argument("--fetch", nargs="+", metavar="URL", help="Save these pages into the corpus before benchmarking")
+    parser.add_argument("--json", type=Path, default=None, help="Also write the per-page results to this file")
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch(args.fetch, args.corpus)
+    results = run(args.corpus, args.backends, args.repeat)
+    print_report(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    sys.exit(0)
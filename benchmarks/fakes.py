@@ -0,0 +1,328 @@
+# Offline stand-ins for the LLM and the web, for the orchestration benchmark.
+#
+# ScriptedLLM answers every agent the way a well-behaved model would, from a script,
+# behind the real LLMClient call path: governor, call policy, streaming, tracing and
+# the usage ledger all run as they do against a provider.
+# FakeSearchTool and FakeCrawlTool are the real tools with only their network stage
+# replaced, so chunking, ranking, indexing and the artifact store stay in the path.
+# Latencies are sampled per request from a generator seeded with the request, so a
+# run is repeatable whatever order concurrent steps make their calls in.
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+from ..llm.context import count_tokens
+from ..llm.governor import estimate_tokens
+from ..llm.llm import LLMClient, MessageClaude
+from ..llm.usage import Usage
+from ..state import State
+from ..tools.crawler import CrawlerTool
+from ..tools.search import TavilySearchTool
+from ..tools.search_cache import SearchCache
+
+DISTRIBUTIONS = ("constant", "uniform", "lognormal")
+WORDS = (
+    "market growth revenue model adoption latency throughput benchmark dataset "
+    "policy research energy cost region survey analysis forecast supply demand"
+).split()
+
+
+@dataclass
+class Latency:
+    """
+    Seconds a fake call takes: `median` exactly ("constant"), within `median` +- `spread`
+    times it ("uniform"), or log-normal around `median` with sigma `spread` ("lognormal").
+    """
+
+    median: float = 0.0
+    spread: float = 0.0
+    distribution: str = "constant"
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """"0.05", "uniform:0.05:0.5" or "lognormal:0.05:0.8"."""
+        parts = spec.split(":")
+        if parts[0] in DISTRIBUTIONS:
+            distribution, parts = parts[0], parts[1:]
+        else:
+            distribution = "constant"
+        median = float(parts[0]) if parts else 0.0
+        spread = float(parts[1]) if len(parts) > 1 else 0.0
+        return cls(median, spread, distribution)
+
+    def sample(self, key: str, seed: int = 0) -> float:
+        if self.median <= 0:
+            return 0.0
+        rng = random.Random(f"{seed}:{key}")
+        if self.distribution == "uniform":
+            return max(0.0, self.median * (1 + self.spread * rng.uniform(-1, 1)))
+        if self.distribution == "lognormal":
+            return self.median * rng.lognormvariate(0, self.spread)
+        return self.median
+
+    def __str__(self) -> str:
+        if self.distribution == "constant":
+            return f"{self.median}"
+        return f"{self.distribution}:{self.median}:{self.spread}"
+
+
+def filler(key: str, chars: int, seed: int = 0) -> str:
+    """Deterministic prose of about `chars` characters."""
+    rng = random.Random(f"{seed}:{key}")
+    words, length = [], 0
+    while length < chars:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    sentences = [" ".join(words[i : i + 12]).capitalize() + "." for i in range(0, len(words), 12)]
+    return " ".join(sentences)
+
+
+def _text(messages: List[Dict[str, str]]) -> str:
+    return "\n".join(str(message.get("content", "")) for message in messages)
+
+
+class ScriptedLLM(LLMClient):
+    """
+    An LLMClient whose provider is a script that plays every agent of a run:
+
+    - planner: a plan of `steps` independent research steps and `processing_steps`
+      processing steps
+    - researcher: `tool_calls` actions per step, alternating search and crawl, then a
+      final answer of `answer_chars`
+    - coder: a final answer straight away, the Python workers are not benchmarked here
+    - reporter: a report of `answer_chars`
+
+    Every call is recorded in `calls` with its agent, iteration, prompt tokens and
+    simulated latency. Streams take the latency before their first chunk and are sent
+    in chunks of `chunk_chars`; usage is counted locally.
+    """
+
+    def __init__(
+        self,
+        steps: int = 4,
+        processing_steps: int = 0,
+        tool_calls: int = 2,
+        answer_chars: int = 400,
+        latency: Optional[Latency] = None,
+        seed: int = 0,
+        chunk_chars: int = 16,
+    ):
+        super().__init__("scripted")
+        self.steps = steps
+        self.processing_steps = processing_steps
+        self.tool_calls = tool_calls
+        self.answer_chars = answer_chars
+        # `latency` is the per-model histogram of LLMClient
+        self.simulated_latency = latency or Latency()
+        self.seed = seed
+        self.chunk_chars = chunk_chars
+        self.calls: List[Dict] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def agent(system_prompt: str) -> str:
+        if "Deep Researcher" in system_prompt:
+            return "planner"
+        if "`researcher` agent" in system_prompt:
+            return "researcher"
+        if "`coder` agent" in system_prompt:
+            return "coder"
+        return "reporter"
+
+    def plan(self) -> str:
+        steps = [
+            {
+                "need_web_search": True,
+                "title": f"Research topic {i + 1}",
+                "description": f"Collect data on aspect {i + 1} of the question.",
+                "step_type": "research",
+            }
+            for i in range(self.steps)
+        ]
+        steps += [
+            {
+                "need_web_search": False,
+                "title": f"Analyze findings {i + 1}",
+                "description": "Compute summary statistics of the collected data.",
+                "step_type": "processing",
+            }
+            for i in range(self.processing_steps)
+        ]
+        return json.dumps(
+            {
+                "locale": "en-US",
+                "has_enough_context": False,
+                "thought": "The question needs data from several sources.",
+                "title": "Benchmark plan",
+                "steps": steps,
+            }
+        )
+
+    def _react(self, messages: List[Dict[str, str]], agent: str) -> Tuple[str, int]:
+        iteration = sum(message.get("role") == "assistant" for message in messages)
+        task = re.search(r"##title\n\n(.*)", str(messages[0].get("content", "")))
+        title = task.group(1).strip() if task else "task"
+        if agent == "researcher" and iteration < self.tool_calls:
+            if iteration % 2 == 0:
+                action, action_input = "search", f"{title} statistics {iteration // 2 + 1}"
+            else:
+                slug = re.sub(r"\W+", "-", title.lower())
+                action, action_input = "crawl", f"https://{slug}.example.com/page-{iteration // 2 + 1}"
+            return (
+                f"Thought: I need more information about {title}.\n"
+                f"Action: {action}\n"
+                f"Action Input: {action_input}\n"
+            ), iteration
+        answer = filler(f"{agent}:{title}", self.answer_chars, self.seed)
+        return f"Thought: I now know the final answer\nFinal Answer: {answer}", iteration
+
+    def _respond(self, request: Dict) -> Tuple[str, float]:
+        system_prompt, messages = request["system"], request["messages"]
+        agent = self.agent(system_prompt)
+        iteration = 0
+        if agent == "planner":
+            text = self.plan()
+        elif agent == "reporter":
+            text = f"# Report\n\n{filler('report', self.answer_chars, self.seed)}"
+        else:
+            text, iteration = self._react(messages, agent)
+        prompt = _text(messages)
+        delay = self.simulated_latency.sample(f"{agent}:{prompt}", self.seed)
+        with self._lock:
+            self.calls.append(
+                {
+                    "agent": agent,
+                    "iteration": iteration,
+                    "prompt_tokens": estimate_tokens(request),
+                    "seconds": delay,
+                }
+            )
+        return text, delay
+
+    def _chunks(self, text: str) -> List[str]:
+        return [text[i : i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+
+    def _request(
+            self,
+            query: Union[str, List[Dict[str, str]]],
+            system_prompt: str = "",
+            state: State = None,
+            stop: List[str] = []) -> Dict:
+        return {"model": self.model, "system": system_prompt, "messages": MessageClaude(query, state), "stop": stop}
+
+    def _create(self, request: Dict, timeout: float) -> Tuple[str, Usage]:
+        text, delay = self._respond(request)
+        if delay:
+            time.sleep(delay)
+        return text, Usage(estimate_tokens(request), count_tokens(text))
+
+    async def _acreate(self, request: Dict, timeout: float) -> Tuple[str, Usage]:
+        text, delay = self._respond(request)
+        if delay:
+            await asyncio.sleep(delay)
+        return text, Usage(estimate_tokens(request), count_tokens(text))
+
+    def _stream(self, request: Dict, timeout: float) -> Iterator[str]:
+        text, delay = self._respond(request)
+        if delay:
+            time.sleep(delay)
+        sent = []
+        try:
+            for chunk in self._chunks(text):
+                sent.append(chunk)
+                yield chunk
+        finally:
+            self._report_usage(Usage(estimate_tokens(request), count_tokens("".join(sent))))
+
+    async def _astream(self, request: Dict, timeout: float) -> AsyncIterator[str]:
+        text, delay = self._respond(request)
+        if delay:
+            await asyncio.sleep(delay)
+        sent = []
+        try:
+            for chunk in self._chunks(text):
+                sent.append(chunk)
+                yield chunk
+        finally:
+            self._report_usage(Usage(estimate_tokens(request), count_tokens("".join(sent))))
+
+    def invoke(self, query: Union[str, List[Dict[str, str]]], system_prompt: str = "", state: State = None, stop: List[str] = []) -> str:
+        return self.generate(query, system_prompt, state, stop)
+
+    async def ainvoke(self, query: Union[str, List[Dict[str, str]]], system_prompt: str = "", state: State = None, stop: List[str] = []) -> str:
+        return await self.agenerate(query, system_prompt, state, stop)
+
+
+class FakeSearchTool(TavilySearchTool):
+    """The search tool answering from generated results, with its own cache."""
+
+    def __init__(self, latency: Optional[Latency] = None, result_chars: int = 300, seed: int = 0):
+        super().__init__(session=object(), cache=SearchCache())
+        self.latency = latency or Latency()
+        self.result_chars = result_chars
+        self.seed = seed
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def _search(self, query: str, max_results: int = 2) -> Dict:
+        delay = self.latency.sample(f"search:{query}", self.seed)
+        with self._lock:
+            self.seconds += delay
+        if delay:
+            time.sleep(delay)
+        slug = re.sub(r"\W+", "-", query.lower()).strip("-")
+        return {
+            "results": [
+                {
+                    "title": f"{query} ({i + 1})",
+                    "url": f"https://{slug}.example.com/page-{i + 1}",
+                    "content": filler(f"{query}:{i}", self.result_chars, self.seed),
+                    "score": round(1 - i / 10, 2),
+                }
+                for i in range(max_results)
+            ]
+        }
+
+
+class FakeCrawler:
+    """Crawler interface of CrawlerTool: generated pages of `page_chars` with a table."""
+
+    def __init__(self, latency: Optional[Latency] = None, page_chars: int = 6000, seed: int = 0):
+        self.latency = latency or Latency()
+        self.page_chars = page_chars
+        self.seed = seed
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def cached(self, url: str) -> Optional[str]:
+        return None
+
+    def fetch(self, url: str) -> str:
+        delay = self.latency.sample(f"crawl:{url}", self.seed)
+        with self._lock:
+            self.seconds += delay
+        if delay:
+            time.sleep(delay)
+        return url
+
+    def to_markdown(self, html: str) -> str:
+        paragraphs = [
+            filler(f"{html}:{i}", 600, self.seed) for i in range(max(1, self.page_chars // 600))
+        ]
+        table = "| region | share |\n| --- | --- |\n| north | 41% |\n| south | 59% |\n"
+        return f"# {html}\n\n" + "\n\n".join(paragraphs) + "\n\n" + table
+
+
+class FakeCrawlTool(CrawlerTool):
+    """The crawl tool over a FakeCrawler, without the per-host pause of the real one."""
+
+    def __init__(self, latency: Optional[Latency] = None, page_chars: int = 6000, seed: int = 0):
+        super().__init__(per_host_interval=0.0)
+        self.crawler = FakeCrawler(latency, page_chars, seed)
@@ -0,0 +1,310 @@
+# Measures the orchestration of research runs offline: a scripted LLM plays every
+# agent and the search and crawl tools answer from generated pages (see fakes.py),
+# so nothing leaves the machine and every run makes the same calls.
+#
+#   python -m ReMind.benchmarks.orchestration --json bench.json
+#   python -m ReMind.benchmarks.orchestration --only parsing prompt_growth
+#   python -m ReMind.benchmarks.orchestration --steps 2 8 --parallel 1 8 --llm-latency lognormal:0.05:0.8
+#   python -m ReMind.benchmarks.orchestration --baseline bench.json --tolerance 0.25
+#
+# overhead       StateMachine.run_until_end with instant LLM and tools: the cost of
+#                the machine itself per node and per LLM call
+# parsing        ReactAgent._create_prompt and _parse_llm_response calls per second
+# prompt_growth  prompt tokens of every researcher iteration, against its budget
+# end_to_end     wall time across step counts and max_parallel_steps, sync and async,
+#                with the latency distributions of the fake LLM, search and crawl
+#
+# With --baseline, exits with status 1 when a timing is more than --tolerance
+# slower than in the baseline's JSON, to catch regressions in scripts and CI.
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from ..agent.react_agent import ReactAgent
+from ..state_machine.state_machine import StateMachine
+from .fakes import FakeCrawlTool, FakeSearchTool, Latency, ScriptedLLM
+
+BENCHMARKS = ("overhead", "parsing", "prompt_growth", "end_to_end")
+DEFAULT_STEPS = [1, 4, 8]
+DEFAULT_PARALLEL = [1, 4]
+DEFAULT_LLM_LATENCY = "lognormal:0.02:0.5"
+DEFAULT_SEARCH_LATENCY = "uniform:0.03:0.5"
+DEFAULT_CRAWL_LATENCY = "lognormal:0.06:0.5"
+
+SAMPLE_RESPONSES = {
+    "action": "Thought: I should look this up.\nAction: search\nAction Input: global battery storage capacity 2024\n",
+    "action_json": 'Thought: Read both sources.\nAction: crawl\nAction Input: {"urls": ["https://a.example.com/x", "https://b.example.com/y"]}\n',
+    "final_answer": "Thought: I now know the final answer\nFinal Answer: " + "Capacity grew by 45 percent year over year. " * 20,
+    "long_thought": "Thought: " + "Comparing the figures of the sources and their methodology. " * 40 + "\nAction: search\nAction Input: methodology\n",
+}
+
+
+class CountingStateMachine(StateMachine):
+    """Counts the node transitions of a run."""
+
+    transitions_made = 0
+
+    def _transition(self, next_node) -> None:
+        self.transitions_made += 1
+        super()._transition(next_node)
+
+    async def _atransition(self, next_node) -> None:
+        self.transitions_made += 1
+        await super()._atransition(next_node)
+
+
+def build_machine(
+    llm: ScriptedLLM,
+    max_parallel_steps: int,
+    search: FakeSearchTool,
+    crawl: FakeCrawlTool,
+) -> CountingStateMachine:
+    """A machine whose researcher uses the fake tools, under the real tools' names."""
+    machine = CountingStateMachine("How is the benchmark market developing?", llm, max_parallel_steps=max_parallel_steps)
+    agent = machine.researcher.research_agent
+    agent.tools = [search, crawl]
+    agent.tool_map = {tool.name: tool for tool in agent.tools}
+    return machine
+
+
+def _run(machine: StateMachine, mode: str) -> float:
+    start = time.perf_counter()
+    if mode == "async":
+        asyncio.run(machine.arun_until_end())
+    else:
+        machine.run_until_end()
+    return time.perf_counter() - start
+
+
+def bench_overhead(steps: List[int], repeat: int, seed: int) -> List[Dict]:
+    results = []
+    for n in steps:
+        walls, setups = [], []
+        for _ in range(repeat):
+            llm = ScriptedLLM(steps=n, seed=seed)
+            start = time.perf_counter()
+            machine = build_machine(llm, 1, FakeSearchTool(seed=seed), FakeCrawlTool(seed=seed))
+            setups.append(time.perf_counter() - start)
+            walls.append(_run(machine, "sync"))
+        wall = statistics.median(walls)
+        results.append({
+            "steps": n,
+            "nodes": machine.transitions_made,
+            "llm_calls": len(llm.calls),
+            # calls that made it through the client's accounting
+            "ledger_calls": machine.ledger.total().calls,
+            "setup_ms": round(1000 * statistics.median(setups), 3),
+            "wall_ms": round(1000 * wall, 3),
+            "ms_per_node": round(1000 * wall / machine.transitions_made, 3),
+            "ms_per_llm_call": round(1000 * wall / len(llm.calls), 3),
+        })
+    return results
+
+
+def _throughput(fn: Callable[[], object], min_seconds: float = 0.2) -> Dict[str, float]:
+    """Calls per second of `fn`, timed in batches until `min_seconds` have passed."""
+    calls, elapsed, batch = 0, 0.0, 100
+    while elapsed < min_seconds:
+        start = time.perf_counter()
+        for _ in range(batch):
+            fn()
+        elapsed += time.perf_counter() - start
+        calls += batch
+        batch *= 2
+    return {"calls_per_second": round(calls / elapsed, 1), "us_per_call": round(1e6 * elapsed / calls, 3)}
+
+
+def bench_parsing(seed: int) -> Dict[str, Dict]:
+    agent = ReactAgent("researcher", ScriptedLLM(seed=seed), [FakeSearchTool(seed=seed), FakeCrawlTool(seed=seed)], {"locale": "en-US"})
+    task = "#Task\n\n##title\n\nBattery storage\n\n##description\n\n" + "Collect capacity data per region. " * 6
+    results = {"create_prompt": _throughput(lambda: agent._create_prompt(task))}
+    for name, response in SAMPLE_RESPONSES.items():
+        results[f"parse_{name}"] = _throughput(lambda: agent._parse_llm_response(response))
+    return results
+
+
+def bench_prompt_growth(tool_calls: int, seed: int) -> Dict:
+    llm = ScriptedLLM(steps=1, tool_calls=tool_calls, seed=seed)
+    machine = build_machine(llm, 1, FakeSearchTool(seed=seed), FakeCrawlTool(seed=seed))
+    machine.run_until_end()
+    budget = machine.researcher.research_agent.budget
+    calls = [call for call in llm.calls if call["agent"] == "researcher"]
+    iterations, previous = [], None
+    for call in calls:
+        iterations.append({
+            "iteration": call["iteration"],
+            "prompt_tokens": call["prompt_tokens"],
+            "growth": call["prompt_tokens"] - previous if previous is not None else 0,
+        })
+        previous = call["prompt_tokens"]
+    return {
+        "budget_tokens": budget.max_tokens,
+        "truncated": budget.truncated,
+        "dropped": budget.dropped,
+        "iterations": iterations,
+        "reporter_prompt_tokens": max((c["prompt_tokens"] for c in llm.calls if c["agent"] == "reporter"), default=0),
+    }
+
+
+def bench_end_to_end(
+    steps: List[int],
+    parallel: List[int],
+    modes: List[str],
+    latencies: Dict[str, Latency],
+    repeat: int,
+    seed: int,
+) -> List[Dict]:
+    results = []
+    for mode in modes:
+        for n in steps:
+            for workers in parallel:
+                walls = []
+                for _ in range(repeat):
+                    llm = ScriptedLLM(steps=n, latency=latencies["llm"], seed=seed)
+                    search = FakeSearchTool(latencies["search"], seed=seed)
+                    crawl = FakeCrawlTool(latencies["crawl"], seed=seed)
+                    walls.append(_run(build_machine(llm, workers, search, crawl), mode))
+                # the time the same calls take one after the other
+                serial = sum(call["seconds"] for call in llm.calls) + search.seconds + crawl.crawler.seconds
+                wall = statistics.median(walls)
+                results.append({
+                    "mode": mode,
+                    "steps": n,
+                    "max_parallel_steps": workers,
+                    "llm_calls": len(llm.calls),
+                    "wall_s": round(wall, 4),
+                    "serial_s": round(serial, 4),
+                    "speedup": round(serial / wall, 2) if wall else None,
+                })
+    return results
+
+
+def run(args: argparse.Namespace) -> Dict:
+    latencies = {
+        "llm": Latency.parse(args.llm_latency),
+        "search": Latency.parse(args.search_latency),
+        "crawl": Latency.parse(args.crawl_latency),
+    }
+    report = {
+        "benchmark": "orchestration",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "latency": {name: str(latency) for name, latency in latencies.items()},
+        "results": {},
+    }
+    results = report["results"]
+    if "overhead" in args.only:
+        results["overhead"] = bench_overhead(args.steps, args.repeat, args.seed)
+    if "parsing" in args.only:
+        results["parsing"] = bench_parsing(args.seed)
+    if "prompt_growth" in args.only:
+        results["prompt_growth"] = bench_prompt_growth(args.tool_calls, args.seed)
+    if "end_to_end" in args.only:
+        results["end_to_end"] = bench_end_to_end(args.steps, args.parallel, args.modes, latencies, args.repeat, args.seed)
+    return report
+
+
+def timings(report: Dict) -> Dict[str, float]:
+    """The timings of a report by name, lower is better."""
+    results = report["results"]
+    flat = {}
+    for row in results.get("overhead", []):
+        flat[f"overhead.steps={row['steps']}.ms_per_node"] = row["ms_per_node"]
+    for name, row in results.get("parsing", {}).items():
+        flat[f"parsing.{name}.us_per_call"] = row["us_per_call"]
+    for row in results.get("end_to_end", []):
+        flat[f"end_to_end.{row['mode']}.steps={row['steps']}.parallel={row['max_parallel_steps']}.wall_s"] = row["wall_s"]
+    return flat
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """The timings more than `tolerance` slower than in `baseline`."""
+    current, previous = timings(report), timings(baseline)
+    regressions = []
+    for name, value in current.items():
+        before = previous.get(name)
+        if before and value > before * (1 + tolerance):
+            regressions.append(f"{name}: {before} -> {value} (+{100 * (value / before - 1):.0f}%)")
+    return regressions
+
+
+def print_report(report: Dict) -> None:
+    results = report["results"]
+    if "overhead" in results:
+        print("overhead (instant LLM and tools)")
+        print(f"{'steps':>6}{'nodes':>7}{'calls':>7}{'setup ms':>10}{'wall ms':>10}{'ms/node':>9}{'ms/call':>9}")
+        for row in results["overhead"]:
+            print(
+                f"{row['steps']:>6}{row['nodes']:>7}{row['llm_calls']:>7}{row['setup_ms']:>10.2f}"
+                f"{row['wall_ms']:>10.2f}{row['ms_per_node']:>9.3f}{row['ms_per_llm_call']:>9.3f}"
+            )
+        print()
+    if "parsing" in results:
+        print("ReactAgent throughput")
+        for name, row in results["parsing"].items():
+            print(f"{name:<22}{row['calls_per_second']:>14,.0f}/s{row['us_per_call']:>10.2f} us")
+        print()
+    if "prompt_growth" in results:
+        growth = results["prompt_growth"]
+        print(f"researcher prompt tokens per iteration (budget {growth['budget_tokens']}, {growth['truncated']} truncated, {growth['dropped']} dropped)")
+        print("  " + ", ".join(f"{row['prompt_tokens']} (+{row['growth']})" for row in growth["iterations"]))
+        print(f"  reporter prompt: {growth['reporter_prompt_tokens']} tokens")
+        print()
+    if "end_to_end" in results:
+        print(f"end to end (llm {report['latency']['llm']}, search {report['latency']['search']}, crawl {report['latency']['crawl']})")
+        print(f"{'mode':<7}{'steps':>6}{'parallel':>10}{'calls':>7}{'wall s':>9}{'serial s':>10}{'speedup':>9}")
+        for row in results["end_to_end"]:
+            print(
+                f"{row['mode']:<7}{row['steps']:>6}{row['max_parallel_steps']:>10}{row['llm_calls']:>7}"
+                f"{row['wall_s']:>9.3f}{row['serial_s']:>10.3f}{row['speedup']:>9.2f}"
+            )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the orchestration of research runs offline")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS), help="Benchmarks to run (default: all)")
+    parser.add_argument("--steps", nargs="+", type=int, default=DEFAULT_STEPS, help="Research steps per plan")
+    parser.add_argument("--parallel", nargs="+", type=int, default=DEFAULT_PARALLEL, help="max_parallel_steps settings of the end to end runs")
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"], help="run_until_end and/or arun_until_end")
+    parser.add_argument("--tool-calls", type=int, default=8, help="Researcher tool calls for prompt_growth")
+    parser.add_argument("--llm-latency", default=DEFAULT_LLM_LATENCY, metavar="SPEC", help=f"Seconds per LLM call: N, uniform:N:SPREAD or lognormal:N:SIGMA (default: {DEFAULT_LLM_LATENCY})")
+    parser.add_argument("--search-latency", default=DEFAULT_SEARCH_LATENCY, metavar="SPEC", help=f"Seconds per search (default: {DEFAULT_SEARCH_LATENCY})")
+    parser.add_argument("--crawl-latency", default=DEFAULT_CRAWL_LATENCY, metavar="SPEC", help=f"Seconds per page fetch (default: {DEFAULT_CRAWL_LATENCY})")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per setting, the median is reported")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the scripted content and latencies")
+    parser.add_argument("--json", default=None, metavar="PATH", help="Also write the results to this file")
+    parser.add_argument("--baseline", default=None, metavar="PATH", help="Results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Slowdown against the baseline that counts as a regression (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    # the agents print their thoughts and observations
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nno regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
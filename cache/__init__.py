@@ -0,0 +1,3 @@
+from .sqlite_cache import SQLiteCache, CacheEntry
+
+__all__ = ['SQLiteCache', 'CacheEntry']
@@ -0,0 +1,183 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+
+@dataclass
+class CacheEntry:
+    value: str
+    meta: Dict[str, Any] = field(default_factory=dict)
+    created: float = 0.0
+    expires: Optional[float] = None
+
+    @property
+    def expired(self) -> bool:
+        return self.expires is not None and self.expires <= time.time()
+
+
+class SQLiteCache:
+    """
+    Key-value store in a single SQLite file with per-entry TTL and LRU eviction
+    by entry count and total value size.
+
+    path: file to store the cache in, ":memory:" keeps it in-process
+    ttl: default time to live of an entry in seconds, None never expires
+    max_entries / max_bytes: bounds enforced by evicting the least recently used entries
+    keep_stale: seconds an expired entry is kept around, e.g. to be revalidated
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        keep_stale: float = 0,
+    ):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.keep_stale = keep_stale
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, meta TEXT NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL, expires REAL, size INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+        )
+        self._conn.commit()
+
+    def get_entry(
+        self,
+        key: str,
+        allow_expired: bool = False,
+        accept: Optional[Callable[[CacheEntry], bool]] = None,
+    ) -> Optional[CacheEntry]:
+        """
+        Look up an entry and mark it as recently used. Expired entries count as a miss
+        unless `allow_expired` is set, e.g. to revalidate them with the origin, and so
+        do entries rejected by `accept`.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, meta, created, expires FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            entry = None
+            if row is not None:
+                entry = CacheEntry(row[0], json.loads(row[1]), row[2], row[3])
+                if entry.expired and not allow_expired:
+                    entry = None
+                elif accept is not None and not accept(entry):
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            if not entry.expired:
+                self.hits += 1
+            self._conn.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            return entry
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.get_entry(key)
+        return entry.value if entry else None
+
+    def set(
+        self,
+        key: str,
+        value: str,
+        meta: Optional[Dict[str, Any]] = None,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """Store `value` under `key`; `ttl` overrides the cache-wide default for this entry."""
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires = now + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, value, json.dumps(meta or {}), now, now, expires, len(value.encode("utf-8"))),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, key: str, ttl: Optional[float] = None) -> None:
+        """Restart the time to live of an entry, e.g. after a successful revalidation."""
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET expires = ?, accessed = ? WHERE key = ?",
+                (expires, time.time(), key),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones until the bounds hold."""
+        cursor = self._conn.execute(
+            "DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?",
+            (time.time() - self.keep_stale,),
+        )
+        self.evictions += max(cursor.rowcount, 0)
+        if self.max_entries is not None:
+            cursor = self._conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries "
+                "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.evictions += max(cursor.rowcount, 0)
+        if self.max_bytes is not None:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                rows = self._conn.execute(
+                    "SELECT key, size FROM entries ORDER BY accessed ASC"
+                ).fetchall()
+                stale = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+                self.evictions += len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
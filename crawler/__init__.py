@@ -1,4 +1,6 @@
 from .crawler import Crawler
 from .article import Article
+from .extractor import Extractor, get_extractor, set_default_extractor
+from .cache import CrawlCache, set_default_cache, get_default_cache
 
-__all__ = ['Crawler', 'Article']
+__all__ = ['Crawler', 'Article', 'Extractor', 'get_extractor', 'set_default_extractor', 'CrawlCache', 'set_default_cache', 'get_default_cache']
@@ -3,8 +3,6 @@
 import re
 from urllib.parse import urljoin
 
-from markdownify import markdownify as md
-
 
 class Article:
     url: str
@@ -14,6 +12,8 @@ class Article:
         self.html_content = html_content
 
     def to_markdown(self, including_title: bool = True) -> str:
+        from markdownify import markdownify as md
+
         markdown = ""
         if including_title:
             markdown += f"# {self.title}\n\n"
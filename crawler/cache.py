@@ -0,0 +1,137 @@
+import hashlib
+import re
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from ..cache.sqlite_cache import CacheEntry, SQLiteCache
+
+DEFAULT_CACHE_PATH = ".remind_cache/crawl.sqlite"
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# expired pages with a validator stay around this long to be revalidated
+DEFAULT_KEEP_STALE = 7 * 24 * 3600
+
+# query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref_src)$")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str) -> str:
+    """Normalize a URL so that trivially different spellings share a cache entry."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not TRACKING_PARAMS.match(k)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def max_age(headers: Mapping[str, str]) -> Optional[float]:
+    """TTL requested by the origin's Cache-Control header, 0 if it must be revalidated."""
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-cache" in cache_control:
+        return 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return float(match.group(1)) if match else None
+
+
+class CrawlCache:
+    """
+    On-disk cache of crawled pages keyed by canonical URL and return format.
+
+    Fresh entries are served directly. Expired entries that carry an ETag or
+    Last-Modified validator are revalidated with a conditional request, and a
+    304 answer renews them without transferring the page again.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        keep_stale: float = DEFAULT_KEEP_STALE,
+    ):
+        self.store = SQLiteCache(
+            path, ttl=ttl, max_bytes=max_bytes, keep_stale=keep_stale
+        )
+        self.revalidations = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def key(url: str, return_format: str) -> str:
+        canonical = canonical_url(url)
+        return hashlib.sha256(f"{return_format}\n{canonical}".encode("utf-8")).hexdigest()
+
+    def lookup(self, url: str, return_format: str) -> Optional[CacheEntry]:
+        """The cached entry, which may be expired but still revalidatable."""
+        return self.store.get_entry(
+            self.key(url, return_format),
+            allow_expired=True,
+            accept=lambda entry: not entry.expired or self._validators(entry),
+        )
+
+    @staticmethod
+    def _validators(entry: CacheEntry) -> Dict[str, str]:
+        return {k: v for k, v in entry.meta.items() if k in ("etag", "last_modified")}
+
+    def conditional_headers(self, entry: CacheEntry) -> Dict[str, str]:
+        """Request headers that let the upstream answer 304 Not Modified."""
+        headers = {}
+        if entry.meta.get("etag"):
+            headers["If-None-Match"] = entry.meta["etag"]
+        if entry.meta.get("last_modified"):
+            headers["If-Modified-Since"] = entry.meta["last_modified"]
+        if headers:
+            self.revalidations += 1
+        return headers
+
+    def save(
+        self,
+        url: str,
+        return_format: str,
+        content: str,
+        headers: Mapping[str, str],
+        ttl: Optional[float] = None,
+    ) -> None:
+        if "no-store" in headers.get("Cache-Control", "").lower():
+            return
+        ttl = max_age(headers) if ttl is None else ttl
+        meta = {"url": canonical_url(url)}
+        if headers.get("ETag"):
+            meta["etag"] = headers["ETag"]
+        if headers.get("Last-Modified"):
+            meta["last_modified"] = headers["Last-Modified"]
+        if ttl == 0 and not self._validators(CacheEntry(content, meta)):
+            return
+        self.store.set(self.key(url, return_format), content, meta=meta, ttl=ttl)
+
+    def renew(
+        self, url: str, return_format: str, headers: Mapping[str, str]
+    ) -> None:
+        """Restart the TTL of an entry the upstream confirmed as unchanged."""
+        self.not_modified += 1
+        self.store.touch(self.key(url, return_format), ttl=max_age(headers))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.store.stats()
+        stats["revalidations"] = self.revalidations
+        stats["not_modified"] = self.not_modified
+        return stats
+
+
+_default_cache: Optional[CrawlCache] = None
+
+
+def set_default_cache(cache: Optional[CrawlCache]) -> None:
+    """Share `cache` with every JinaClient created without an explicit cache."""
+    global _default_cache
+    _default_cache = cache
+
+
+def get_default_cache() -> Optional[CrawlCache]:
+    return _default_cache
@@ -0,0 +1,66 @@
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from ..retrieval.chunking import chunk_text
+from ..retrieval.index import BM25Index, tokenize
+
+DEFAULT_CHUNK_TOKENS = 250
+DEFAULT_TOP_CHUNKS = 3
+
+# ATX headings ("## Title") and the setext headings markdownify writes for h1/h2
+HEADING = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$|^([^\n]+)\n(=+|-+)[ \t]*$", re.MULTILINE)
+
+
+@dataclass
+class ArticleChunk:
+    text: str
+    heading: str
+    position: int
+
+
+def split_sections(markdown: str) -> List[Tuple[str, str]]:
+    """Split markdown at its headings into (heading path, body) pairs, e.g. ("Intro > Setup", "...")."""
+    sections, path = [], []
+    start, heading = 0, ""
+    for match in HEADING.finditer(markdown):
+        sections.append((heading, markdown[start : match.start()]))
+        if match.group(1):
+            level, title = len(match.group(1)), match.group(2)
+        else:
+            level, title = (1 if match.group(4)[0] == "=" else 2), match.group(3)
+        path = path[: level - 1] + [title.strip()]
+        heading = " > ".join(path)
+        start = match.end()
+    sections.append((heading, markdown[start:]))
+    return [(heading, body) for heading, body in sections if body.strip()]
+
+
+def chunk_article(markdown: str, max_tokens: int = DEFAULT_CHUNK_TOKENS) -> List[ArticleChunk]:
+    """
+    Split a whole article into chunks of about `max_tokens` tokens. Chunks never
+    span two sections and carry their heading path, so each one reads on its own.
+    """
+    chunks = []
+    for heading, body in split_sections(markdown):
+        for text in chunk_text(body, max_tokens):
+            chunks.append(ArticleChunk(text, heading, len(chunks)))
+    return chunks
+
+
+def rank_chunks(chunks: List[ArticleChunk], query: str, k: int = DEFAULT_TOP_CHUNKS) -> List[ArticleChunk]:
+    """
+    The `k` chunks most relevant to `query`, in article order. Without a query, or
+    when no chunk matches it, the beginning of the article is returned.
+    """
+    index = BM25Index()
+    for chunk in chunks:
+        index.add(tokenize(f"{chunk.heading}\n{chunk.text}"))
+    best = [doc_id for doc_id, _ in index.search(tokenize(query), k)]
+    if not best:
+        best = list(range(min(k, len(chunks))))
+    return [chunks[i] for i in sorted(best)]
+
+
+def render_chunk(chunk: ArticleChunk) -> str:
+    return f"[{chunk.heading}]\n{chunk.text}" if chunk.heading else chunk.text
@@ -1,13 +1,45 @@
 # From: https://github.com/bytedance/deer-flow/blob/main/src/crawler/crawler.py
 
 import sys
+from typing import Optional
 
 from .article import Article
+from .extractor import Extractor, get_extractor
 from .jina_client import JinaClient
-from .readability_extractor import ReadabilityExtractor
+from .pipeline import ExtractPool, get_pool
 
 
 class Crawler:
+    def __init__(
+        self,
+        jina_client: JinaClient = None,
+        extractor: Extractor = None,
+        pool: ExtractPool = None,
+    ):
+        self.jina_client = jina_client or JinaClient()
+        # readability unless the deployment picked another backend
+        self.extractor = extractor or get_extractor()
+        self._pool = pool
+
+    @property
+    def pool(self) -> ExtractPool:
+        return self._pool or get_pool()
+
+    def cached(self, url: str) -> Optional[str]:
+        """Raw HTML of `url` if it is cached and fresh, without touching the network."""
+        return self.jina_client.cached(url, return_format="html")
+
+    def fetch(self, url: str) -> str:
+        """The I/O-bound stage: raw HTML of `url`."""
+        return self.jina_client.crawl(url, return_format="html")
+
+    def to_markdown(self, html: str) -> str:
+        """The CPU-bound stage: the article in `html` as markdown, converted in the process pool."""
+        return self.pool.to_markdown(self.extractor, html)
+
+    def crawl_markdown(self, url: str) -> str:
+        return self.to_markdown(self.fetch(url))
+
     def crawl(self, url: str) -> Article:
         # To help LLMs better understand content, we extract clean
         # articles from HTML, convert them to markdown, and split
@@ -19,10 +51,8 @@ class Crawler:
         #
         # Instead of using Jina's own markdown converter, we'll use
         # our own solution to get better readability results.
-        jina_client = JinaClient()
-        html = jina_client.crawl(url, return_format="html")
-        extractor = ReadabilityExtractor()
-        article = extractor.extract_article(html)
+        html = self.fetch(url)
+        article = self.extractor.extract_article(html)
         article.url = url
         return article
 
@@ -0,0 +1,46 @@
+import importlib
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+
+from .article import Article
+
+# backend name -> (module, class), imported on first use
+EXTRACTORS: Dict[str, Tuple[str, str]] = {
+    "readability": (".readability_extractor", "ReadabilityExtractor"),
+    "lxml": (".lxml_extractor", "LxmlExtractor"),
+}
+DEFAULT_EXTRACTOR = "readability"
+
+
+class Extractor(ABC):
+    """Turns the HTML of a page into an Article holding its title and main content."""
+
+    name: str = ""
+
+    @abstractmethod
+    def extract_article(self, html: str) -> Article:
+        pass
+
+
+def get_extractor(name: Optional[str] = None) -> Extractor:
+    """
+    Create the extractor backend `name`. Without a name, the one chosen with
+    `set_default_extractor`, the REMIND_EXTRACTOR environment variable or readability.
+    """
+    name = name or _default_extractor or os.getenv("REMIND_EXTRACTOR") or DEFAULT_EXTRACTOR
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{name}', expected one of: {', '.join(EXTRACTORS)}")
+    module, cls = EXTRACTORS[name]
+    return getattr(importlib.import_module(module, __package__), cls)()
+
+
+_default_extractor: Optional[str] = None
+
+
+def set_default_extractor(name: Optional[str]) -> None:
+    """Use the backend `name` for every Crawler created without an explicit extractor."""
+    global _default_extractor
+    if name is not None and name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{name}', expected one of: {', '.join(EXTRACTORS)}")
+    _default_extractor = name
@@ -2,14 +2,38 @@
 
 import logging
 import os
+from typing import Optional
 
-import requests
+from .cache import CrawlCache, get_default_cache
 
 logger = logging.getLogger(__name__)
 
 
 class JinaClient:
+    def __init__(self, cache: Optional[CrawlCache] = None, session=None):
+        self.cache = cache if cache is not None else get_default_cache()
+        self._session = session
+
+    @property
+    def session(self):
+        # resolved on first crawl, so constructing the client does not import requests
+        if self._session is None:
+            from ..net.session import get_session
+            self._session = get_session()
+        return self._session
+
+    def cached(self, url: str, return_format: str = "html") -> Optional[str]:
+        """The page if the cache can answer without a request, None otherwise."""
+        entry = self.cache.lookup(url, return_format) if self.cache else None
+        if entry is not None and not entry.expired:
+            return entry.value
+        return None
+
     def crawl(self, url: str, return_format: str = "html") -> str:
+        entry = self.cache.lookup(url, return_format) if self.cache else None
+        if entry is not None and not entry.expired:
+            return entry.value
+
         headers = {
             "Content-Type": "application/json",
             "X-Return-Format": return_format,
@@ -20,6 +44,14 @@ class JinaClient:
             logger.warning(
                 "Jina API key is not set. Provide your own key to access a higher rate limit. See https://jina.ai/reader for more information."
             )
+        if entry is not None:
+            headers.update(self.cache.conditional_headers(entry))
         data = {"url": url}
-        response = requests.post("https://r.jina.ai/", headers=headers, json=data)
+        response = self.session.post("https://r.jina.ai/", headers=headers, json=data)
+
+        if entry is not None and response.status_code == 304:
+            self.cache.renew(url, return_format, response.headers)
+            return entry.value
+        if self.cache and response.ok:
+            self.cache.save(url, return_format, response.text, response.headers)
         return response.text
@@ -0,0 +1,183 @@
+# Content scoring follows the heuristics of Mozilla's Readability.js, reduced to the
+# parts that matter for feeding pages to an LLM: find the element holding most of
+# the prose, keep its siblings that look like content, drop the rest.
+
+import re
+from typing import Dict
+
+from .article import Article
+from .extractor import Extractor
+
+# elements that never hold article content
+REMOVE_TAGS = (
+    "script", "style", "noscript", "iframe", "form", "button", "input", "select",
+    "textarea", "svg", "canvas", "nav", "footer", "header", "aside", "template",
+)
+UNLIKELY = re.compile(
+    r"banner|breadcrumb|combx|comment|community|cookie|disqus|extra|footer|gdpr|header|legends|"
+    r"menu|related|remark|replies|rss|shoutbox|sidebar|skyscraper|social|sponsor|ad-break|"
+    r"agegate|pagination|pager|popup|promo|share|subscribe|newsletter",
+    re.IGNORECASE,
+)
+MAYBE = re.compile(r"and|article|body|column|content|main|shadow", re.IGNORECASE)
+POSITIVE = re.compile(
+    r"article|body|content|entry|hentry|h-entry|main|page|post|text|blog|story", re.IGNORECASE
+)
+NEGATIVE = re.compile(
+    r"-ad-|hidden|^hid$| hid$| hid |^hid |banner|combx|comment|com-|contact|foot|footer|"
+    r"footnote|masthead|media|meta|outbrain|promo|related|scroll|share|shoutbox|sidebar|"
+    r"skyscraper|sponsor|shopping|tags|tool|widget",
+    re.IGNORECASE,
+)
+SCORED_TAGS = ("p", "pre", "td", "blockquote", "h2", "h3")
+CONTAINER_TAGS = ("div", "section", "article", "main", "td", "blockquote", "body")
+KEEP_ATTRIBUTES = {"href", "src", "alt", "title", "colspan", "rowspan"}
+MIN_PARAGRAPH_CHARS = 25
+
+
+def _class_weight(element) -> int:
+    weight = 0
+    for attribute in (element.get("class"), element.get("id")):
+        if attribute:
+            if NEGATIVE.search(attribute):
+                weight -= 25
+            if POSITIVE.search(attribute):
+                weight += 25
+    return weight
+
+
+def _text_length(element) -> int:
+    return len(" ".join(element.text_content().split()))
+
+
+def _link_density(element) -> float:
+    length = _text_length(element)
+    if not length:
+        return 0.0
+    links = sum(_text_length(link) for link in element.iter("a"))
+    return links / length
+
+
+class LxmlExtractor(Extractor):
+    """In-process extraction with lxml and Readability-style content scoring, no Node.js needed."""
+
+    name = "lxml"
+
+    def _title(self, doc) -> str:
+        for query in ('//meta[@property="og:title"]/@content', "//title/text()", "//h1//text()"):
+            found = doc.xpath(query)
+            if found and found[0].strip():
+                return " ".join(found[0].split())
+        return ""
+
+    def _clean(self, doc) -> None:
+        for element in list(doc.iter(*REMOVE_TAGS)):
+            if element.getparent() is not None:
+                element.drop_tree()
+        for element in list(doc.iter()):
+            if not isinstance(element.tag, str) or element.tag in ("html", "body", "article", "main", "a"):
+                continue
+            match = f"{element.get('class', '')} {element.get('id', '')}"
+            if (
+                UNLIKELY.search(match)
+                and not MAYBE.search(match)
+                and element.getparent() is not None
+            ):
+                element.drop_tree()
+
+    def _candidate(self, doc):
+        """The container with the best score, the body when no paragraph qualifies."""
+        scores: Dict[object, float] = {}
+        for paragraph in doc.iter(*SCORED_TAGS):
+            text = " ".join(paragraph.text_content().split())
+            if len(text) < MIN_PARAGRAPH_CHARS:
+                continue
+            score = 1 + text.count(",") + min(len(text) // 100, 3)
+            parent = paragraph.getparent()
+            for ancestor, share in ((parent, 1.0), (parent.getparent() if parent is not None else None, 0.5)):
+                if ancestor is None or not isinstance(ancestor.tag, str):
+                    continue
+                if ancestor not in scores:
+                    scores[ancestor] = _class_weight(ancestor) + (5 if ancestor.tag in CONTAINER_TAGS else 0)
+                scores[ancestor] += score * share
+        if not scores:
+            return doc.find("body") if doc.find("body") is not None else doc, scores
+        for element in scores:
+            scores[element] *= 1 - _link_density(element)
+        best = max(scores, key=scores.get)
+        return self._promote(best, scores), scores
+
+    @staticmethod
+    def _promote(best, scores):
+        """
+        Content split into several sections scores in each of them. When at least three
+        candidates close to the best one share an ancestor, that ancestor is the article.
+        """
+        alternatives = [
+            element for element in sorted(scores, key=scores.get, reverse=True)[1:6]
+            if scores[element] >= 0.75 * scores[best]
+        ]
+        if len(alternatives) < 3:
+            return best
+        ancestor = best.getparent()
+        while ancestor is not None and ancestor.tag != "body":
+            contained = sum(
+                any(parent is ancestor for parent in alternative.iterancestors())
+                for alternative in alternatives
+            )
+            if contained >= 3:
+                scores.setdefault(ancestor, scores[best])
+                return ancestor
+            ancestor = ancestor.getparent()
+        return best
+
+    def _with_siblings(self, best, scores):
+        """Siblings of the top candidate that score well, or read like prose, belong to the article."""
+        parent = best.getparent()
+        if best.tag == "body" or parent is None:
+            return list(best)
+        threshold = max(10.0, scores.get(best, 0) * 0.2)
+        content = []
+        for sibling in parent:
+            if sibling is best or scores.get(sibling, 0) >= threshold:
+                content.append(sibling)
+            elif sibling.tag == "p":
+                text = " ".join(sibling.text_content().split())
+                density = _link_density(sibling)
+                if len(text) > 80 and density < 0.25:
+                    content.append(sibling)
+                elif density == 0 and re.search(r"\.( |$)", text):
+                    content.append(sibling)
+        return content
+
+    @staticmethod
+    def _strip_attributes(element) -> None:
+        for node in element.iter():
+            if not isinstance(node.tag, str):
+                continue
+            for attribute in list(node.attrib):
+                if attribute not in KEEP_ATTRIBUTES:
+                    del node.attrib[attribute]
+
+    def extract_article(self, html: str) -> Article:
+        from lxml import etree, html as lxml_html
+
+        if not html or not html.strip():
+            return Article(title="", html_content="")
+        try:
+            doc = lxml_html.document_fromstring(html)
+        except (etree.ParserError, ValueError):
+            # e.g. strings with an XML encoding declaration
+            doc = lxml_html.document_fromstring(html.encode("utf-8"))
+        title = self._title(doc)
+        self._clean(doc)
+        best, scores = self._candidate(doc)
+
+        container = lxml_html.Element("div")
+        for element in self._with_siblings(best, scores):
+            container.append(element)
+        self._strip_attributes(container)
+        return Article(
+            title=title,
+            html_content=lxml_html.tostring(container, encoding="unicode"),
+        )
@@ -0,0 +1,112 @@
+import atexit
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from .extractor import EXTRACTORS, Extractor, get_extractor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+# extractions submitted but not finished, fetchers wait once this many are queued
+DEFAULT_QUEUE_SIZE = 2 * DEFAULT_WORKERS
+
+# extractors of a worker process, created on its first page
+_worker_extractors: Dict[str, Extractor] = {}
+
+
+def extract_markdown(backend: str, html: str) -> str:
+    """Extract the article from `html` and convert it to markdown. Runs in a worker process."""
+    extractor = _worker_extractors.get(backend)
+    if extractor is None:
+        extractor = _worker_extractors[backend] = get_extractor(backend)
+    return extractor.extract_article(html).to_markdown()
+
+
+class ExtractPool:
+    """
+    The CPU-bound stage of the crawler: HTML extraction and markdown conversion on a
+    reusable pool of worker processes, so concurrent crawls are not serialized on the GIL.
+
+    At most `queue_size` pages wait for or run in the pool. Fetchers submitting more
+    block until a slot frees up, which keeps fetched HTML from piling up in memory.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(max(queue_size, workers))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                import multiprocessing
+
+                # fork is unsafe in a process running fetcher and agent threads
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def submit(self, extractor: Extractor, html: str) -> Future:
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(extract_markdown, extractor.name, html)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def to_markdown(self, extractor: Extractor, html: str) -> str:
+        """Markdown of the article in `html`, converted in the pool when `extractor` can run there."""
+        if self.workers < 1 or EXTRACTORS.get(extractor.name) is None:
+            # custom extractors may not be importable in the worker processes
+            return extractor.extract_article(html).to_markdown()
+        try:
+            return self.submit(extractor, html).result()
+        except BrokenProcessPool:
+            # a worker died, e.g. killed for memory: start a fresh pool for the next pages
+            logger.warning("Extraction worker died, restarting the process pool")
+            self.shutdown()
+            return extractor.extract_article(html).to_markdown()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_pool: Optional[ExtractPool] = None
+_pool_lock = threading.Lock()
+
+
+def configure(workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE_SIZE) -> ExtractPool:
+    """Replace the shared pool, `workers=0` extracts on the crawling thread."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ExtractPool(workers, queue_size)
+        return _pool
+
+
+def get_pool() -> ExtractPool:
+    """The process-wide pool, its worker processes start with the first extraction."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ExtractPool()
+        return _pool
+
+
+@atexit.register
+def _shutdown() -> None:
+    if _pool is not None:
+        _pool.shutdown()
@@ -1,12 +1,17 @@
 # From: https://github.com/bytedance/deer-flow/blob/main/src/crawler/readability_extractor.py
 
-from readabilipy import simple_json_from_html_string
-
 from .article import Article
+from .extractor import Extractor
+
 
+class ReadabilityExtractor(Extractor):
+    """Mozilla's Readability.js through readabilipy, which runs a Node.js process per page."""
+
+    name = "readability"
 
-class ReadabilityExtractor:
     def extract_article(self, html: str) -> Article:
+        from readabilipy import simple_json_from_html_string
+
         article = simple_json_from_html_string(html, use_readability=True)
         return Article(
             title=article.get("title"),
@@ -0,0 +1,94 @@
+# Measures what importing a ReMind module costs, using CPython's -X importtime.
+#
+#   python -m ReMind.import_budget                      # ReMind.main, default budget
+#   python -m ReMind.import_budget --budget-ms 80 --top 15
+#   python -m ReMind.import_budget --module ReMind.state_machine
+#
+# Exits with status 1 when the cumulative import time exceeds the budget, so it
+# can guard startup time in scripts and CI.
+
+import argparse
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List
+
+DEFAULT_BUDGET_MS = 150
+# libraries that must only be imported when they are actually used
+LAZY_PACKAGES = (
+    "openai",
+    "anthropic",
+    "rich",
+    "pyfiglet",
+    "pydantic",
+    "jinja2",
+    "requests",
+    "readabilipy",
+    "markdownify",
+    "dotenv",
+    "numpy",
+    "lxml",
+)
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def measure(module: str) -> List[ImportRecord]:
+    """Import `module` in a fresh interpreter and parse its -X importtime report."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr}")
+    records = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        records.append(
+            ImportRecord(
+                module=name.strip(),
+                self_us=int(self_us),
+                cumulative_us=int(cumulative_us),
+                depth=(len(name) - len(name.lstrip())) // 2,
+            )
+        )
+    return records
+
+
+def report(module: str, budget_ms: float, top: int) -> bool:
+    records = measure(module)
+    target = next((r for r in records if r.module == module), None)
+    total_ms = target.cumulative_us / 1000 if target else 0.0
+    loaded = {r.module.split(".")[0] for r in records}
+
+    print(f"import {module}: {total_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+    print(f"\nslowest {top} modules by self time:")
+    for record in sorted(records, key=lambda r: r.self_us, reverse=True)[:top]:
+        print(f"  {record.self_us / 1000:8.1f} ms  {record.module}")
+
+    eager = [package for package in LAZY_PACKAGES if package in loaded]
+    if eager:
+        print(f"\nimported eagerly (expected to be lazy): {', '.join(eager)}")
+
+    within_budget = total_ms <= budget_ms
+    print("\nOK" if within_budget else "\nOVER BUDGET")
+    return within_budget
+
+
+if __name__ == "__main__":
+    package = __package__ or "ReMind"
+    parser = argparse.ArgumentParser(description="Report the import time of a ReMind module")
+    parser.add_argument("--module", type=str, default=f"{package}.main", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Cumulative import time budget in milliseconds")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest modules to list")
+    args = parser.parse_args()
+    sys.exit(0 if report(args.module, args.budget_ms, args.top) else 1)
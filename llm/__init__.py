@@ -1,3 +1,9 @@
-from .llm import OpenAIClient, AnthropicClient, get_client
+from .cache import CachedLLMClient
+from .usage import Usage
+from .context import ContextBudget, count_tokens
+from .governor import Governor, get_governor
+from .policy import CallPolicy, LatencyHistogram
+from .ledger import UsageLedger, Price
+from .llm import LLMClient, OpenAIClient, AnthropicClient, get_client, agenerate, generate_stream, agenerate_stream
 
-__all__ = ['OpenAIClient', 'AnthropicClient', 'get_client']
+__all__ = ['ContextBudget', 'count_tokens', 'Governor', 'get_governor', 'CallPolicy', 'LatencyHistogram', 'UsageLedger', 'Price', 'LLMClient', 'Usage', 'OpenAIClient', 'AnthropicClient', 'CachedLLMClient', 'get_client', 'agenerate', 'generate_stream', 'agenerate_stream']
@@ -0,0 +1,103 @@
+import hashlib
+import json
+from typing import AsyncIterator, Dict, Iterator, List, Union
+from ..cache.sqlite_cache import SQLiteCache
+from ..state import State
+
+DEFAULT_CACHE_PATH = ".remind_cache/llm.sqlite"
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class CachedLLMClient:
+    """
+    Wraps an OpenAIClient or AnthropicClient and answers repeated requests from a
+    persistent cache. Entries are addressed by a hash of the full request the client
+    would send: model, built message list, stop sequences and sampling params.
+
+    Streams of callers that pass `partial_ok` (the ReAct agents, which cut a turn off
+    after its action) are stored as partial entries when the caller stops reading, and
+    only replayed to such callers. Other streams stopped early are not cached.
+    """
+
+    def __init__(self, client, cache: SQLiteCache):
+        self.client = client
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _key(
+            self,
+            query: Union[str, List[Dict[str, str]]],
+            system_prompt: str = "",
+            state: State = None,
+            stop: List[str] = []) -> str:
+        request = self.client._request(query, system_prompt, state, stop)
+        payload = json.dumps(request, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str, partial_ok: bool):
+        entry = self.cache.get_entry(
+            key, accept=lambda entry: partial_ok or not entry.meta.get("partial")
+        )
+        return entry.value if entry else None
+
+    def generate(self, query: Union[str, List[Dict[str, str]]], system_prompt: str = "", state: State = None, stop: List[str] = []) -> str:
+        key = self._key(query, system_prompt, state, stop)
+        response = self._lookup(key, partial_ok=False)
+        if response is None:
+            response = self.client.generate(query, system_prompt, state, stop)
+            self.cache.set(key, response)
+        return response
+
+    invoke = generate
+
+    async def agenerate(self, query: Union[str, List[Dict[str, str]]], system_prompt: str = "", state: State = None, stop: List[str] = []) -> str:
+        key = self._key(query, system_prompt, state, stop)
+        response = self._lookup(key, partial_ok=False)
+        if response is None:
+            response = await self.client.agenerate(query, system_prompt, state, stop)
+            self.cache.set(key, response)
+        return response
+
+    ainvoke = agenerate
+
+    def generate_stream(self, query: Union[str, List[Dict[str, str]]], system_prompt: str = "", state: State = None, stop: List[str] = [], partial_ok: bool = False) -> Iterator[str]:
+        key = self._key(query, system_prompt, state, stop)
+        response = self._lookup(key, partial_ok)
+        if response is not None:
+            yield response
+            return
+        chunks = []
+        try:
+            for chunk in self.client.generate_stream(query, system_prompt, state, stop):
+                chunks.append(chunk)
+                yield chunk
+        except GeneratorExit:
+            # the consumer cut the stream off, which it reproduces from the prefix
+            if partial_ok and chunks:
+                self.cache.set(key, "".join(chunks), meta={"partial": True})
+            raise
+        self.cache.set(key, "".join(chunks))
+
+    async def agenerate_stream(self, query: Union[str, List[Dict[str, str]]], system_prompt: str = "", state: State = None, stop: List[str] = [], partial_ok: bool = False) -> AsyncIterator[str]:
+        key = self._key(query, system_prompt, state, stop)
+        response = self._lookup(key, partial_ok)
+        if response is not None:
+            yield response
+            return
+        chunks = []
+        try:
+            async for chunk in self.client.agenerate_stream(query, system_prompt, state, stop):
+                chunks.append(chunk)
+                yield chunk
+        except GeneratorExit:
+            # the consumer cut the stream off, which it reproduces from the prefix
+            if partial_ok and chunks:
+                self.cache.set(key, "".join(chunks), meta={"partial": True})
+            raise
+        self.cache.set(key, "".join(chunks))
+
+    def stats(self) -> Dict[str, float]:
+        return self.cache.stats()
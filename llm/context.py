@@ -0,0 +1,140 @@
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# per-call prompt budgets, in tokens, including the system prompt
+DEFAULT_BUDGETS = {
+    "planner": 16000,
+    "researcher": 24000,
+    "coder": 24000,
+    "reporter": 48000,
+}
+DEFAULT_MAX_TOKENS = 24000
+# chat formats add a few tokens of role and separator markup per message
+MESSAGE_OVERHEAD = 4
+# observations the agent can do without: failed tool calls and given-up steps
+LOW_VALUE = re.compile(
+    r"Error executing tool|Error: Tool '|Failed to crawl|unable to complete the task"
+)
+TRUNCATED = "\n... [truncated to fit the context budget]"
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of `text` without a provider tokenizer.
+
+    ASCII text averages about four characters per token on both OpenAI and
+    Anthropic tokenizers, other scripts are closer to one token per character.
+    Counts are cached, observations are counted again on every call of a step.
+    """
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Keep the head of `text`, which carries titles and the most relevant part of a page."""
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    keep = max(0, len(text) * max_tokens // tokens - len(TRUNCATED))
+    return text[:keep] + TRUNCATED
+
+
+class ContextBudget:
+    """
+    Bounds the prompt size of an LLM call.
+
+    The first `keep_first` messages (the task) and the last `keep_last` messages
+    (the latest turns) are kept. When the messages do not fit, the others are
+    shortened to `truncate_to` tokens, oldest and lowest-value first, and then
+    dropped behind a single note. Messages that fit are returned unchanged, so
+    calls below the budget keep their cacheable prompt prefix.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        keep_first: int = 1,
+        keep_last: int = 2,
+        truncate_to: int = 1000,
+    ):
+        self.max_tokens = max_tokens
+        self.keep_first = keep_first
+        self.keep_last = keep_last
+        self.truncate_to = truncate_to
+        self.truncated = 0
+        self.dropped = 0
+
+    @staticmethod
+    def message_tokens(message: Dict[str, str]) -> int:
+        content = message.get("content", "")
+        if not isinstance(content, str):
+            content = str(content)
+        return count_tokens(content) + MESSAGE_OVERHEAD
+
+    def total(self, messages: List[Dict[str, str]], system_prompt: str = "") -> int:
+        return count_tokens(system_prompt) + sum(map(self.message_tokens, messages))
+
+    def _drop_order(self, messages: List[Dict[str, str]]) -> List[int]:
+        """Indices that may be shortened or dropped, lowest value and oldest first."""
+        last = max(self.keep_first, len(messages) - self.keep_last)
+        candidates = range(self.keep_first, last)
+        return sorted(
+            candidates,
+            key=lambda i: (not LOW_VALUE.search(str(messages[i].get("content", ""))[:300]), i),
+        )
+
+    def fit(
+        self, messages: List[Dict[str, str]], system_prompt: str = ""
+    ) -> List[Dict[str, str]]:
+        """The messages to send, within `max_tokens` whenever the kept messages allow it."""
+        total = self.total(messages, system_prompt)
+        if total <= self.max_tokens:
+            return messages
+
+        fitted: List[Optional[Dict[str, str]]] = list(messages)
+        order = self._drop_order(messages)
+        for i in order:
+            if total <= self.max_tokens:
+                break
+            before = self.message_tokens(fitted[i])
+            if before - MESSAGE_OVERHEAD <= self.truncate_to:
+                continue
+            fitted[i] = {**fitted[i], "content": truncate_tokens(fitted[i]["content"], self.truncate_to)}
+            total -= before - self.message_tokens(fitted[i])
+            self.truncated += 1
+
+        dropped = 0
+        for i in order:
+            if total <= self.max_tokens:
+                break
+            total -= self.message_tokens(fitted[i])
+            fitted[i] = None
+            dropped += 1
+        self.dropped += dropped
+
+        if dropped:
+            note = {
+                "role": "user",
+                "content": f"[{dropped} earlier messages were omitted to fit the context budget]",
+            }
+            first = fitted.index(None)
+            fitted[first] = note
+            total += self.message_tokens(note)
+        if total > self.max_tokens:
+            logger.warning(
+                f"Prompt of {total} tokens exceeds the context budget of {self.max_tokens} tokens"
+            )
+        return [message for message in fitted if message is not None]
+
+    def stats(self) -> Dict[str, int]:
+        return {"truncated": self.truncated, "dropped": self.dropped}
+
+
+def default_budget(agent_name: str, max_tokens: Optional[int] = None) -> ContextBudget:
+    """The budget of an agent, `max_tokens` overrides its default size."""
+    return ContextBudget(max_tokens or DEFAULT_BUDGETS.get(agent_name, DEFAULT_MAX_TOKENS))
@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from .context import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# concurrent calls per model before the provider has told us anything
+DEFAULT_CONCURRENCY = int(os.getenv("REMIND_LLM_CONCURRENCY", 8))
+MAX_CONCURRENCY = 64
+# per minute budgets, learned from the rate limit headers when not configured
+DEFAULT_RPM = int(os.getenv("REMIND_LLM_RPM", 0)) or None
+DEFAULT_TPM = int(os.getenv("REMIND_LLM_TPM", 0)) or None
+# 429s of one burst arrive together, they count as one signal to halve concurrency
+DECREASE_COOLDOWN = 2.0
+DECREASE_FACTOR = 0.5
+
+DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds until a reset given as "6m0s"/"20ms" (OpenAI) or an RFC 3339 time (Anthropic)."""
+    if not value:
+        return None
+    if "T" in value:
+        try:
+            reset = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return max(0.0, reset.timestamp() - time.time())
+    parts = DURATION.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def parse_rate_limits(headers) -> Dict[str, Tuple[Optional[int], Optional[int], Optional[float]]]:
+    """(limit, remaining, seconds to reset) of the request and token budgets in `headers`."""
+    limits = {}
+    for kind, openai_name, anthropic_names in (
+        ("requests", "requests", ("requests",)),
+        ("tokens", "tokens", ("tokens", "input-tokens")),
+    ):
+        limit = _int(headers.get(f"x-ratelimit-limit-{openai_name}"))
+        if limit is not None:
+            limits[kind] = (
+                limit,
+                _int(headers.get(f"x-ratelimit-remaining-{openai_name}")),
+                parse_duration(headers.get(f"x-ratelimit-reset-{openai_name}")),
+            )
+            continue
+        for name in anthropic_names:
+            limit = _int(headers.get(f"anthropic-ratelimit-{name}-limit"))
+            if limit is not None:
+                limits[kind] = (
+                    limit,
+                    _int(headers.get(f"anthropic-ratelimit-{name}-remaining")),
+                    parse_duration(headers.get(f"anthropic-ratelimit-{name}-reset")),
+                )
+                break
+    return limits
+
+
+def estimate_tokens(request: Dict[str, Any]) -> int:
+    """Prompt tokens of a provider request, as counted for the budget before it is sent."""
+
+    def text(content) -> str:
+        if isinstance(content, str):
+            return content
+        if isinstance(content, list):
+            return " ".join(block.get("text", "") for block in content if isinstance(block, dict))
+        return ""
+
+    tokens = count_tokens(text(request.get("system")))
+    for message in request.get("messages", []):
+        tokens += count_tokens(text(message.get("content")))
+    return tokens
+
+
+class TokenBucket:
+    """
+    Budget of `per_minute` units refilling continuously, unlimited while unknown.
+    Reservations may overdraw it; the callers after them wait until it refills.
+    """
+
+    def __init__(self, per_minute: Optional[int] = None):
+        self.capacity: Optional[float] = None
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        if per_minute:
+            self.capacity = self.level = float(per_minute)
+
+    def _refill(self, now: float) -> None:
+        if self.capacity is not None:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount`, returns how long the caller has to wait for it."""
+        self._refill(now)
+        delay = max(0.0, self.paused_until - now)
+        if self.capacity is None:
+            return delay
+        self.level -= min(amount, self.capacity)
+        if self.level < 0:
+            delay = max(delay, -self.level * 60 / self.capacity)
+        return delay
+
+    def charge(self, amount: float, now: float) -> None:
+        """Take `amount` used after the fact, e.g. output tokens."""
+        self._refill(now)
+        if self.capacity is not None:
+            self.level -= amount
+
+    def sync(self, limit: int, remaining: Optional[int], reset: Optional[float], now: float) -> None:
+        """Adopt the provider's view: its limit, and never more left than it reports."""
+        self._refill(now)
+        if self.capacity is None:
+            self.level = float(limit)
+        self.capacity = float(limit)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+            if remaining == 0 and reset:
+                self.paused_until = max(self.paused_until, now + reset)
+
+    def pause(self, seconds: float, now: float) -> None:
+        self.paused_until = max(self.paused_until, now + seconds)
+
+
+class _Waiter:
+    """A caller queued for a concurrency slot, woken from whichever thread releases one."""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def grant(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class Governor:
+    """
+    Admission control for the LLM calls of one model, shared by every thread, event
+    loop and agent of the process.
+
+    Calls wait for a concurrency slot, then for their request and prompt tokens in
+    per-minute token buckets; output tokens are charged once the usage is known. The
+    buckets adopt the limits and remaining budgets of the provider's rate limit
+    headers. Concurrency grows by one slot per window of successful calls while it
+    is the bottleneck and halves on a 429 (AIMD), which also pauses all calls for the
+    requested retry-after. Retries are up to the CallPolicy of the client.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        requests_per_minute: Optional[int] = DEFAULT_RPM,
+        tokens_per_minute: Optional[int] = DEFAULT_TPM,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        min_concurrency: int = 1,
+        max_concurrency: int = MAX_CONCURRENCY,
+    ):
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.limit = float(concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.rate_limited = 0
+        self.waited = 0.0
+        self._waiters = deque()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    # concurrency slots
+
+    def _enter(self, waiter: Optional[_Waiter]) -> bool:
+        """Take a free slot, or queue `waiter` for the next one. Called with the lock held."""
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        if waiter is not None:
+            self._waiters.append(waiter)
+        return False
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self._waiters.popleft().grant()
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            delay = max(self.requests.reserve(1, now), self.tokens.reserve(tokens, now))
+            self.waited += delay
+            return delay
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until a call with `tokens` prompt tokens may start."""
+        waiter = _Waiter()
+        with self._lock:
+            admitted = self._enter(waiter)
+        if not admitted:
+            waiter.event.wait()
+        delay = self._reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        waiter = _Waiter(asyncio.get_running_loop())
+        with self._lock:
+            admitted = self._enter(waiter)
+        if not admitted:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                        raise
+                # the slot was granted as the caller was cancelled
+                self.release(success=False)
+                raise
+        delay = self._reserve(tokens)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.release(success=False)
+                raise
+
+    def release(self, success: bool = True) -> None:
+        with self._lock:
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            if success and saturated:
+                # additive increase: one more slot per window of successful calls
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._wake()
+
+    # feedback
+
+    def observe(self, headers) -> None:
+        """Take over the limits and remaining budgets reported in response headers."""
+        limits = parse_rate_limits(headers)
+        if not limits:
+            return
+        with self._lock:
+            now = time.monotonic()
+            for kind, (limit, remaining, reset) in limits.items():
+                bucket = self.requests if kind == "requests" else self.tokens
+                bucket.sync(limit, remaining, reset, now)
+
+    def charge(self, output_tokens: int) -> None:
+        with self._lock:
+            self.tokens.charge(output_tokens, time.monotonic())
+
+    def on_rate_limited(self, delay: float) -> None:
+        """A call was rate limited: pause new calls for `delay` and halve the concurrency."""
+        with self._lock:
+            now = time.monotonic()
+            self.rate_limited += 1
+            self.requests.pause(delay, now)
+            if now - self._last_decrease > DECREASE_COOLDOWN:
+                # multiplicative decrease
+                self.limit = max(self.min_concurrency, self.limit * DECREASE_FACTOR)
+                self._last_decrease = now
+                logger.warning(f"{self.model}: rate limited, concurrency down to {int(self.limit)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "concurrency": int(self.limit),
+                "in_flight": self.in_flight,
+                "queued": len(self._waiters),
+                "rpm": self.requests.capacity,
+                "tpm": self.tokens.capacity,
+                "rate_limited": self.rate_limited,
+                "waited_seconds": round(self.waited, 3),
+            }
+
+
+_governors: Dict[str, Governor] = {}
+_defaults: Dict[str, Any] = {}
+_governors_lock = threading.Lock()
+
+
+def configure(**defaults: Any) -> None:
+    """Settings of the governors created from now on, see Governor."""
+    global _defaults
+    with _governors_lock:
+        _defaults = dict(defaults)
+        _governors.clear()
+
+
+def get_governor(model: str) -> Governor:
+    """The process-wide governor of `model`, shared by all clients of that model."""
+    with _governors_lock:
+        governor = _governors.get(model)
+        if governor is None:
+            governor = _governors[model] = Governor(model, **_defaults)
+        return governor
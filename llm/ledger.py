@@ -0,0 +1,238 @@
+import contextvars
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .usage import Usage
+
+# JSON file of {model: {"input": ..., "output": ..., "cached_input": ..., "cache_write": ...}}
+# in USD per million tokens, merged over PRICES
+PRICES_PATH = os.getenv("REMIND_PRICES")
+ATTRIBUTION = ("node", "agent", "step")
+# dated snapshots share the price of their model, e.g. gpt-4o-2024-08-06 or claude-3-5-sonnet-20241022
+SNAPSHOT = re.compile(r"-(\d{4}-\d{2}-\d{2}|\d{8})$")
+
+
+@dataclass
+class Price:
+    """USD per million tokens. Cached input defaults to the input price, cache writes too."""
+
+    input: float
+    output: float
+    cached_input: Optional[float] = None
+    cache_write: Optional[float] = None
+
+    def cost(self, usage: Usage) -> float:
+        uncached = max(0, usage.input_tokens - usage.cached_tokens - usage.cache_write_tokens)
+        cached_input = self.input if self.cached_input is None else self.cached_input
+        cache_write = self.input if self.cache_write is None else self.cache_write
+        return (
+            uncached * self.input
+            + usage.cached_tokens * cached_input
+            + usage.cache_write_tokens * cache_write
+            + usage.output_tokens * self.output
+        ) / 1e6
+
+
+# list prices, by model name without the snapshot date
+PRICES: Dict[str, Price] = {
+    "gpt-4.1": Price(2.00, 8.00, 0.50),
+    "gpt-4.1-mini": Price(0.40, 1.60, 0.10),
+    "gpt-4.1-nano": Price(0.10, 0.40, 0.025),
+    "gpt-4o": Price(2.50, 10.00, 1.25),
+    "gpt-4o-mini": Price(0.15, 0.60, 0.075),
+    "o3": Price(2.00, 8.00, 0.50),
+    "o4-mini": Price(1.10, 4.40, 0.275),
+    "claude-3-haiku": Price(0.25, 1.25, 0.03, 0.30),
+    "claude-3-5-haiku": Price(0.80, 4.00, 0.08, 1.00),
+    "claude-3-sonnet": Price(3.00, 15.00, 0.30, 3.75),
+    "claude-3-5-sonnet": Price(3.00, 15.00, 0.30, 3.75),
+    "claude-3-7-sonnet": Price(3.00, 15.00, 0.30, 3.75),
+    "claude-sonnet-4": Price(3.00, 15.00, 0.30, 3.75),
+    "claude-3-opus": Price(15.00, 75.00, 1.50, 18.75),
+    "claude-opus-4": Price(15.00, 75.00, 1.50, 18.75),
+}
+
+
+def load_prices(path: str) -> Dict[str, Price]:
+    """PRICES with the entries of the JSON price file at `path` added or replaced."""
+    with open(path, encoding="utf-8") as f:
+        overrides = json.load(f)
+    return {**PRICES, **{model: Price(**price) for model, price in overrides.items()}}
+
+
+def price_for(model: str, prices: Dict[str, Price]) -> Optional[Price]:
+    """
+    The price of `model`, or of the model it is a dated snapshot of. Other variants,
+    e.g. gpt-4o-audio-preview, are unpriced rather than billed at a different model's rate.
+    """
+    if model in prices:
+        return prices[model]
+    return prices.get(SNAPSHOT.sub("", model))
+
+
+@dataclass
+class LedgerEntry:
+    calls: int = 0
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    cache_write_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+    # calls of models without a price, not included in `cost`
+    unpriced_calls: int = 0
+    # calls whose usage was counted locally, see Usage.estimated
+    estimated_calls: int = 0
+
+    def add(self, other: "LedgerEntry") -> None:
+        for field in fields(self):
+            setattr(self, field.name, getattr(self, field.name) + getattr(other, field.name))
+
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        entry = asdict(self)
+        entry["cost"] = round(self.cost, 6)
+        entry["cache_hit_rate"] = round(self.cache_hit_rate, 4)
+        return entry
+
+
+class UsageLedger:
+    """
+    Token usage and estimated cost of the LLM calls of one run, by the node, agent and
+    plan step that made them and by model.
+
+    Calls are recorded by the clients into the ledger active in their context (see
+    `active`) and attributed to the enclosing `attribute` blocks; contexts are copied
+    into the step and hedging threads and asyncio tasks, so the attribution follows
+    the work. Calls answered from the LLM cache cost nothing and are not recorded.
+    """
+
+    def __init__(self, prices: Optional[Dict[str, Price]] = None):
+        self.prices = prices if prices is not None else get_prices()
+        self.entries: Dict[Tuple[str, str, str, str], LedgerEntry] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, usage: Usage, node: str = "", agent: str = "", step: str = "") -> None:
+        price = price_for(model, self.prices)
+        entry = LedgerEntry(
+            calls=1,
+            input_tokens=usage.input_tokens,
+            cached_tokens=usage.cached_tokens,
+            cache_write_tokens=usage.cache_write_tokens,
+            output_tokens=usage.output_tokens,
+            cost=price.cost(usage) if price is not None else 0.0,
+            unpriced_calls=0 if price is not None else 1,
+            estimated_calls=int(usage.estimated),
+        )
+        with self._lock:
+            self.entries.setdefault((node, agent, step, model), LedgerEntry()).add(entry)
+
+    @contextmanager
+    def active(self) -> Iterator["UsageLedger"]:
+        """Record the LLM calls made inside the block, and in the work it starts, here."""
+        token = _ledger.set(self)
+        try:
+            yield self
+        finally:
+            _ledger.reset(token)
+
+    def by(self, field: str) -> Dict[str, LedgerEntry]:
+        """Totals by one of "node", "agent", "step" or "model"."""
+        position = (*ATTRIBUTION, "model").index(field)
+        totals: Dict[str, LedgerEntry] = {}
+        with self._lock:
+            for key, entry in self.entries.items():
+                totals.setdefault(key[position], LedgerEntry()).add(entry)
+        return totals
+
+    def total(self) -> LedgerEntry:
+        total = LedgerEntry()
+        with self._lock:
+            for entry in self.entries.values():
+                total.add(entry)
+        return total
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = [
+                {"node": node, "agent": agent, "step": step, "model": model, **entry.to_dict()}
+                for (node, agent, step, model), entry in self.entries.items()
+            ]
+        return {
+            "total": self.total().to_dict(),
+            **{
+                f"by_{field}": {name: entry.to_dict() for name, entry in self.by(field).items()}
+                for field in (*ATTRIBUTION, "model")
+            },
+            "entries": entries,
+        }
+
+    def load(self, ledger: Dict[str, Any]) -> None:
+        """Add the entries of a ledger saved with `to_dict`, e.g. on resume."""
+        names = [field.name for field in fields(LedgerEntry)]
+        with self._lock:
+            for saved in ledger.get("entries", []):
+                key = (saved["node"], saved["agent"], saved["step"], saved["model"])
+                entry = LedgerEntry(**{name: saved.get(name, 0) for name in names})
+                self.entries.setdefault(key, LedgerEntry()).add(entry)
+
+    def write(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+_ledger: contextvars.ContextVar[Optional[UsageLedger]] = contextvars.ContextVar("usage_ledger", default=None)
+_attribution: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("usage_attribution", default={})
+
+
+@contextmanager
+def attribute(**attribution: str) -> Iterator[None]:
+    """Attribute the LLM calls inside the block to a node, agent and/or plan step."""
+    token = _attribution.set({**_attribution.get(), **attribution})
+    try:
+        yield
+    finally:
+        _attribution.reset(token)
+
+
+def record_usage(model: str, usage: Usage) -> None:
+    """Record a call in the active ledger, if any. Calls outside an agent count for their node."""
+    ledger = _ledger.get()
+    if ledger is None:
+        return
+    attribution = _attribution.get()
+    node = attribution.get("node", "")
+    ledger.record(
+        model,
+        usage,
+        node=node,
+        agent=attribution.get("agent") or node.lower(),
+        step=attribution.get("step", ""),
+    )
+
+
+_prices: Optional[Dict[str, Price]] = None
+_prices_lock = threading.Lock()
+
+
+def configure(prices_path: Optional[str] = None) -> None:
+    """Use the price file at `prices_path` for the ledgers created from now on."""
+    global _prices
+    with _prices_lock:
+        _prices = load_prices(prices_path) if prices_path else None
+
+
+def get_prices() -> Dict[str, Price]:
+    global _prices
+    with _prices_lock:
+        if _prices is None:
+            _prices = load_prices(PRICES_PATH) if PRICES_PATH else dict(PRICES)
+        return _prices
@@ -1,9 +1,26 @@
 from ..state import State
-from openai import OpenAI
-from anthropic import Anthropic
-from typing import Union, List, Dict
+from ..cache.sqlite_cache import SQLiteCache
+from .cache import CachedLLMClient
+from .usage import Usage
+from .governor import Governor, estimate_tokens, get_governor
+from .context import count_tokens
+from .policy import CallPolicy, get_latency, get_policy
+from .ledger import record_usage
+from .. import tracing
+from typing import AsyncIterator, Callable, Iterator, Tuple, Union, List, Dict
+from abc import ABC, abstractmethod
+import asyncio
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
+# Prompt layout for provider prefix caching: the static system prompt always comes
+# first and dynamic content is only ever appended after it, so consecutive calls of
+# an agent share a byte-identical prefix. OpenAI caches such prefixes automatically,
+# Anthropic needs explicit `cache_control` breakpoints.
+CACHE_CONTROL = {"type": "ephemeral"}
+
 
 def MessageGPT(query: Union[str, List[Dict[str, str]]], 
                system_prompt : str =  "", 
@@ -22,11 +39,9 @@ def MessageGPT(query: Union[str, List[Dict[str, str]]],
 
 
 def MessageClaude(query: Union[str, List[Dict[str, str]]], 
-                  system_prompt : str =  "", 
                   state : State = None)-> List[Dict[str, str]]:
+    """Messages for the Anthropic API, which takes the system prompt as a separate parameter."""
     messages = []
-    if system_prompt:
-        messages.append({"role" : "assistant", "content" : system_prompt})
     if isinstance(query, List):
         messages.extend(query)
     elif query:
@@ -37,47 +52,345 @@ def MessageClaude(query: Union[str, List[Dict[str, str]]],
     return messages
 
 
-class OpenAIClient:
-    def __init__(self, model : str = "gpt-4o"):
-        OPEN_AI_KEY = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=OPEN_AI_KEY)
+def with_cache_breakpoint(messages: List[Dict]) -> List[Dict]:
+    """
+    Mark the last message as the end of the cacheable prefix. Agents only append to
+    their transcripts, so the next call reads everything up to this point from cache.
+    """
+    if not messages or not isinstance(messages[-1].get("content"), str):
+        return messages
+    last = messages[-1]
+    block = {"type": "text", "text": last["content"], "cache_control": CACHE_CONTROL}
+    return messages[:-1] + [{**last, "content": [block]}]
+
+
+class LLMClient(ABC):
+    """
+    Shared call path of the provider clients. Subclasses build the request and talk
+    to their SDK; usage of every call is logged, recorded in the run's UsageLedger
+    and passed to `usage_listeners`.
+    Every call goes through the process-wide governor of the model, which paces
+    calls within the provider's rate limits, and is attempted, retried and hedged
+    according to the client's CallPolicy. Latencies are recorded per model.
+    """
+
+    def __init__(self, model: str, governor: Governor = None, policy: CallPolicy = None):
         self.model = model
+        self.governor = governor or get_governor(model)
+        self.policy = policy or get_policy()
+        self.latency = get_latency(model)
+        self.usage_listeners: List[Callable[["LLMClient", Usage], None]] = []
+
+    @abstractmethod
+    def _request(
+            self, 
+            query : Union[str, List[Dict[str, str]]], 
+            system_prompt : str = "", 
+            state : State = None, 
+            stop : List[str] = []) -> Dict:
+        pass
+
+    @abstractmethod
+    def _create(self, request: Dict, timeout: float) -> Tuple[str, Usage]:
+        pass
+
+    @abstractmethod
+    async def _acreate(self, request: Dict, timeout: float) -> Tuple[str, Usage]:
+        pass
+
+    @abstractmethod
+    def _stream(self, request: Dict, timeout: float) -> Iterator[str]:
+        """Yield text chunks and report the usage the provider sent, even if closed early."""
+
+    @abstractmethod
+    async def _astream(self, request: Dict, timeout: float) -> AsyncIterator[str]:
+        pass
+
+    def _report_usage(self, usage: Usage) -> None:
+        logger.info(f"{self.model}: {usage}")
+        self.governor.charge(usage.output_tokens)
+        span = tracing.current_span()
+        # the losing attempt of a hedged call may finish after its span ended
+        if span is not None and span.category == "llm" and span.end_ns is None:
+            span.set(
+                input_tokens=usage.input_tokens,
+                output_tokens=usage.output_tokens,
+                cached_tokens=usage.cached_tokens,
+                **({"estimated": True} if usage.estimated else {}),
+            )
+        record_usage(self.model, usage)
+        for listener in self.usage_listeners:
+            listener(self, usage)
+
+    def generate(self, 
+               query : Union[str, List[Dict[str, str]]], 
+               system_prompt : str = "", 
+               state : State = None, 
+               stop : List[str] = []) -> str:
+        request = self._request(query, system_prompt, state, stop)
+        with tracing.span("llm", "llm", model=self.model):
+            text, usage = self.policy.call(
+                self.governor,
+                self.latency,
+                lambda timeout: self._create(request, timeout),
+                estimate_tokens(request),
+                discard=lambda result: self._report_usage(result[1]),
+            )
+            self._report_usage(usage)
+        return text
+
+    async def agenerate(self, 
+               query : Union[str, List[Dict[str, str]]], 
+               system_prompt : str = "", 
+               state : State = None, 
+               stop : List[str] = []) -> str:
+        request = self._request(query, system_prompt, state, stop)
+
+        async def discard(result: Tuple[str, Usage]) -> None:
+            self._report_usage(result[1])
+
+        with tracing.span("llm", "llm", model=self.model):
+            text, usage = await self.policy.acall(
+                self.governor,
+                self.latency,
+                lambda timeout: self._acreate(request, timeout),
+                estimate_tokens(request),
+                discard=discard,
+            )
+            self._report_usage(usage)
+        return text
+
+    def generate_stream(self, 
+               query : Union[str, List[Dict[str, str]]], 
+               system_prompt : str = "", 
+               state : State = None, 
+               stop : List[str] = []) -> Iterator[str]:
+        """Yield the completion text as it arrives. Closing the generator closes the connection."""
+        request = self._request(query, system_prompt, state, stop)
+        # current only while the stream runs, not while the consumer handles its chunks
+        span = tracing.start_span("llm", "llm", model=self.model, stream=True)
+        yield from tracing.traced_iter(span, self.policy.stream(
+            self.governor, self.latency, lambda timeout: self._stream(request, timeout), estimate_tokens(request)
+        ))
+
+    async def agenerate_stream(self, 
+               query : Union[str, List[Dict[str, str]]], 
+               system_prompt : str = "", 
+               state : State = None, 
+               stop : List[str] = []) -> AsyncIterator[str]:
+        request = self._request(query, system_prompt, state, stop)
+        span = tracing.start_span("llm", "llm", model=self.model, stream=True)
+        async for text in tracing.atraced_iter(span, self.policy.astream(
+            self.governor, self.latency, lambda timeout: self._astream(request, timeout), estimate_tokens(request)
+        )):
+            yield text
+
+
+class OpenAIClient(LLMClient):
+    def __init__(self, model : str = "gpt-4o"):
+        super().__init__(model)
+        # the SDK is only imported once a client for this provider is needed
+        from openai import OpenAI
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        # retries are up to the call policy, and the governor has to see every 429
+        self.client = OpenAI(api_key=self.api_key, max_retries=0)
+        self._async_client = None
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        return self._async_client
 
-    def invoke(
+    def _request(
             self, 
             query : Union[str, List[Dict[str, str]]], 
             system_prompt : str = "", 
             state : State = None, 
-            stop : List[str] = []) -> str:
+            stop : List[str] = []) -> Dict:
+        # OpenAI caches prompt prefixes automatically, the system prompt leads the list
         message = MessageGPT(query, system_prompt, state)
-        response = self.client.chat.completions.create(model=self.model, messages=message, stop=stop)
-        return response.choices[0].message.content
-    
-    def generate(self, query: Union[str, List[Dict[str, str]]], system_prompt: str = "", state: State = None, stop: List[str] = []) -> str:
-        """Alias for invoke method for compatibility."""
-        return self.invoke(query, system_prompt, state, stop)
+        return {"model": self.model, "messages": message, "stop": stop}
+
+    def _create(self, request: Dict, timeout: float) -> Tuple[str, Usage]:
+        raw = self.client.chat.completions.with_raw_response.create(**request, timeout=timeout)
+        self.governor.observe(raw.headers)
+        response = raw.parse()
+        return response.choices[0].message.content, Usage.from_openai(response.usage)
+
+    async def _acreate(self, request: Dict, timeout: float) -> Tuple[str, Usage]:
+        raw = await self.async_client.chat.completions.with_raw_response.create(**request, timeout=timeout)
+        self.governor.observe(raw.headers)
+        response = raw.parse()
+        return response.choices[0].message.content, Usage.from_openai(response.usage)
+
+    @staticmethod
+    def _estimated_usage(request: Dict, texts: List[str]) -> Usage:
+        return Usage(
+            input_tokens=estimate_tokens(request),
+            output_tokens=count_tokens("".join(texts)),
+            estimated=True,
+        )
+
+    def _stream(self, request: Dict, timeout: float) -> Iterator[str]:
+        # usage arrives in a final chunk, so streams closed early report an estimate
+        stream = self.client.chat.completions.create(**request, stream=True, stream_options={"include_usage": True}, timeout=timeout)
+        self.governor.observe(stream.response.headers)
+        texts, reported = [], False
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    texts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+                if chunk.usage:
+                    self._report_usage(Usage.from_openai(chunk.usage))
+                    reported = True
+        finally:
+            stream.close()
+            if not reported:
+                self._report_usage(self._estimated_usage(request, texts))
+
+    async def _astream(self, request: Dict, timeout: float) -> AsyncIterator[str]:
+        stream = await self.async_client.chat.completions.create(**request, stream=True, stream_options={"include_usage": True}, timeout=timeout)
+        self.governor.observe(stream.response.headers)
+        texts, reported = [], False
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    texts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+                if chunk.usage:
+                    self._report_usage(Usage.from_openai(chunk.usage))
+                    reported = True
+        finally:
+            await stream.close()
+            if not reported:
+                self._report_usage(self._estimated_usage(request, texts))
+
+    def invoke(self, query: Union[str, List[Dict[str, str]]], system_prompt: str = "", state: State = None, stop: List[str] = []) -> str:
+        """Alias for generate method for compatibility."""
+        return self.generate(query, system_prompt, state, stop)
+
+    async def ainvoke(self, query: Union[str, List[Dict[str, str]]], system_prompt: str = "", state: State = None, stop: List[str] = []) -> str:
+        """Alias for agenerate method for compatibility."""
+        return await self.agenerate(query, system_prompt, state, stop)
     
 
-class AnthropicClient:
+class AnthropicClient(LLMClient):
     def __init__(self, model : str = "claude-3-sonnet-20240229"):
-        ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
-        self.client = Anthropic(api_key=ANTHROPIC_API_KEY)
-        self.model = model
+        super().__init__(model)
+        # the SDK is only imported once a client for this provider is needed
+        from anthropic import Anthropic
+        self.api_key = os.getenv("ANTHROPIC_API_KEY")
+        self.client = Anthropic(api_key=self.api_key, max_retries=0)
+        self._async_client = None
 
-    def generate(self, 
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            from anthropic import AsyncAnthropic
+            self._async_client = AsyncAnthropic(api_key=self.api_key, max_retries=0)
+        return self._async_client
+
+    def _request(self, 
                query : Union[str, List[Dict[str, str]]], 
                system_prompt : str = "", 
                state : State = None, 
-               stop : List[str] = []) -> str:
-        message = MessageClaude(query, system_prompt, state)
-        response = self.client.messages.create(model=self.model, max_tokens=2000, messages=message, stop=stop)
-        return response.content[0].text
+               stop : List[str] = []) -> Dict:
+        # cache breakpoints after the system prompt and after the last message
+        message = with_cache_breakpoint(MessageClaude(query, state))
+        request = {"model": self.model, "max_tokens": 2000, "messages": message, "stop_sequences": stop}
+        if system_prompt:
+            request["system"] = [{"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL}]
+        return request
+
+    def _create(self, request: Dict, timeout: float) -> Tuple[str, Usage]:
+        raw = self.client.messages.with_raw_response.create(**request, timeout=timeout)
+        self.governor.observe(raw.headers)
+        response = raw.parse()
+        return response.content[0].text, Usage.from_anthropic(response.usage)
+
+    async def _acreate(self, request: Dict, timeout: float) -> Tuple[str, Usage]:
+        raw = await self.async_client.messages.with_raw_response.create(**request, timeout=timeout)
+        self.governor.observe(raw.headers)
+        response = raw.parse()
+        return response.content[0].text, Usage.from_anthropic(response.usage)
+
+    def _stream(self, request: Dict, timeout: float) -> Iterator[str]:
+        # input and cache usage come with message_start, before the first token,
+        # so a stream closed early still reports its prompt tokens
+        usage = None
+        try:
+            with self.client.messages.stream(**request, timeout=timeout) as stream:
+                self.governor.observe(stream.response.headers)
+                for event in stream:
+                    if event.type == "message_start":
+                        usage = Usage.from_anthropic(event.message.usage)
+                    elif event.type == "message_delta" and usage is not None:
+                        usage.output_tokens = event.usage.output_tokens
+                    elif event.type == "text":
+                        yield event.text
+        finally:
+            if usage is not None:
+                self._report_usage(usage)
+
+    async def _astream(self, request: Dict, timeout: float) -> AsyncIterator[str]:
+        usage = None
+        try:
+            async with self.async_client.messages.stream(**request, timeout=timeout) as stream:
+                self.governor.observe(stream.response.headers)
+                async for event in stream:
+                    if event.type == "message_start":
+                        usage = Usage.from_anthropic(event.message.usage)
+                    elif event.type == "message_delta" and usage is not None:
+                        usage.output_tokens = event.usage.output_tokens
+                    elif event.type == "text":
+                        yield event.text
+        finally:
+            if usage is not None:
+                self._report_usage(usage)
 
 
-def get_client(model_name: str):
+def get_client(model_name: str, cache: SQLiteCache = None):
     if "gpt" in model_name.lower():
-        return OpenAIClient(model_name)
+        client = OpenAIClient(model_name)
     elif "claude" in model_name.lower():
-        return AnthropicClient(model_name)
+        client = AnthropicClient(model_name)
+    else:
+        client = OpenAIClient(model_name)
+    if cache is not None:
+        client = CachedLLMClient(client, cache)
+    return client
+
+
+async def agenerate(llm_client, *args, **kwargs) -> str:
+    """Await `llm_client.agenerate`, running `generate` in a worker thread for clients without an async API."""
+    if hasattr(llm_client, "agenerate"):
+        return await llm_client.agenerate(*args, **kwargs)
+    return await asyncio.to_thread(llm_client.generate, *args, **kwargs)
+
+
+def generate_stream(llm_client, *args, partial_ok: bool = False, **kwargs) -> Iterator[str]:
+    """
+    Stream from `llm_client`, yielding the whole completion at once for clients that cannot stream.
+    `partial_ok` lets a CachedLLMClient store and replay the stream up to where the caller stops reading.
+    """
+    if isinstance(llm_client, CachedLLMClient):
+        yield from llm_client.generate_stream(*args, partial_ok=partial_ok, **kwargs)
+    elif hasattr(llm_client, "generate_stream"):
+        yield from llm_client.generate_stream(*args, **kwargs)
+    else:
+        yield llm_client.generate(*args, **kwargs)
+
+
+async def agenerate_stream(llm_client, *args, partial_ok: bool = False, **kwargs) -> AsyncIterator[str]:
+    """Async counterpart of `generate_stream`."""
+    if isinstance(llm_client, CachedLLMClient):
+        async for text in llm_client.agenerate_stream(*args, partial_ok=partial_ok, **kwargs):
+            yield text
+    elif hasattr(llm_client, "agenerate_stream"):
+        async for text in llm_client.agenerate_stream(*args, **kwargs):
+            yield text
     else:
-        return OpenAIClient(model_name)
\ No newline at end of file
+        yield await agenerate(llm_client, *args, **kwargs)
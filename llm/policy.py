@@ -0,0 +1,546 @@
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .governor import Governor, parse_duration
+
+logger = logging.getLogger(__name__)
+
+# seconds an attempt may wait for the provider, for streams between two chunks
+DEFAULT_TIMEOUT = float(os.getenv("REMIND_LLM_TIMEOUT", 120))
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+# hedging sends a duplicate request and so costs tokens, it is opt-in
+DEFAULT_HEDGE = os.getenv("REMIND_LLM_HEDGE", "") not in ("", "0", "false")
+HEDGE_QUANTILE = 0.95
+# the latency quantile is not trusted before this many calls of the model
+HEDGE_MIN_SAMPLES = 20
+# overloaded (Anthropic) is handled like a rate limit
+RATE_LIMIT_STATUS = (429, 529)
+TRANSIENT_STATUS = (408, 409)
+TRANSIENT_ERRORS = ("APIConnectionError", "APITimeoutError", "TimeoutError")
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """The delay a rate limited or overloaded response asks for, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    milliseconds = headers.get("retry-after-ms")
+    if milliseconds is not None:
+        try:
+            return float(milliseconds) / 1000
+        except ValueError:
+            pass
+    return parse_duration(headers.get("retry-after"))
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) in RATE_LIMIT_STATUS
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, timeouts, connection errors and server errors; not bad requests or auth."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RATE_LIMIT_STATUS or status in TRANSIENT_STATUS or status >= 500
+    return isinstance(error, TimeoutError) or type(error).__name__ in TRANSIENT_ERRORS
+
+
+class LatencyHistogram:
+    """
+    Latencies in log-spaced buckets, 20% wide from 50 ms to about 20 minutes. Counts
+    are halved every `half_life` samples, so quantiles follow the recent latency.
+    """
+
+    START = 0.05
+    GROWTH = 1.2
+    BUCKETS = 56
+
+    def __init__(self, half_life: int = 500):
+        self.half_life = half_life
+        self.counts = [0.0] * (self.BUCKETS + 1)
+        self.count = 0
+        self._since_decay = 0
+        self._lock = threading.Lock()
+
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self.START:
+            return 0
+        return min(self.BUCKETS, 1 + int(math.log(seconds / self.START, self.GROWTH)))
+
+    def _upper_bound(self, bucket: int) -> float:
+        return self.START * self.GROWTH ** bucket
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[self._bucket(seconds)] += 1
+            self.count += 1
+            self._since_decay += 1
+            if self._since_decay >= self.half_life:
+                self.counts = [count / 2 for count in self.counts]
+                self._since_decay = 0
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the `q` quantile, None without samples."""
+        with self._lock:
+            total = sum(self.counts)
+            if not total:
+                return None
+            seen = 0.0
+            for bucket, count in enumerate(self.counts):
+                seen += count
+                if seen >= q * total:
+                    return self._upper_bound(bucket)
+            return self._upper_bound(self.BUCKETS)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            **{f"p{int(q * 100)}": self.quantile(q) for q in (0.5, 0.95, 0.99)},
+        }
+
+
+class ModelLatency:
+    """Latency histograms and retry/hedge counters of one model, shared by its clients."""
+
+    def __init__(self, model: str):
+        self.model = model
+        # whole calls, and time to the first chunk of streams
+        self.latency = LatencyHistogram()
+        self.first_chunk = LatencyHistogram()
+        self.retries = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        # counted from the callers' threads and the hedging pool
+        self._lock = threading.Lock()
+
+    def count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+        return {
+            "latency": self.latency.summary(),
+            "first_chunk": self.first_chunk.summary(),
+            **counters,
+        }
+
+
+_latencies: Dict[str, ModelLatency] = {}
+_latencies_lock = threading.Lock()
+
+
+def get_latency(model: str) -> ModelLatency:
+    with _latencies_lock:
+        latency = _latencies.get(model)
+        if latency is None:
+            latency = _latencies[model] = ModelLatency(model)
+        return latency
+
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _submit(fn: Callable[[], Any]) -> Future:
+    """Run `fn` on the shared pool for hedged sync calls, in the caller's context."""
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(thread_name_prefix="llm-hedge")
+    return _hedge_pool.submit(contextvars.copy_context().run, fn)
+
+
+class CallPolicy:
+    """
+    How LLM calls are attempted: every attempt gets `timeout` seconds and the call as
+    a whole, including backoff, `deadline` seconds. Async attempts are bounded as a
+    whole; sync ones pass the timeout to the SDK, which applies it to each read. Failures that may succeed on a
+    second try (rate limits, timeouts, connection and server errors) are retried with
+    jittered exponential backoff, or after the delay a 429 asks for; anything else is
+    raised right away.
+
+    With `hedge`, a call still unanswered after the model's `hedge_quantile` latency
+    gets a duplicate request and the first response wins. For streams the quantile of
+    the time to the first chunk is used and the losing stream is closed.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        deadline: Optional[float] = None,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_max: float = BACKOFF_MAX,
+        hedge: bool = DEFAULT_HEDGE,
+        hedge_quantile: float = HEDGE_QUANTILE,
+        hedge_min_samples: int = HEDGE_MIN_SAMPLES,
+    ):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+
+    def _expires(self) -> Optional[float]:
+        return time.monotonic() + self.deadline if self.deadline else None
+
+    def _attempt_timeout(self, expires: Optional[float]) -> float:
+        if expires is None:
+            return self.timeout
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"LLM call exceeded its {self.deadline:g}s deadline")
+        return min(self.timeout, remaining)
+
+    def backoff(
+        self,
+        error: BaseException,
+        attempt: int,
+        governor: Governor,
+        latency: ModelLatency,
+        expires: Optional[float] = None,
+    ) -> Optional[float]:
+        """Seconds to wait before retrying after `error`, None if it is not retried."""
+        if isinstance(error, TimeoutError) or type(error).__name__ == "APITimeoutError":
+            latency.count("timeouts")
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+        if is_rate_limited(error):
+            delay = retry_after(error) or delay
+            governor.on_rate_limited(delay)
+        if expires is not None and time.monotonic() + delay >= expires:
+            return None
+        latency.count("retries")
+        logger.warning(f"{governor.model}: {type(error).__name__}, retry {attempt + 1} in {delay:.1f}s")
+        return delay
+
+    def hedge_after(self, histogram: LatencyHistogram) -> Optional[float]:
+        if not self.hedge or histogram.count < self.hedge_min_samples:
+            return None
+        return histogram.quantile(self.hedge_quantile)
+
+    # calls
+
+    def _attempt(self, governor: Governor, latency: ModelLatency, fn: Callable[[float], Any], tokens: int, timeout: float) -> Any:
+        governor.acquire(tokens)
+        start = time.monotonic()
+        try:
+            # unlike `_aattempt`, the timeout only reaches the SDK, which applies it per read
+            result = fn(timeout)
+        except BaseException:
+            governor.release(success=False)
+            raise
+        governor.release()
+        latency.latency.record(time.monotonic() - start)
+        return result
+
+    def _hedged(
+        self,
+        attempt: Callable[[], Any],
+        hedge_after: Optional[float],
+        latency: ModelLatency,
+        discard: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """
+        Run `attempt`, and a second one if the first is slower than `hedge_after`. The
+        result of the losing attempt is passed to `discard`, in the caller's context.
+        """
+        if hedge_after is None:
+            return attempt()
+        first = _submit(attempt)
+        done, _ = wait([first], timeout=hedge_after)
+        if done:
+            return first.result()
+        latency.count("hedges")
+        second = _submit(attempt)
+        pending = {first, second}
+        errors = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+                if future is second:
+                    latency.count("hedge_wins")
+                loser = first if future is second else second
+                # sync calls cannot be cancelled, the loser finishes in the background
+                if discard is not None:
+                    context = contextvars.copy_context()
+                    loser.add_done_callback(lambda f: f.exception() is None and context.run(discard, f.result()))
+                return future.result()
+        raise errors[0]
+
+    def call(
+        self,
+        governor: Governor,
+        latency: ModelLatency,
+        fn: Callable[[float], Any],
+        tokens: int = 0,
+        discard: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """
+        The result of `fn(timeout)`, attempted and retried under this policy. The result
+        of a hedged attempt that lost is passed to `discard`, e.g. to account its usage.
+        """
+        expires = self._expires()
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(expires)
+            try:
+                return self._hedged(
+                    lambda: self._attempt(governor, latency, fn, tokens, timeout),
+                    self.hedge_after(latency.latency),
+                    latency,
+                    discard,
+                )
+            except Exception as e:
+                delay = self.backoff(e, attempt, governor, latency, expires)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def _aattempt(self, governor: Governor, latency: ModelLatency, fn: Callable[[float], Awaitable[Any]], tokens: int, timeout: float) -> Any:
+        await governor.aacquire(tokens)
+        start = time.monotonic()
+        try:
+            # the SDK timeout covers single reads, wait_for the attempt as a whole
+            result = await asyncio.wait_for(fn(timeout), timeout)
+        except BaseException:
+            governor.release(success=False)
+            raise
+        governor.release()
+        latency.latency.record(time.monotonic() - start)
+        return result
+
+    async def _ahedged(
+        self,
+        attempt: Callable[[], Awaitable[Any]],
+        hedge_after: Optional[float],
+        latency: ModelLatency,
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ) -> Any:
+        if hedge_after is None:
+            return await attempt()
+        first = asyncio.ensure_future(attempt())
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done:
+            return first.result()
+        latency.count("hedges")
+        second = asyncio.ensure_future(attempt())
+        pending = {first, second}
+        winner, errors = None, []
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                    elif winner is None:
+                        winner = task
+        finally:
+            for task in (first, second):
+                if task is winner:
+                    continue
+                if not task.done():
+                    # cancelling an attempt releases its slot
+                    task.cancel()
+                elif discard is not None and not task.cancelled() and task.exception() is None:
+                    await discard(task.result())
+        if winner is None:
+            raise errors[0]
+        if winner is second:
+            latency.count("hedge_wins")
+        return winner.result()
+
+    async def acall(
+        self,
+        governor: Governor,
+        latency: ModelLatency,
+        fn: Callable[[float], Awaitable[Any]],
+        tokens: int = 0,
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ) -> Any:
+        expires = self._expires()
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(expires)
+            try:
+                return await self._ahedged(
+                    lambda: self._aattempt(governor, latency, fn, tokens, timeout),
+                    self.hedge_after(latency.latency),
+                    latency,
+                    discard,
+                )
+            except asyncio.TimeoutError as e:
+                # wait_for raises asyncio.TimeoutError, not the builtin, before 3.11
+                delay = self.backoff(TimeoutError(str(e)), attempt, governor, latency, expires)
+                if delay is None:
+                    raise
+            except Exception as e:
+                delay = self.backoff(e, attempt, governor, latency, expires)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    # streams
+
+    def _open(
+        self, governor: Governor, latency: ModelLatency, open_stream: Callable[[float], Iterator[str]], tokens: int, timeout: float
+    ) -> Tuple[List[str], Iterator[str]]:
+        """Open a stream and read its first chunk. The slot is held until `_close`."""
+        governor.acquire(tokens)
+        start = time.monotonic()
+        chunks = None
+        try:
+            chunks = open_stream(timeout)
+            head = [chunk for chunk in [next(chunks, None)] if chunk is not None]
+        except BaseException:
+            if chunks is not None:
+                chunks.close()
+            governor.release(success=False)
+            raise
+        latency.first_chunk.record(time.monotonic() - start)
+        return head, chunks
+
+    @staticmethod
+    def _close(governor: Governor, chunks: Iterator[str], success: bool) -> None:
+        chunks.close()
+        governor.release(success)
+
+    def stream(self, governor: Governor, latency: ModelLatency, open_stream: Callable[[float], Iterator[str]], tokens: int = 0) -> Iterator[str]:
+        """Yield the chunks of `open_stream(timeout)`. Retried and hedged only until the first chunk."""
+        expires = self._expires()
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(expires)
+            try:
+                head, chunks = self._hedged(
+                    lambda: self._open(governor, latency, open_stream, tokens, timeout),
+                    self.hedge_after(latency.first_chunk),
+                    latency,
+                    discard=lambda opened: self._close(governor, opened[1], True),
+                )
+                break
+            except Exception as e:
+                delay = self.backoff(e, attempt, governor, latency, expires)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+        success = False
+        try:
+            yield from head
+            yield from chunks
+            success = True
+        except GeneratorExit:
+            # the consumer stopped reading, e.g. a ReAct turn cut off after its action
+            success = True
+            raise
+        finally:
+            self._close(governor, chunks, success)
+
+    async def _aopen(
+        self, governor: Governor, latency: ModelLatency, open_stream: Callable[[float], AsyncIterator[str]], tokens: int, timeout: float
+    ) -> Tuple[List[str], AsyncIterator[str]]:
+        await governor.aacquire(tokens)
+        start = time.monotonic()
+        chunks = None
+        try:
+            chunks = open_stream(timeout)
+            try:
+                head = [await asyncio.wait_for(chunks.__anext__(), timeout)]
+            except StopAsyncIteration:
+                head = []
+        except BaseException:
+            if chunks is not None:
+                await chunks.aclose()
+            governor.release(success=False)
+            raise
+        latency.first_chunk.record(time.monotonic() - start)
+        return head, chunks
+
+    @staticmethod
+    async def _aclose(governor: Governor, chunks: AsyncIterator[str], success: bool) -> None:
+        try:
+            await chunks.aclose()
+        finally:
+            governor.release(success)
+
+    async def astream(self, governor: Governor, latency: ModelLatency, open_stream: Callable[[float], AsyncIterator[str]], tokens: int = 0) -> AsyncIterator[str]:
+        expires = self._expires()
+        attempt = 0
+        while True:
+            timeout = self._attempt_timeout(expires)
+            try:
+                head, chunks = await self._ahedged(
+                    lambda: self._aopen(governor, latency, open_stream, tokens, timeout),
+                    self.hedge_after(latency.first_chunk),
+                    latency,
+                    discard=lambda opened: self._aclose(governor, opened[1], True),
+                )
+                break
+            except asyncio.TimeoutError as e:
+                delay = self.backoff(TimeoutError(str(e)), attempt, governor, latency, expires)
+                if delay is None:
+                    raise
+            except Exception as e:
+                delay = self.backoff(e, attempt, governor, latency, expires)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+        success = False
+        try:
+            for chunk in head:
+                yield chunk
+            async for chunk in chunks:
+                yield chunk
+            success = True
+        except GeneratorExit:
+            success = True
+            raise
+        finally:
+            await self._aclose(governor, chunks, success)
+
+
+_policy = CallPolicy()
+_policy_lock = threading.Lock()
+
+
+def configure(**kwargs: Any) -> CallPolicy:
+    """Replace the default policy of new clients with one built from `kwargs`, see CallPolicy."""
+    global _policy
+    with _policy_lock:
+        _policy = CallPolicy(**kwargs)
+        return _policy
+
+
+def get_policy() -> CallPolicy:
+    with _policy_lock:
+        return _policy
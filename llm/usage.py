@@ -0,0 +1,48 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class Usage:
+    """
+    Token usage of one LLM call, normalized across providers.
+
+    input_tokens: all prompt tokens, including the ones served from the prefix cache
+    cached_tokens: prompt tokens read from the provider's prefix cache
+    cache_write_tokens: prompt tokens written to the prefix cache (Anthropic only)
+    estimated: counted locally because the provider never sent usage, e.g. for an
+        OpenAI stream closed before its final chunk
+    """
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cache_write_tokens: int = 0
+    estimated: bool = False
+
+    @classmethod
+    def from_openai(cls, usage) -> "Usage":
+        details = getattr(usage, "prompt_tokens_details", None)
+        return cls(
+            input_tokens=usage.prompt_tokens or 0,
+            output_tokens=usage.completion_tokens or 0,
+            cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+        )
+
+    @classmethod
+    def from_anthropic(cls, usage) -> "Usage":
+        # Anthropic reports uncached, cache-read and cache-write input tokens separately
+        cached = getattr(usage, "cache_read_input_tokens", 0) or 0
+        written = getattr(usage, "cache_creation_input_tokens", 0) or 0
+        return cls(
+            input_tokens=(usage.input_tokens or 0) + cached + written,
+            output_tokens=usage.output_tokens or 0,
+            cached_tokens=cached,
+            cache_write_tokens=written,
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.input_tokens} input tokens ({self.cached_tokens} cached, "
+            f"{self.cache_write_tokens} written to cache), {self.output_tokens} output tokens"
+            + (" (estimated)" if self.estimated else "")
+        )
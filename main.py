@@ -4,18 +4,18 @@
 # /_/|_|\__/_/  /_/_/_//_/\_,_/  
 
 
-from .state_machine.state_machine import StateMachine
+from .state_machine.state_machine import StateMachine, Node
+from .state_machine.checkpoint import Checkpointer, DEFAULT_CHECKPOINT_DIR, DEFAULT_MAX_AGE_DAYS, prune_runs
 from .llm.llm import get_client
+from .llm.cache import DEFAULT_CACHE_PATH, DEFAULT_TTL, DEFAULT_MAX_BYTES
+from .llm import ledger, policy
+from .cache import SQLiteCache
+from .crawler.cache import CrawlCache, set_default_cache, DEFAULT_CACHE_PATH as DEFAULT_CRAWL_CACHE_PATH
+from .crawler.extractor import EXTRACTORS, set_default_extractor
+from .crawler import pipeline
+from .tools import search_cache, repl_pool
+from . import tracing
 import argparse
-from rich.console import Console
-from rich.panel import Panel
-from rich.markdown import Markdown
-from rich.text import Text
-from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.live import Live
-from rich.syntax import Syntax
-from pyfiglet import Figlet
 from datetime import datetime
 import os
 import time
@@ -23,10 +23,28 @@ import sys
 from io import StringIO
 from contextlib import contextmanager
 
+# rich and pyfiglet are imported where they are used, so that importing this
+# module (or running --help) does not pay for the UI libraries
 
-console = Console()
+
+_console = None
+
+def get_console():
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+class _LazyConsole:
+    def __getattr__(self, name):
+        return getattr(get_console(), name)
+
+console = _LazyConsole()
 
 def render_banner(title: str = "ReMind", subtitle: str = "Tiny Research Agent"):
+    from rich.panel import Panel
+    from pyfiglet import Figlet
     figlet = Figlet(font="slant", width=200)
     ascii_art = figlet.renderText(title)
     
@@ -40,6 +58,8 @@ def render_banner(title: str = "ReMind", subtitle: str = "Tiny Research Agent"):
     console.print(panel)
 
 def display_query_info(query: str, model_name: str):
+    from rich.panel import Panel
+    from rich.table import Table
     table = Table(title="Research Configuration", 
                   show_header=True, 
                   header_style="bold cyan",
@@ -56,11 +76,13 @@ def display_query_info(query: str, model_name: str):
     console.print()
 
 def display_node_transition(node_name: str, description: str):
+    from rich.panel import Panel
     node_styles = {
         "PLANNER": "magenta",
         "RESEARCH_TEAM": "blue",
         "RESEARCH": "cyan",
         "CODE": "yellow",
+        "PARALLEL": "cyan",
         "REPORTER": "green",
     }
     
@@ -73,6 +95,8 @@ def display_node_transition(node_name: str, description: str):
     ))
 
 def display_agent_output(output: str, agent_type: str = "AGENT"):
+    from rich.panel import Panel
+    from rich.text import Text
     agent_styles = {
         "PLANNER": ("magenta", "Planning research strategy"),
         "RESEARCHER": ("cyan", "Conducting research"),
@@ -94,6 +118,8 @@ def display_agent_output(output: str, agent_type: str = "AGENT"):
     ))
 
 def display_step_execution(step_title: str, step_type: str, step_description: str):
+    from rich.panel import Panel
+    from rich.table import Table
     type_colors = {
         "research": "cyan",
         "processing": "yellow",
@@ -117,6 +143,8 @@ def display_step_execution(step_title: str, step_type: str, step_description: st
     ))
 
 def display_plan_details(plan):
+    from rich.panel import Panel
+    from rich.table import Table
     table = Table(title="Research Plan", 
                   show_header=True,
                   header_style="bold magenta",
@@ -152,7 +180,9 @@ def capture_agent_output():
         sys.stdout = old_stdout
 
 def display_report(report: str, export: bool = True):
-    """Display the final report with styling"""
+    """Display the final report with styling, returns the path of the exported file"""
+    from rich.panel import Panel
+    from rich.markdown import Markdown
     console.print()
     console.rule("[bold cyan]Research Report Generated[/bold cyan]")
     console.print()
@@ -168,9 +198,11 @@ def display_report(report: str, export: bool = True):
     
     # Export to file if requested
     if export:
-        export_report(report)
+        return export_report(report)
+    return None
 
 def export_report(report: str):
+    from rich.panel import Panel
     os.makedirs("output_reports", exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"output_reports/research_report_{timestamp}.md"
@@ -188,8 +220,10 @@ def export_report(report: str):
         border_style="yellow",
         padding=(1, 2)
     ))
+    return filename
 
 def display_error(error: Exception):
+    from rich.panel import Panel
     error_panel = Panel(
         f"[red bold]Error Type:[/red bold] {type(error).__name__}\n"
         f"[red]Message:[/red] {str(error)}",
@@ -199,7 +233,9 @@ def display_error(error: Exception):
     )
     console.print(error_panel)
 
-def display_completion_summary(duration: float):
+def display_completion_summary(duration: float, cache_stats: dict = None, trace_summary: dict = None, trace_paths: list = None):
+    from rich.panel import Panel
+    from rich.table import Table
     console.print()
     console.rule("[bold green]Process Complete[/bold green]")
     console.print()
@@ -210,10 +246,62 @@ def display_completion_summary(duration: float):
     
     summary_table.add_row("Status", "Completed Successfully")
     summary_table.add_row("Duration", f"{duration:.2f} seconds")
+    for name, stats in (cache_stats or {}).items():
+        row = f"{stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries)"
+        if "avoided" in stats:
+            row += f", {stats['avoided']} searches avoided"
+        summary_table.add_row(name, row)
+    # where the time went, from the trace
+    for category, label in (("node", "Time by node"), ("tool", "Time by tool"), ("llm", "LLM calls")):
+        entries = (trace_summary or {}).get(category)
+        if not entries:
+            continue
+        ranked = sorted(entries.items(), key=lambda item: item[1]["seconds"], reverse=True)
+        summary_table.add_row(label, ", ".join(
+            f"{name} {entry['seconds']:.1f}s ({entry['count']}x)" for name, entry in ranked
+        ))
+    for path in trace_paths or []:
+        summary_table.add_row("Trace", path)
     summary_table.add_row("Timestamp", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     
     console.print(Panel(summary_table, border_style="green", padding=(1, 2)))
 
+def display_usage_ledger(usage_ledger: ledger.UsageLedger, path: str = None):
+    """Tokens and estimated cost of the run's LLM calls, by node and by agent"""
+    from rich.table import Table
+    total = usage_ledger.total()
+    if not total.calls:
+        return
+    table = Table(title="LLM Usage", border_style="cyan", title_style="bold cyan")
+    for column in ("", "Calls", "Input", "Cached", "Output", "Cost (USD)"):
+        table.add_column(column, justify="right" if column else "left")
+
+    def add_row(name, entry, style=None):
+        table.add_row(
+            name,
+            str(entry.calls),
+            f"{entry.input_tokens:,}",
+            f"{entry.cached_tokens:,} ({entry.cache_hit_rate:.0%})",
+            f"{entry.output_tokens:,}",
+            f"{entry.cost:.4f}",
+            style=style,
+        )
+
+    for field in ("node", "agent"):
+        ranked = sorted(usage_ledger.by(field).items(), key=lambda item: item[1].cost, reverse=True)
+        for name, entry in ranked:
+            add_row(f"{field}: {name or '-'}", entry)
+        table.add_section()
+    add_row("Total", total, style="bold")
+    console.print()
+    console.print(table)
+    if total.unpriced_calls:
+        console.print(f"[yellow]{total.unpriced_calls} calls of models without a price are not in the cost, see --prices[/yellow]")
+    if total.estimated_calls:
+        console.print(f"[yellow]{total.estimated_calls} streams closed before the provider sent usage, their tokens are estimated[/yellow]")
+    if path:
+        console.print(f"[dim]Usage written to {path}[/dim]")
+
 class EnhancedStateMachine(StateMachine):    
     def _planner_action(self):
         display_node_transition("PLANNER", "Analyzing query and creating research plan...")
@@ -230,10 +318,7 @@ class EnhancedStateMachine(StateMachine):
         return super()._research_team_action()
     
     def _research_action(self):
-        current_plan = self.state.get("current_plan")
-        for step in current_plan.steps:
-            if not step.execution_res:
-                break
+        step = self._next_step()
         
         display_step_execution(step.title, step.step_type, step.description)
         
@@ -248,10 +333,7 @@ class EnhancedStateMachine(StateMachine):
         return result
     
     def _code_action(self):
-        current_plan = self.state.get("current_plan")
-        for step in current_plan.steps:
-            if not step.execution_res:
-                break
+        step = self._next_step()
         
         display_step_execution(step.title, step.step_type, step.description)
         
@@ -265,16 +347,136 @@ class EnhancedStateMachine(StateMachine):
         
         return result
     
+    def _parallel_action(self):
+        current_plan = self.state.get("current_plan")
+        ready = self.scheduler.ready_steps(current_plan)
+        display_node_transition("PARALLEL", f"Running {len(ready)} independent steps concurrently...")
+        for idx in ready:
+            step = current_plan.steps[idx]
+            display_step_execution(step.title, step.step_type, step.description)
+        
+        # Capture the output of all concurrently running agents
+        with capture_agent_output() as captured:
+            result = super()._parallel_action()
+            output = captured.getvalue()
+        
+        if output.strip():
+            display_agent_output(output, "RESEARCHER")
+        
+        return result
+    
     def _reporter_action(self):
+        from rich.markdown import Markdown
+        from rich.live import Live
         display_node_transition("REPORTER", "Compiling final research report...")
-        return super()._reporter_action()
+        
+        # Render the report while it is still being generated
+        report, last_render = "", 0.0
+        with Live(Markdown(report), console=get_console(), transient=True, refresh_per_second=8) as live:
+            for token in self.reporter.report_stream(self.state):
+                report += token
+                # re-parsing the markdown on every token would be quadratic
+                if time.time() - last_render > 0.125:
+                    live.update(Markdown(report))
+                    last_render = time.time()
+        self.state.set("report", report)
+        return Node.END
+
+def add_runtime_arguments(parser: argparse.ArgumentParser) -> None:
+    """Options shared by single runs and batches: model, caches, pools and limits."""
+    parser.add_argument("--checkpoint-dir", type=str, default=DEFAULT_CHECKPOINT_DIR, metavar="DIR", help=f"Where runs are checkpointed after every node (default: {DEFAULT_CHECKPOINT_DIR})")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Do not checkpoint runs, they cannot be resumed")
+    parser.add_argument("--keep-runs", type=float, default=DEFAULT_MAX_AGE_DAYS, metavar="DAYS", help=f"Delete checkpoints and artifacts of runs not checkpointed for DAYS days at start, 0 to keep them all (default: {DEFAULT_MAX_AGE_DAYS:g})")
+    parser.add_argument("--model_name", type=str, default="gpt-4.1", help="LLM model name")
+    parser.add_argument("--llm-cache", nargs="?", const=DEFAULT_CACHE_PATH, default=None, metavar="PATH", help=f"Cache LLM responses in a local SQLite file (default: {DEFAULT_CACHE_PATH})")
+    parser.add_argument("--crawl-cache", nargs="?", const=DEFAULT_CRAWL_CACHE_PATH, default=None, metavar="PATH", help=f"Cache crawled pages in a local SQLite file (default: {DEFAULT_CRAWL_CACHE_PATH})")
+    parser.add_argument("--search-cache", nargs="?", const=search_cache.DEFAULT_CACHE_PATH, default=None, metavar="PATH", help=f"Keep search results across runs in a local SQLite file (default: {search_cache.DEFAULT_CACHE_PATH})")
+    parser.add_argument("--max-parallel-steps", type=int, default=4, help="Maximum number of independent plan steps executed concurrently")
+    parser.add_argument("--extractor", choices=list(EXTRACTORS), default=None, help="HTML extraction backend for crawled pages (default: $REMIND_EXTRACTOR or readability)")
+    parser.add_argument("--extract-workers", type=int, default=pipeline.DEFAULT_WORKERS, metavar="N", help=f"Processes extracting and converting crawled pages, 0 to do it on the crawling threads (default: {pipeline.DEFAULT_WORKERS})")
+    parser.add_argument("--repl-timeout", type=float, default=repl_pool.DEFAULT_TIMEOUT, metavar="SECONDS", help="Wall-clock limit of each Python execution of the coder")
+    parser.add_argument("--repl-memory-mb", type=int, default=repl_pool.DEFAULT_MEMORY_MB, metavar="MB", help="Address space limit of the coder's Python worker processes")
+    parser.add_argument("--llm-timeout", type=float, default=policy.DEFAULT_TIMEOUT, metavar="SECONDS", help="Time an LLM request may wait for the provider before it is retried (streams: between chunks)")
+    parser.add_argument("--llm-deadline", type=float, default=None, metavar="SECONDS", help="Time an LLM call may take in total, including retries")
+    parser.add_argument("--llm-hedge", action="store_true", default=policy.DEFAULT_HEDGE, help="Send a duplicate LLM request when the first is slower than the model's p95 latency")
+    parser.add_argument("--prices", default=ledger.PRICES_PATH, metavar="PATH", help="JSON file of model prices in USD per million tokens, over the built-in list prices (default: $REMIND_PRICES)")
+    parser.add_argument("--trace", default=None, metavar="PATH", help="Trace nodes, agent iterations, LLM and tool calls and write them as a Chrome/Perfetto trace")
+    parser.add_argument("--trace-otlp", default=None, metavar="PATH", help="Also write the trace as OpenTelemetry OTLP/JSON")
+    parser.add_argument("--context-budget", type=int, default=None, metavar="TOKENS", help="Maximum prompt size per LLM call in tokens (default: per-agent budgets)")
+
+
+def configure_runtime(args: argparse.Namespace, http_connections: int = 0):
+    """
+    Set up the process-wide caches, pools and LLM client from `args`. Returns the
+    client and the caches in use by display name, for their stats.
+    """
+    llm_cache = None
+    if args.llm_cache:
+        llm_cache = SQLiteCache(args.llm_cache, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES)
+    crawl_cache = None
+    if args.crawl_cache:
+        crawl_cache = CrawlCache(args.crawl_cache)
+        set_default_cache(crawl_cache)
+    if args.search_cache:
+        search_cache.set_default_cache(search_cache.SearchCache(args.search_cache))
+    if args.extractor:
+        set_default_extractor(args.extractor)
+    if http_connections:
+        from .net import HTTPConfig, configure as configure_http
+        configure_http(HTTPConfig(pool_maxsize=http_connections))
+    if args.trace or args.trace_otlp:
+        tracing.enable()
+    ledger.configure(args.prices)
+    policy.configure(timeout=args.llm_timeout, deadline=args.llm_deadline, hedge=args.llm_hedge)
+    pipeline.configure(args.extract_workers)
+    repl_pool.configure(timeout=args.repl_timeout, memory_mb=args.repl_memory_mb)
+
+    caches = {}
+    if llm_cache is not None:
+        caches["LLM Cache"] = llm_cache
+    if crawl_cache is not None:
+        caches["Crawl Cache"] = crawl_cache
+    caches["Search Cache"] = search_cache.get_default_cache()
+    return get_client(args.model_name, cache=llm_cache), caches
+
+
+def export_traces(args: argparse.Namespace) -> list:
+    """Write the trace files requested in `args`, returns their paths."""
+    tracer = tracing.get_tracer()
+    if tracer is None:
+        return []
+    paths = []
+    if args.trace:
+        paths.append(tracing.write_chrome_trace(tracer, args.trace))
+    if args.trace_otlp:
+        paths.append(tracing.write_otlp(tracer, args.trace_otlp))
+    return paths
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="ReMind - AI Research Agent")
-    parser.add_argument("--query", type=str, required=True, help="Research query")
-    parser.add_argument("--model_name", type=str, default="gpt-4.1", help="LLM model name")
+    parser.add_argument("--query", type=str, default=None, help="Research query")
+    parser.add_argument("--resume", type=str, default=None, metavar="RUN_ID", help="Continue an interrupted run from its last completed node")
     parser.add_argument("--no-export", action="store_true", help="Skip exporting report to file")
+    add_runtime_arguments(parser)
     args = parser.parse_args()
+    if not args.query and not args.resume:
+        parser.error("either --query or --resume is required")
+    if args.resume and args.no_checkpoint:
+        parser.error("--resume needs the checkpoint, drop --no-checkpoint")
+    
+    prune_runs(args.checkpoint_dir, args.keep_runs)
+    checkpointer = None if args.no_checkpoint else Checkpointer(args.resume, args.checkpoint_dir)
+    checkpoint = None
+    if args.resume:
+        if not checkpointer.exists():
+            parser.error(f"no checkpoint for run {args.resume} in {args.checkpoint_dir}")
+        checkpoint = checkpointer.load()
+        args.query = checkpoint["query"]
+    
+    from dotenv import load_dotenv
+    from rich.panel import Panel
+    load_dotenv()
     
     start_time = time.time()
     
@@ -290,22 +492,49 @@ if __name__ == "__main__":
         ))
         console.print()
         
+        llm_client, caches = configure_runtime(args)
+        
         state_machine = EnhancedStateMachine(
             human_query=args.query,
-            llm_client=get_client(args.model_name),
+            llm_client=llm_client,
+            max_parallel_steps=args.max_parallel_steps,
+            context_budget=args.context_budget,
+            checkpointer=checkpointer,
         )
+        if checkpoint is not None:
+            state_machine.resume(checkpoint)
+            console.print(f"[cyan]Resuming run {checkpointer.run_id} at {state_machine.current_node.name}[/cyan]")
+        elif checkpointer is not None:
+            console.print(f"[dim]Run {checkpointer.run_id}, continue it with --resume {checkpointer.run_id} if interrupted[/dim]")
         
-        state_machine.run_until_end()
+        try:
+            state_machine.run_until_end()
+        finally:
+            # a failed or interrupted run is the one worth looking at
+            trace_paths = export_traces(args)
+        # nothing left to resume once the run is finished, exported or not
+        if checkpointer is not None and state_machine.current_node == Node.END:
+            checkpointer.discard()
         
         report = state_machine.state.get("report")
         
+        report_path = None
         if report:
-            display_report(report, export=not args.no_export)
+            report_path = display_report(report, export=not args.no_export)
         else:
             console.print("[yellow]WARNING: No report generated[/yellow]")
         
+        usage_path = None
+        if report_path:
+            usage_path = state_machine.ledger.write(f"{os.path.splitext(report_path)[0]}.usage.json")
+        display_usage_ledger(state_machine.ledger, usage_path)
+        
         duration = time.time() - start_time
-        display_completion_summary(duration)
+        cache_stats = {name: cache.stats() for name, cache in caches.items()}
+        tracer = tracing.get_tracer()
+        display_completion_summary(
+            duration, cache_stats, tracer.summary() if tracer is not None else None, trace_paths
+        )
         
     except Exception as e:
         display_error(e)
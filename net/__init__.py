@@ -0,0 +1,11 @@
+from .ratelimit import HostRateLimiter
+
+__all__ = ['HTTPConfig', 'build_session', 'configure', 'get_session', 'HostRateLimiter']
+
+
+def __getattr__(name):
+    # requests is only imported once a session is needed
+    if name in ('HTTPConfig', 'build_session', 'configure', 'get_session'):
+        from . import session
+        return getattr(session, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
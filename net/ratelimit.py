@@ -0,0 +1,31 @@
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host by at least `min_interval` seconds.
+    Callers reserve the next free slot under a lock and sleep outside of it, so
+    requests to different hosts never wait on each other.
+    """
+
+    def __init__(self, min_interval: float = 1.0):
+        self.min_interval = min_interval
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str) -> float:
+        """Block until a request to the host of `url` may start; returns the time waited."""
+        host = (urlsplit(url).hostname or url).lower()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            # hosts whose slot has passed need no entry, they may be called right away
+            self._next_slot = {h: t for h, t in self._next_slot.items() if t > now}
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
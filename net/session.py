@@ -0,0 +1,96 @@
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+@dataclass
+class HTTPConfig:
+    """
+    Transport settings shared by the crawler and search clients.
+
+    pool_connections: number of hosts whose connections are kept alive
+    pool_maxsize: connections per host, requests beyond it wait for a free one
+    """
+
+    connect_timeout: float = float(os.getenv("REMIND_HTTP_CONNECT_TIMEOUT", 5))
+    read_timeout: float = float(os.getenv("REMIND_HTTP_READ_TIMEOUT", 60))
+    retries: int = int(os.getenv("REMIND_HTTP_RETRIES", 3))
+    backoff_factor: float = 0.5
+    backoff_jitter: float = 0.5
+    backoff_max: float = 30
+    pool_connections: int = 16
+    pool_maxsize: int = 8
+    status_forcelist: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+class TimeoutSession(requests.Session):
+    """requests.Session that applies default connect/read timeouts to every request."""
+
+    def __init__(self, timeout: Tuple[float, float]):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def build_session(config: Optional[HTTPConfig] = None) -> requests.Session:
+    """
+    Keep-alive session with bounded per-host connection pools and jittered
+    exponential backoff on connection errors, 429 and 5xx (honouring Retry-After).
+    """
+    config = config or HTTPConfig()
+    retry = Retry(
+        total=config.retries,
+        backoff_factor=config.backoff_factor,
+        backoff_jitter=config.backoff_jitter,
+        backoff_max=config.backoff_max,
+        status_forcelist=config.status_forcelist,
+        # the POST endpoints we call (Jina reader, Tavily search) are read-only
+        allowed_methods=None,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize,
+        pool_block=True,
+        max_retries=retry,
+    )
+    session = TimeoutSession(config.timeout)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session: Optional[requests.Session] = None
+_lock = threading.Lock()
+
+
+def configure(config: HTTPConfig) -> requests.Session:
+    """Replace the shared session with one built from `config`."""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = build_session(config)
+        return _session
+
+
+def get_session() -> requests.Session:
+    """The process-wide session, created on first use."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = build_session()
+        return _session
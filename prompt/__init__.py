@@ -1,4 +1,11 @@
-from .planner_model import Plan
 from .utils import load_prompt
 
 __all__ = ['Plan', 'load_prompt']
+
+
+def __getattr__(name):
+    # the pydantic models are loaded on first use
+    if name == 'Plan':
+        from .planner_model import Plan
+        return Plan
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -21,6 +21,10 @@ class Step(BaseModel):
     execution_res: Optional[str] = Field(
         default=None, description="The Step execution result"
     )
+    depends_on: Optional[List[int]] = Field(
+        default=None,
+        description="1-based indices of earlier steps whose results this step needs",
+    )
 
 
 class Plan(BaseModel):
@@ -1,11 +1,18 @@
 # Renders markdown prompt for llm system prompt using jinja2
 import os
-from jinja2 import Environment, FileSystemLoader
+from functools import lru_cache
 from typing import Dict, Any
 
 
-def load_prompt(agent_name: str, config: Dict[str, Any]) -> str:
+@lru_cache(maxsize=None)
+def _environment():
+    # one environment for the process, it keeps the compiled templates
+    from jinja2 import Environment, FileSystemLoader
+
     template_dir = os.path.join(os.path.dirname(__file__))
-    env = Environment(loader=FileSystemLoader(template_dir))
-    template = env.get_template(f"{agent_name}.md")
+    return Environment(loader=FileSystemLoader(template_dir))
+
+
+def load_prompt(agent_name: str, config: Dict[str, Any]) -> str:
+    template = _environment().get_template(f"{agent_name}.md")
     return template.render(**config)
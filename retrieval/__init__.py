@@ -0,0 +1,4 @@
+from .chunking import chunk_text
+from .index import Chunk, ObservationIndex
+
+__all__ = ['Chunk', 'ObservationIndex', 'chunk_text']
@@ -0,0 +1,46 @@
+import re
+from typing import List
+
+from ..llm.context import count_tokens
+
+DEFAULT_CHUNK_TOKENS = 300
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def _split_long(text: str, max_tokens: int) -> List[str]:
+    """Split a paragraph that does not fit a window at sentence ends, or hard if it has none."""
+    pieces = []
+    for sentence in SENTENCE_END.split(text):
+        while count_tokens(sentence) > max_tokens:
+            cut = max(1, len(sentence) * max_tokens // count_tokens(sentence))
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:]
+        pieces.append(sentence)
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int = DEFAULT_CHUNK_TOKENS) -> List[str]:
+    """
+    Split `text` into windows of at most about `max_tokens` tokens.
+
+    Paragraphs are kept whole and packed together while they fit, so chunks end
+    at natural boundaries instead of in the middle of a sentence.
+    """
+    chunks, window, size = [], [], 0
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pieces = [paragraph] if count_tokens(paragraph) <= max_tokens else _split_long(paragraph, max_tokens)
+        for piece in pieces:
+            tokens = count_tokens(piece)
+            if window and size + tokens > max_tokens:
+                chunks.append("\n\n".join(window))
+                window, size = [], 0
+            window.append(piece)
+            size += tokens
+    if window:
+        chunks.append("\n\n".join(window))
+    return chunks
@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import math
+import re
+import threading
+import zlib
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .chunking import DEFAULT_CHUNK_TOKENS, chunk_text
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"\w+")
+# ranks below this constant barely change the fused score, see reciprocal rank fusion
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+
+@dataclass
+class Chunk:
+    text: str
+    source: str = ""
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+
+class BM25Index:
+    """Incremental Okapi BM25 over tokenized chunks, documents can be added at any time."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: List[int] = []
+        self.total_length = 0
+
+    def add(self, tokens: List[str]) -> None:
+        doc_id = len(self.lengths)
+        for term, tf in Counter(tokens).items():
+            self.postings[term].append((doc_id, tf))
+        self.lengths.append(len(tokens))
+        self.total_length += len(tokens)
+
+    def search(self, tokens: List[str], k: int) -> List[Tuple[int, float]]:
+        n = len(self.lengths)
+        if not n:
+            return []
+        avg_length = self.total_length / n or 1
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokens):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+class HashingEmbedder:
+    """
+    Dense vectors from hashed unigrams and bigrams, a model-free stand-in for an
+    embedding model that catches overlap BM25 misses, e.g. in word order.
+    Needs numpy, which is only imported when the embedder is created.
+    """
+
+    def __init__(self, dim: int = 1024):
+        import numpy as np
+
+        self.np = np
+        self.dim = dim
+
+    def embed(self, tokens: List[str]):
+        vector = self.np.zeros(self.dim, dtype=self.np.float32)
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature, count in Counter(features).items():
+            # crc32 is stable across processes, unlike hash()
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += (1.0 if h & 0x80000000 else -1.0) * (1 + math.log(count))
+        norm = self.np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class ObservationIndex:
+    """
+    In-process retrieval index over the observations collected during a run.
+
+    Observations are chunked as they are added and ranked by BM25, fused with the
+    cosine similarity of hashed embeddings when numpy is available. Safe to share
+    between steps running on different threads.
+    """
+
+    def __init__(self, chunk_tokens: int = DEFAULT_CHUNK_TOKENS, dense: bool = True):
+        self.chunk_tokens = chunk_tokens
+        self.chunks: List[Chunk] = []
+        self.bm25 = BM25Index()
+        self.embedder: Optional[HashingEmbedder] = None
+        if dense:
+            try:
+                self.embedder = HashingEmbedder()
+            except ImportError:
+                logger.info("numpy is not installed, ranking observations with BM25 only")
+        self._vectors = []
+        self._matrix = None
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add(self, text: str, source: str = "", **meta: Any) -> int:
+        """Chunk and index `text`, skipping chunks already indexed. Returns the number of new chunks."""
+        added = 0
+        for piece in chunk_text(text, self.chunk_tokens):
+            digest = hashlib.sha1(piece.encode("utf-8")).digest()
+            tokens = tokenize(piece)
+            vector = self.embedder.embed(tokens) if self.embedder else None
+            with self._lock:
+                if digest in self._seen:
+                    continue
+                self._seen.add(digest)
+                self.chunks.append(Chunk(piece, source, dict(meta)))
+                self.bm25.add(tokens)
+                if vector is not None:
+                    self._vectors.append(vector)
+                    self._matrix = None
+            added += 1
+        return added
+
+    def dump(self) -> List[Dict[str, Any]]:
+        """The indexed chunks as JSON-serializable records, see `load`."""
+        with self._lock:
+            return [
+                {"text": chunk.text, "source": chunk.source, "meta": chunk.meta}
+                for chunk in self.chunks
+            ]
+
+    def load(self, records: List[Dict[str, Any]]) -> None:
+        """Index chunks saved with `dump`."""
+        for record in records:
+            self.add(record["text"], record.get("source", ""), **record.get("meta", {}))
+
+    def _dense_ranking(self, tokens: List[str], k: int) -> List[int]:
+        np = self.embedder.np
+        if self._matrix is None:
+            self._matrix = np.stack(self._vectors)
+        scores = self._matrix @ self.embedder.embed(tokens)
+        top = np.argsort(-scores)[:k]
+        return [int(i) for i in top if scores[i] > 0]
+
+    def search(self, query: str, k: int = 5) -> List[Chunk]:
+        """The `k` chunks most relevant to `query`."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        with self._lock:
+            if not self.chunks:
+                return []
+            rankings = [[doc_id for doc_id, _ in self.bm25.search(tokens, 4 * k)]]
+            if self.embedder is not None:
+                rankings.append(self._dense_ranking(tokens, 4 * k))
+            fused: Dict[int, float] = defaultdict(float)
+            for ranking in rankings:
+                for rank, doc_id in enumerate(ranking):
+                    fused[doc_id] += 1 / (RRF_K + rank + 1)
+            best = sorted(fused, key=fused.get, reverse=True)[:k]
+            return [self.chunks[doc_id] for doc_id in best]
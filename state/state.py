@@ -5,13 +5,40 @@ class State:
     hold the history of the conversation
     """
 
+    # list entries that agents extend while running and that are merged back
+    # from forked states
+    SHARED_LISTS = ("messages", "observations")
+
     def __init__(self):
         self.messages = []
         self.state = {}
         self.state["messages"] = self.messages
+        self._fork_offsets = {}
 
     def get(self, key: str, default: Any = None) -> Any:
         return self.state.get(key, default)
 
     def set(self, key: str, value: Any):
-        self.state[key] = value
\ No newline at end of file
+        self.state[key] = value
+
+    def fork(self) -> "State":
+        """
+        copy of this state whose message and observation lists can be extended
+        independently, e.g. by a step running on another thread
+        """
+        child = State()
+        child.state.update(self.state)
+        for key in self.SHARED_LISTS:
+            items = list(self.get(key, []))
+            child.set(key, items)
+            child._fork_offsets[key] = len(items)
+        return child
+
+    def merge(self, child: "State"):
+        """append whatever a forked state added to its lists since the fork"""
+        for key in self.SHARED_LISTS:
+            added = child.get(key, [])[child._fork_offsets.get(key, 0) :]
+            if added:
+                items = self.get(key, [])
+                items.extend(added)
+                self.set(key, items)
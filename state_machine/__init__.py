@@ -1,3 +1,4 @@
 from .state_machine import StateMachine, Node
+from .checkpoint import Checkpointer
 
-__all__ = ['StateMachine', 'Node']
+__all__ = ['StateMachine', 'Node', 'Checkpointer']
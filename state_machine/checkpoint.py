@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import secrets
+import shutil
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from .state_machine import StateMachine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_DIR = ".remind_cache/runs"
+CHECKPOINT_FILE = "checkpoint.json"
+CHECKPOINT_VERSION = 1
+# runs whose checkpoint has not been written for this long are deleted by `prune_runs`
+DEFAULT_MAX_AGE_DAYS = float(os.getenv("REMIND_CHECKPOINT_MAX_AGE_DAYS", 14))
+
+
+def new_run_id() -> str:
+    """Sortable and unique, e.g. 20250101-120000-3f2a."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(2)}"
+
+
+def prune_runs(directory: str = DEFAULT_CHECKPOINT_DIR, max_age_days: float = DEFAULT_MAX_AGE_DAYS) -> List[str]:
+    """Delete the runs in `directory` last checkpointed more than `max_age_days` ago, with their artifacts."""
+    if max_age_days <= 0 or not os.path.isdir(directory):
+        return []
+    cutoff = time.time() - max_age_days * 86400
+    pruned = []
+    for run_id in sorted(os.listdir(directory)):
+        run_dir = os.path.join(directory, run_id)
+        path = os.path.join(run_dir, CHECKPOINT_FILE)
+        try:
+            saved_at = os.path.getmtime(path if os.path.exists(path) else run_dir)
+        except OSError:
+            continue
+        if os.path.isdir(run_dir) and saved_at < cutoff:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            pruned.append(run_id)
+    if pruned:
+        logger.info(f"Deleted {len(pruned)} runs older than {max_age_days:g} days from {directory}")
+    return pruned
+
+
+def _dump_plan(plan) -> Dict[str, Any]:
+    """The plan as JSON, step results the agents left as message dicts are saved as their text."""
+    dumped = plan.model_dump(mode="json", warnings=False)
+    for step in dumped["steps"]:
+        result = step.get("execution_res")
+        if isinstance(result, dict):
+            step["execution_res"] = result.get("content") or ""
+    return dumped
+
+
+class Checkpointer:
+    """
+    Writes a compact checkpoint of a StateMachine after every node transition, to
+    `<directory>/<run_id>/checkpoint.json`. The file is replaced atomically, so a run
+    killed while writing still has its previous checkpoint.
+
+    Checkpoints hold the next node, the plan with the results of its finished steps,
+    messages, observations, the observation index, the iteration counters and the
+    usage ledger, so a resumed run accounts for the calls made before it. Pages
+    and search results for the coder live next to it in `artifacts/`.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, directory: str = DEFAULT_CHECKPOINT_DIR):
+        self.run_id = run_id or new_run_id()
+        self.run_dir = os.path.join(directory, self.run_id)
+        self.path = os.path.join(self.run_dir, CHECKPOINT_FILE)
+        self.artifacts_dir = os.path.join(self.run_dir, "artifacts")
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def discard(self) -> None:
+        """Delete the run's checkpoint and artifacts, e.g. once it has finished."""
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+
+    def save(self, machine: "StateMachine") -> None:
+        state = machine.state
+        plan = state.get("current_plan")
+        index = state.get("observation_index")
+        artifacts = state.get("artifacts")
+        checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "run_id": self.run_id,
+            "saved_at": time.time(),
+            "query": machine.human_query,
+            "node": machine.current_node.name,
+            "plan_iter": machine.plan_iter,
+            "state": {
+                "messages": state.get("messages", []),
+                "observations": state.get("observations", []),
+                "current_plan": _dump_plan(plan) if plan is not None else None,
+                "report": state.get("report"),
+                "locale": state.get("locale"),
+            },
+            "observation_index": index.dump() if index is not None else [],
+            "artifacts": artifacts.manifest() if artifacts is not None else None,
+            "ledger": machine.ledger.to_dict(),
+        }
+        os.makedirs(self.run_dir, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> Dict[str, Any]:
+        with open(self.path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(
+                f"Checkpoint {self.path} has version {checkpoint.get('version')}, expected {CHECKPOINT_VERSION}"
+            )
+        return checkpoint
+
+    def restore(self, machine: "StateMachine", checkpoint: Optional[Dict[str, Any]] = None) -> None:
+        """Put `machine` back into the state of the checkpoint, ready to run its next node."""
+        from ..prompt.planner_model import Plan
+        from .state_machine import Node
+
+        checkpoint = checkpoint or self.load()
+        saved = checkpoint["state"]
+        state = machine.state
+        state.set("messages", saved["messages"])
+        state.set("observations", saved["observations"])
+        if saved.get("current_plan") is not None:
+            state.set("current_plan", Plan.model_validate(saved["current_plan"]))
+        for key in ("report", "locale"):
+            if saved.get(key) is not None:
+                state.set(key, saved[key])
+        state.get("observation_index").load(checkpoint.get("observation_index", []))
+        if checkpoint.get("artifacts"):
+            state.get("artifacts").load(checkpoint["artifacts"])
+        if checkpoint.get("ledger"):
+            machine.ledger.load(checkpoint["ledger"])
+        machine.plan_iter = checkpoint["plan_iter"]
+        machine.current_node = Node[checkpoint["node"]]
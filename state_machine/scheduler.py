@@ -0,0 +1,125 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Set
+from ..state.state import State
+from ..tracing import in_context
+
+if TYPE_CHECKING:
+    from ..prompt.planner_model import Plan
+
+
+class StepsFailed(Exception):
+    """
+    A step of a parallel batch failed. Carries the first `error` and the `results`
+    of the steps that finished, whose states have already been merged.
+    """
+
+    def __init__(self, error: BaseException, results: Dict[int, Any]):
+        super().__init__(str(error))
+        self.error = error
+        self.results = results
+
+
+class StepScheduler:
+    """
+    Treats the steps of a plan as a dependency graph and runs the steps whose
+    dependencies are satisfied together on a bounded worker pool.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max(1, max_workers)
+
+    @staticmethod
+    def dependencies(plan: "Plan") -> Dict[int, Set[int]]:
+        """
+        0-based indices of the steps each step waits for. Steps without an explicit
+        `depends_on` are independent if they are research steps, while processing
+        steps work on everything gathered before them.
+        """
+        deps = {}
+        for idx, step in enumerate(plan.steps):
+            if step.depends_on is not None:
+                deps[idx] = {
+                    dep - 1
+                    for dep in step.depends_on
+                    if 0 < dep <= len(plan.steps) and dep - 1 != idx
+                }
+            elif step.step_type == "processing":
+                deps[idx] = set(range(idx))
+            else:
+                deps[idx] = set()
+        return deps
+
+    def ready_steps(self, plan: "Plan") -> List[int]:
+        """indices of the pending steps whose dependencies have all been executed"""
+        deps = self.dependencies(plan)
+        pending = [idx for idx, step in enumerate(plan.steps) if not step.execution_res]
+        ready = [
+            idx
+            for idx in pending
+            if all(plan.steps[dep].execution_res for dep in deps[idx])
+        ]
+        # a cyclic or forward-pointing plan must still make progress
+        if pending and not ready:
+            ready = pending[:1]
+        return ready
+
+    def run(
+        self,
+        indices: List[int],
+        execute: Callable[[int, State], Any],
+        state: State,
+    ) -> Dict[int, Any]:
+        """
+        Run `execute(idx, forked_state)` for every index concurrently and merge the
+        forked states back into `state` in plan order. When a step fails, the steps
+        that finished are still merged and StepsFailed is raised with their results.
+        """
+        forks = {idx: state.fork() for idx in indices}
+        workers = min(self.max_workers, len(indices))
+        results, errors = {}, []
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # in the caller's context, so that the steps' spans nest under the node's
+                futures = {idx: pool.submit(in_context(execute), idx, forks[idx]) for idx in indices}
+                for idx, future in futures.items():
+                    try:
+                        results[idx] = future.result()
+                    except Exception as e:
+                        errors.append(e)
+        finally:
+            self._merge(state, forks, results)
+        if errors:
+            raise StepsFailed(errors[0], results) from errors[0]
+        return results
+
+    @staticmethod
+    def _merge(state: State, forks: Dict[int, State], results: Dict[int, Any]) -> None:
+        """Merge the forks of the finished steps into `state`, in plan order."""
+        for idx in sorted(results):
+            state.merge(forks[idx])
+
+    async def arun(
+        self,
+        indices: List[int],
+        execute: Callable[[int, State], Awaitable[Any]],
+        state: State,
+    ) -> Dict[int, Any]:
+        """Async version of `run`: at most `max_workers` steps are awaited at once."""
+        forks = {idx: state.fork() for idx in indices}
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def bounded(idx: int) -> Any:
+            async with semaphore:
+                return await execute(idx, forks[idx])
+
+        results, outputs = {}, []
+        try:
+            outputs = await asyncio.gather(*(bounded(idx) for idx in indices), return_exceptions=True)
+            results = {idx: output for idx, output in zip(indices, outputs) if not isinstance(output, BaseException)}
+        finally:
+            self._merge(state, forks, results)
+        for output in outputs:
+            if isinstance(output, BaseException):
+                raise StepsFailed(output, results) from output
+        return results
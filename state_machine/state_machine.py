@@ -1,11 +1,22 @@
+import asyncio
 from enum import Enum, auto
-from typing import Union
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
 from ..agent.planner import Planner
 from ..state.state import State
 from ..llm.llm import OpenAIClient, AnthropicClient
+from ..llm.context import default_budget
+from ..llm.ledger import UsageLedger, attribute
 from ..agent.researcher import Researcher
 from ..agent.coder import Coder
 from ..agent.reporter import Reporter
+from ..retrieval.index import ObservationIndex
+from ..tools.artifacts import ArtifactStore
+from .. import tracing
+from .scheduler import StepScheduler, StepsFailed
+from .checkpoint import Checkpointer
+
+if TYPE_CHECKING:
+    from ..prompt.planner_model import Step
 
 
 class Node(Enum):
@@ -15,6 +26,7 @@ class Node(Enum):
     RESEARCH_TEAM = auto()
     RESEARCH = auto()
     CODE = auto()
+    PARALLEL = auto()
     REPORTER = auto()
     END = auto()  
 
@@ -25,12 +37,16 @@ class StateMachine:
         self,
         human_query: str,
         llm_client: Union[OpenAIClient, AnthropicClient],
+        max_parallel_steps: int = 4,
+        context_budget: Optional[int] = None,
+        checkpointer: Optional[Checkpointer] = None,
     ):
         self.transitions = {
             Node.PLANNER: [Node.RESEARCH_TEAM, Node.REPORTER],
-            Node.RESEARCH_TEAM: [Node.RESEARCH, Node.CODE],
+            Node.RESEARCH_TEAM: [Node.RESEARCH, Node.CODE, Node.PARALLEL],
             Node.RESEARCH: [Node.RESEARCH_TEAM],
             Node.CODE: [Node.RESEARCH_TEAM],
+            Node.PARALLEL: [Node.RESEARCH_TEAM],
             Node.REPORTER: [Node.END],
             Node.END: [],  
         }
@@ -40,24 +56,54 @@ class StateMachine:
             Node.RESEARCH_TEAM: self._research_team_action,
             Node.RESEARCH: self._research_action,
             Node.CODE: self._code_action,
+            Node.PARALLEL: self._parallel_action,
             Node.REPORTER: self._reporter_action,
         }
 
+        self.async_state_actions = {
+            Node.PLANNER: self._aplanner_action,
+            Node.RESEARCH: self._aresearch_action,
+            Node.CODE: self._acode_action,
+            Node.PARALLEL: self._aparallel_action,
+            Node.REPORTER: self._areporter_action,
+        }
+
         self.current_node = Node.PLANNER
-        self.planner_agent = Planner(llm_client)
-        self.researcher = Researcher(llm_client)
-        self.coder = Coder(llm_client)
-        self.reporter = Reporter(llm_client)
+        # prompt size per call, in tokens, the agents' defaults unless `context_budget` is given
+        self.planner_agent = Planner(llm_client, budget=default_budget("planner", context_budget))
+        self.researcher = Researcher(llm_client, budget=default_budget("researcher", context_budget))
+        self.coder = Coder(llm_client, budget=default_budget("coder", context_budget))
+        self.reporter = Reporter(llm_client, budget=default_budget("reporter", context_budget))
+        self.scheduler = StepScheduler(max_parallel_steps)
 
+        self.human_query = human_query
+        self.checkpointer = checkpointer
+        # tokens and cost of the run's LLM calls
+        self.ledger = UsageLedger()
         messages = [{"role": "user", "content": human_query}]
         self.state = State()
         self.state.set("messages", messages)
+        # observations are indexed as the agents collect them, forks share the index
+        self.state.set("observation_index", ObservationIndex())
+        # search results and crawled pages, handed to the coder as Python objects
+        # checkpointed runs keep them next to the checkpoint, to be available on resume
+        self.state.set(
+            "artifacts",
+            ArtifactStore(checkpointer.artifacts_dir if checkpointer is not None else None),
+        )
         self.max_plan_iters = 2
         self.plan_iter = 0
 
     def _planner_action(self) -> None:
         """Action performed when in PLANNER state."""
         plan = self.planner_agent.plan("", self.state)
+        return self._after_plan(plan)
+
+    async def _aplanner_action(self) -> Node:
+        plan = await self.planner_agent.aplan("", self.state)
+        return self._after_plan(plan)
+
+    def _after_plan(self, plan) -> Node:
         self.plan_iter += 1
         self.state.set("current_plan", plan)
         if self.plan_iter > self.max_plan_iters:
@@ -69,15 +115,17 @@ class StateMachine:
 
     def _research_team_action(self) -> None:
         """
-        Loop through the steps in the current plan and perform the action for each step by delegating to the research agent or code agent
+        Schedule the steps of the current plan: independent steps that are ready run together,
+        a single ready step is delegated to the research agent or code agent
         """
         current_plan = self.state.get("current_plan")
 
         if all(step.execution_res for step in current_plan.steps):
             return Node.REPORTER
-        for step in current_plan.steps:
-            if not step.execution_res:
-                break
+        ready = self.scheduler.ready_steps(current_plan)
+        if len(ready) > 1 and self.scheduler.max_workers > 1:
+            return Node.PARALLEL
+        step = current_plan.steps[ready[0]]
         if step.step_type == "research":
             next_node = Node.RESEARCH
         elif step.step_type == "processing":
@@ -86,28 +134,97 @@ class StateMachine:
             raise ValueError(f"Invalid step type: {step.step_type}")
         return next_node
 
+    def _next_step(self) -> "Step":
+        """The first step of the current plan that is ready to be executed."""
+        current_plan = self.state.get("current_plan")
+        return current_plan.steps[self.scheduler.ready_steps(current_plan)[0]]
+
+    def _step_input(self, step: "Step") -> str:
+        return f"#Task\n\n##title\n\n{step.title}\n\n##description\n\n{step.description}\n\n##locale\n\n{self.state.get('locale', 'en-US')}"
+
+    def _execute_step(self, step: "Step", state: State):
+        """Delegate a step to the code agent or research agent and return its final message."""
+        input = self._step_input(step)
+        with tracing.span("step", "step", title=step.title, step_type=step.step_type), attribute(step=step.title):
+            if step.step_type == "processing":
+                res = self.coder.code(input, state)
+            else:
+                res = self.researcher.research(input, state)
+        return res['messages'][-1]
+
+    async def _aexecute_step(self, step: "Step", state: State):
+        input = self._step_input(step)
+        with tracing.span("step", "step", title=step.title, step_type=step.step_type), attribute(step=step.title):
+            if step.step_type == "processing":
+                res = await self.coder.acode(input, state)
+            else:
+                res = await self.researcher.aresearch(input, state)
+        return res['messages'][-1]
+
     def _research_action(self) -> None:
         """Action performed when in RESEARCH state."""
 
-        current_plan = self.state.get("current_plan")
-        for step in current_plan.steps:
-            if not step.execution_res:
-                break
-        input = f"#Task\n\n##title\n\n{step.title}\n\n##description\n\n{step.description}\n\n##locale\n\n{self.state.get('locale', 'en-US')}"
-        res = self.researcher.research(input, self.state)
-        step.execution_res = res['messages'][-1]
+        step = self._next_step()
+        step.execution_res = self._execute_step(step, self.state)
         return Node.RESEARCH_TEAM
 
     def _code_action(self) -> None:
         """Action performed when in CODE state."""
 
+        step = self._next_step()
+        step.execution_res = self._execute_step(step, self.state)
+        return Node.RESEARCH_TEAM
+
+    def _parallel_action(self) -> None:
+        """Run every ready step concurrently and merge their results into the shared state."""
+
+        current_plan = self.state.get("current_plan")
+        ready = self.scheduler.ready_steps(current_plan)
+        try:
+            results = self.scheduler.run(
+                ready,
+                lambda idx, state: self._execute_step(current_plan.steps[idx], state),
+                self.state,
+            )
+        except StepsFailed as failed:
+            # keep the finished steps, a resumed run only repeats the failed ones
+            self._record_results(current_plan, failed.results)
+            if self.checkpointer is not None:
+                self.checkpointer.save(self)
+            raise failed.error from None
+        self._record_results(current_plan, results)
+        return Node.RESEARCH_TEAM
+
+    @staticmethod
+    def _record_results(plan, results: Dict[int, Any]) -> None:
+        for idx, res in results.items():
+            plan.steps[idx].execution_res = res
+
+    async def _aresearch_action(self) -> Node:
+        step = self._next_step()
+        step.execution_res = await self._aexecute_step(step, self.state)
+        return Node.RESEARCH_TEAM
+
+    async def _acode_action(self) -> Node:
+        step = self._next_step()
+        step.execution_res = await self._aexecute_step(step, self.state)
+        return Node.RESEARCH_TEAM
+
+    async def _aparallel_action(self) -> Node:
         current_plan = self.state.get("current_plan")
-        for step in current_plan.steps:
-            if not step.execution_res:
-                break
-        input = f"#Task\n\n##title\n\n{step.title}\n\n##description\n\n{step.description}\n\n##locale\n\n{self.state.get('locale', 'en-US')}"
-        res = self.coder.code(input, self.state)
-        step.execution_res = res['messages'][-1]
+        ready = self.scheduler.ready_steps(current_plan)
+        try:
+            results = await self.scheduler.arun(
+                ready,
+                lambda idx, state: self._aexecute_step(current_plan.steps[idx], state),
+                self.state,
+            )
+        except StepsFailed as failed:
+            self._record_results(current_plan, failed.results)
+            if self.checkpointer is not None:
+                await asyncio.to_thread(self.checkpointer.save, self)
+            raise failed.error from None
+        self._record_results(current_plan, results)
         return Node.RESEARCH_TEAM
 
     def _reporter_action(self) -> None:
@@ -115,9 +232,30 @@ class StateMachine:
         self.state.set("report", report)
         return Node.END
 
+    async def _areporter_action(self) -> Node:
+        report = await self.reporter.areport(self.state)
+        self.state.set("report", report)
+        return Node.END
+
     def step(self) -> bool:
         return self.state_actions[self.current_node]()
 
+    def _transition(self, next_node: Node) -> None:
+        """Move to `next_node` and checkpoint the work of the node that just completed."""
+        self.current_node = next_node
+        if self.checkpointer is not None:
+            self.checkpointer.save(self)
+
+    async def _atransition(self, next_node: Node) -> None:
+        """`_transition` with the checkpoint written on a worker thread, off the event loop."""
+        self.current_node = next_node
+        if self.checkpointer is not None:
+            await asyncio.to_thread(self.checkpointer.save, self)
+
+    def resume(self, checkpoint: Optional[Dict[str, Any]] = None) -> None:
+        """Restore the last checkpoint, the next run continues after the last completed node."""
+        self.checkpointer.restore(self, checkpoint)
+
     def run_until_end(self) -> None:
         """
         Run the state machine until it reaches the END state or max_steps is reached.
@@ -125,7 +263,28 @@ class StateMachine:
         Args:
             max_steps: Maximum number of steps to prevent infinite loops.
         """
-        while self.current_node != Node.END:
-            next_node = self.step()
-            self.current_node = next_node
-        return self.state.get("report")
\ No newline at end of file
+        with tracing.span("run", "run", query=self.human_query), self.ledger.active():
+            while self.current_node != Node.END:
+                node = self.current_node.name
+                with tracing.span(node, "node"), attribute(node=node):
+                    next_node = self.step()
+                self._transition(next_node)
+        return self.state.get("report")
+
+    async def astep(self) -> Node:
+        action = self.async_state_actions.get(self.current_node)
+        if action is None:
+            return self.state_actions[self.current_node]()
+        return await action()
+
+    async def arun_until_end(self) -> None:
+        """
+        Async version of `run_until_end`, so that many runs can share one event loop.
+        """
+        with tracing.span("run", "run", query=self.human_query), self.ledger.active():
+            while self.current_node != Node.END:
+                node = self.current_node.name
+                with tracing.span(node, "node"), attribute(node=node):
+                    next_node = await self.astep()
+                await self._atransition(next_node)
+        return self.state.get("report")
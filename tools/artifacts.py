@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import weakref
+from typing import Any, Dict, List, Optional
+
+# a markdown pipe table: header row, separator row, body rows
+TABLE = re.compile(r"(?:^\|.*\|[ \t]*\n)(?:^\|[ \t:|-]+\|[ \t]*\n)(?:^\|.*\|[ \t]*(?:\n|$))*", re.MULTILINE)
+
+
+def _cells(row: str) -> List[str]:
+    return [cell.strip() for cell in row.strip().strip("|").split("|")]
+
+
+def parse_markdown_tables(markdown: str) -> List[List[Dict[str, str]]]:
+    """The pipe tables of `markdown` (as written by markdownify) as lists of row records."""
+    tables = []
+    for match in TABLE.finditer(markdown):
+        lines = [line for line in match.group(0).splitlines() if line.strip()]
+        header = [name or f"column_{i}" for i, name in enumerate(_cells(lines[0]))]
+        rows = [dict(zip(header, _cells(line))) for line in lines[2:]]
+        if rows:
+            tables.append(rows)
+    return tables
+
+
+def _numeric(frame):
+    """Convert columns whose cells all read as numbers, e.g. "1,234" or "5.2%", to numbers."""
+    import pandas as pd
+
+    for column in frame.columns:
+        cleaned = frame[column].str.replace(r"[,%$€£\s]", "", regex=True)
+        try:
+            frame[column] = pd.to_numeric(cleaned)
+        except (ValueError, TypeError):
+            continue
+    return frame
+
+
+class ArtifactStore:
+    """
+    Research results of a run kept as files for the coder: search results as JSON
+    lines, crawled pages as markdown and their tables as JSON records.
+
+    The coder's worker processes get only the small manifest and memory-map the
+    files they read, so page text and tables never pass through the LLM or a pipe.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or tempfile.mkdtemp(prefix="remind-artifacts-")
+        os.makedirs(os.path.join(self.directory, "pages"), exist_ok=True)
+        self.searches_path = os.path.join(self.directory, "searches.jsonl")
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        self.version = 0
+        self._lock = threading.Lock()
+        if directory is None:
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, True)
+
+    def add_search(self, query: str, results: List[Dict[str, Any]]) -> None:
+        lines = "".join(
+            json.dumps({"query": query, **result}, ensure_ascii=False) + "\n" for result in results
+        )
+        with self._lock:
+            with open(self.searches_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self.version += 1
+
+    def add_page(self, url: str, markdown: str) -> None:
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+        path = os.path.join(self.directory, "pages", f"{name}.md")
+        tables_path = os.path.join(self.directory, "pages", f"{name}.tables.json")
+        tables = parse_markdown_tables(markdown)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(markdown)
+        with open(tables_path, "w", encoding="utf-8") as f:
+            json.dump(tables, f, ensure_ascii=False)
+        with self._lock:
+            self.pages[url] = {
+                "url": url,
+                "path": path,
+                "tables_path": tables_path,
+                "chars": len(markdown),
+                "tables": len(tables),
+            }
+            self.version += 1
+
+    def load(self, manifest: Dict[str, Any]) -> None:
+        """Take over the artifacts of a `manifest` written to the same directory, e.g. on resume."""
+        with self._lock:
+            for entry in manifest["pages"]:
+                if os.path.exists(entry["path"]):
+                    self.pages[entry["url"]] = entry
+            self.version = max(self.version, manifest["version"]) + 1
+
+    def manifest(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "searches_path": self.searches_path,
+                "pages": list(self.pages.values()),
+                "version": self.version,
+            }
+
+
+class Page:
+    """A crawled page inside the coder's namespace, its files are read on first access."""
+
+    def __init__(self, entry: Dict[str, Any]):
+        self.url = entry["url"]
+        self.chars = entry["chars"]
+        self._path = entry["path"]
+        self._tables_path = entry["tables_path"]
+        self._n_tables = entry["tables"]
+        self._text = None
+        self._tables = None
+        self._buffer = None
+
+    @property
+    def buffer(self):
+        """The page's UTF-8 markdown as a read-only memory map, without copying it. Mapped once, see `close`."""
+        if self._buffer is None:
+            import mmap
+
+            with open(self._path, "rb") as f:
+                if not os.fstat(f.fileno()).st_size:
+                    self._buffer = b""
+                else:
+                    self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._buffer
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            # decoded straight from the mapping, not from a copy of it
+            with memoryview(self.buffer) as view:
+                self._text = str(view, "utf-8")
+        return self._text
+
+    def close(self) -> None:
+        """Unmap the page; `buffer` maps it again when used."""
+        if self._buffer is not None and not isinstance(self._buffer, bytes):
+            self._buffer.close()
+        self._buffer = None
+
+    @property
+    def tables(self) -> list:
+        """The page's tables as pandas DataFrames, or as lists of records without pandas."""
+        if self._tables is None:
+            with open(self._tables_path, encoding="utf-8") as f:
+                records = json.load(f)
+            try:
+                import pandas as pd
+
+                self._tables = [_numeric(pd.DataFrame(rows)) for rows in records]
+            except ImportError:
+                self._tables = records
+        return self._tables
+
+    def __repr__(self) -> str:
+        return f"Page({self.url!r}, {self.chars} chars, {self._n_tables} tables)"
+
+
+class Artifacts:
+    """
+    The `artifacts` object of the coder's namespace:
+
+        artifacts.searches         search results (query, title, url, content, score)
+        artifacts.pages[url].text  full markdown of a crawled page
+        artifacts.pages[url].tables
+        artifacts.summary()
+    """
+
+    def __init__(self, manifest: Dict[str, Any]):
+        self._searches_path = manifest["searches_path"]
+        self.pages = {entry["url"]: Page(entry) for entry in manifest["pages"]}
+        self.version = manifest["version"]
+        self._searches = None
+
+    @property
+    def searches(self):
+        """A DataFrame with one row per search result, or a list of records without pandas."""
+        if self._searches is None:
+            records = []
+            if os.path.exists(self._searches_path):
+                with open(self._searches_path, encoding="utf-8") as f:
+                    records = [json.loads(line) for line in f if line.strip()]
+            try:
+                import pandas as pd
+
+                self._searches = pd.DataFrame(records)
+            except ImportError:
+                self._searches = records
+        return self._searches
+
+    def summary(self) -> str:
+        lines = [f"{len(self.pages)} crawled pages:"]
+        lines += [f"  {page!r}" for page in self.pages.values()]
+        n_searches = len(self.searches)
+        lines.append(f"{n_searches} search results in artifacts.searches")
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return f"Artifacts({len(self.pages)} pages)"
@@ -1,38 +1,136 @@
 # Reference: https://github.com/bytedance/deer-flow/blob/main/src/tools/crawl.py
 from ..crawler.crawler import Crawler
-from .tools import Tool
-from typing import Union, Dict
+from ..crawler.chunker import DEFAULT_CHUNK_TOKENS, DEFAULT_TOP_CHUNKS, chunk_article, rank_chunks, render_chunk
+from ..net.ratelimit import HostRateLimiter
+from .tools import Tool, ToolContext, get_tool_context
+from ..tracing import in_context, span
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Dict, List, Any
+import json
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+MAX_CONCURRENCY = 4
+PER_HOST_INTERVAL = 1.0
+MAX_URLS = 8
+
 class CrawlerTool(Tool):
-    def __init__(self):
-        super().__init__("crawl", "Use this to crawl a url and get a readable content in markdown format.")
+    single_line_input = True
 
-    def __call__(self, url: str) -> str:
-        """Use this to crawl a url and get a readable content in markdown format."""
-        try:
-            crawler = Crawler()
-            article = crawler.crawl(url)
-            return {"url": url, "crawled_content": article.to_markdown()[:1000]}
-        except BaseException as e:
-            error_msg = f"Failed to crawl. Error: {repr(e)}"
-            logger.error(error_msg)
-            return error_msg
-    
-    # According to our tool definition
-    def run(self, input: Union[str, Dict[str, str]]) -> Dict[str, str]:
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENCY,
+        per_host_interval: float = PER_HOST_INTERVAL,
+        chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+        top_chunks: int = DEFAULT_TOP_CHUNKS,
+    ):
+        super().__init__(
+            "crawl",
+            "Use this to crawl one or more urls and get readable content in markdown format. "
+            f'Input is a url, or {{"urls": [...]}} with up to {MAX_URLS} urls to read them all in one call.',
+        )
+        self.crawler = Crawler()
+        # shared by every call, so concurrently running steps respect the same cap
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = HostRateLimiter(per_host_interval)
+        self.chunk_tokens = chunk_tokens
+        self.top_chunks = top_chunks
+
+    def _urls(self, input: Union[str, List[str], Dict[str, Any]]) -> List[str]:
         if isinstance(input, dict):
-            url = input.get("url", "")
+            urls = input.get("urls") or input.get("url", "")
+        elif isinstance(input, str) and input.strip().startswith("["):
+            try:
+                urls = json.loads(input)
+            except json.JSONDecodeError:
+                urls = input
         else:
-            url = input
-        
+            urls = input
+        if isinstance(urls, str):
+            urls = [urls]
+        # keep the order the LLM asked for but fetch every url once
+        return list(dict.fromkeys(url.strip() for url in urls if url and url.strip()))
+
+    def _select(self, url: str, markdown: str, context: ToolContext) -> Dict[str, Any]:
+        """
+        Chunk the whole article and return the chunks most relevant to the agent's task.
+        The other chunks go to the run's observation index, where the reporter can find them,
+        and the whole page to the run's artifacts for the coder.
+        """
+        if context.artifacts is not None:
+            context.artifacts.add_page(url, markdown)
+        chunks = chunk_article(markdown, self.chunk_tokens)
+        selected = rank_chunks(chunks, context.query, self.top_chunks)
+        if context.index is not None:
+            for chunk in chunks:
+                if chunk not in selected:
+                    context.index.add(render_chunk(chunk), source=url)
+        return {
+            "url": url,
+            "crawled_content": "\n\n".join(render_chunk(chunk) for chunk in selected),
+            "chunks": f"{len(selected)} of {len(chunks)}",
+        }
+
+    def _crawl_one(self, url: str, context: ToolContext = None) -> Dict[str, str]:
+        context = context or get_tool_context()
         try:
-            crawler = Crawler()
-            article = crawler.crawl(url)
-            return {"url": url, "crawled_content": article.to_markdown()[:1000]}
+            # the fetch slot is released before extraction, which the crawler's
+            # process pool bounds on its own, and only taken once the host may be
+            # called, so a url waiting for its host does not hold up the others;
+            # pages the crawl cache answers make no request and wait for nothing
+            with span("fetch", "crawl", url=url) as fetch_span:
+                html = self.crawler.cached(url)
+                fetch_span.set(cached=html is not None)
+                if html is None:
+                    self.rate_limiter.wait(url)
+                    with self.slots:
+                        html = self.crawler.fetch(url)
+                fetch_span.set(html_bytes=len(html))
+            with span("extract", "crawl", url=url) as extract_span:
+                markdown = self.crawler.to_markdown(html)
+                extract_span.set(markdown_chars=len(markdown))
+            return self._select(url, markdown, context)
         except BaseException as e:
             error_msg = f"Failed to crawl. Error: {repr(e)}"
             logger.error(error_msg)
-            return {"error": error_msg, "url": url}
\ No newline at end of file
+            return {"error": error_msg, "url": url}
+
+    def _crawl_many(self, urls: List[str]) -> List[Dict[str, str]]:
+        # pool threads do not inherit the caller's context variables
+        context = get_tool_context()
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(urls))) as pool:
+            futures = [pool.submit(in_context(self._crawl_one), url, context) for url in urls]
+            return [future.result() for future in futures]
+
+    def __call__(self, url: Union[str, List[str], Dict[str, Any]]) -> str:
+        """Use this to crawl one or more urls and get readable content in markdown format."""
+        result = self.run(url)
+        if "error" in result:
+            return result["error"]
+        return result
+
+    # According to our tool definition
+    def run(self, input: Union[str, List[str], Dict[str, Any]]) -> Dict[str, Any]:
+        urls = self._urls(input)
+        if not urls:
+            return {"error": "Failed to crawl. Error: no url given", "url": ""}
+        if len(urls) == 1:
+            return self._crawl_one(urls[0])
+        skipped = urls[MAX_URLS:]
+        if skipped:
+            logger.warning(f"Crawling only the first {MAX_URLS} of {len(urls)} urls")
+            urls = urls[:MAX_URLS]
+        results = self._crawl_many(urls)
+        output = {
+            "results": results,
+            "crawled": sum("error" not in result for result in results),
+            "failed": sum("error" in result for result in results),
+        }
+        if skipped:
+            # the model has to know, or it takes the missing pages for read
+            output["skipped"] = skipped
+            output["note"] = f"Only the first {MAX_URLS} urls were crawled, crawl the skipped ones in another call if needed"
+        return output
@@ -1,29 +1,70 @@
-import io
-import sys
-from .tools import Tool
+import threading
+from .artifacts import Artifacts
+from .repl_pool import REPLPool, get_pool
+from .tools import Tool, get_tool_context, in_tool_context, tool_context
 from typing import Union, Dict
 
 
 class PythonREPLTool(Tool):
-    def __init__(self):
+    """
+    Executes code in a worker process of the REPL pool. Each agent run is one session
+    with its own namespace that persists between calls, and is released when the run ends.
+    """
+
+    def __init__(self, pool: REPLPool = None):
         super().__init__("python_repl", "Useful for executing Python code.")
-        self.locals = {}
+        self._pool = pool
+        self._open = set()
+        # artifacts version each session has seen
+        self._versions = {}
+        self._lock = threading.Lock()
 
-    def __call__(self, code_string: str) -> str:
-        output_buffer = io.StringIO()
-        old_stdout = sys.stdout
-        sys.stdout = output_buffer
-
-        try:
-            exec(code_string, {}, self.locals)
-        except Exception as e:
-            output_buffer.write(f"Error: {e}\n")
-        finally:
-            sys.stdout = old_stdout
-
-        output = output_buffer.getvalue()
-        output_buffer.close()
+    @property
+    def pool(self) -> REPLPool:
+        return self._pool or get_pool()
+
+    def _session(self) -> int:
+        """Session key of the calling agent run, released with the run's tool context."""
+        context = get_tool_context()
+        key = id(context)
+        with self._lock:
+            if key not in self._open:
+                self._open.add(key)
+                context.on_close.append(lambda: self._close(key))
+        return key
+
+    def _close(self, key: int) -> None:
+        with self._lock:
+            self._open.discard(key)
+            self._versions.pop(key, None)
+        self.pool.release(key)
+
+    def _share_artifacts(self, key: int) -> None:
+        """Bind the run's research artifacts as `artifacts` in the session, when new ones arrived."""
+        store = get_tool_context().artifacts
+        if store is None:
+            return
+        manifest = store.manifest()
+        if self._versions.get(key) == manifest["version"] and self.pool.has_session(key):
+            return
+        self.pool.set(key, {"artifacts": Artifacts(manifest)})
+        self._versions[key] = manifest["version"]
+
+    def _execute(self, code_string: str) -> str:
+        if not in_tool_context():
+            # outside an agent run each call is a session of its own, released right after
+            with tool_context():
+                return self._execute(code_string)
+        key = self._session()
+        self._share_artifacts(key)
+        result = self.pool.execute(key, code_string)
+        output = result.output
+        if result.error:
+            output += f"Error: {result.error}\n"
         return output
+
+    def __call__(self, code_string: str) -> str:
+        return self._execute(code_string)
     
     # According to our tool definition.
     def run(self, input: Union[str, Dict[str, str]]) -> Dict[str, str]:
@@ -31,18 +72,4 @@ class PythonREPLTool(Tool):
             code_string = input.get("code", "")
         else:
             code_string = input
-        
-        output_buffer = io.StringIO()
-        old_stdout = sys.stdout
-        sys.stdout = output_buffer
-
-        try:
-            exec(code_string, {}, self.locals)
-        except Exception as e:
-            output_buffer.write(f"Error: {e}\n")
-        finally:
-            sys.stdout = old_stdout
-
-        output = output_buffer.getvalue()
-        output_buffer.close()
-        return {"output": output, "code": code_string}
\ No newline at end of file
+        return {"output": self._execute(code_string), "code": code_string}
@@ -0,0 +1,265 @@
+import atexit
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# imported by every worker before it is handed out, so sessions do not pay for them
+PRELOAD = ("numpy", "pandas")
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT = float(os.getenv("REMIND_REPL_TIMEOUT", 30))
+DEFAULT_MEMORY_MB = int(os.getenv("REMIND_REPL_MEMORY_MB", 2048))
+MAX_OUTPUT_CHARS = 10000
+# a worker that does not report ready within this time is considered broken
+START_TIMEOUT = 60.0
+
+
+def _truncate(output: str, limit: int) -> str:
+    if len(output) <= limit:
+        return output
+    return output[:limit] + f"\n... [output truncated, {len(output) - limit} more characters]"
+
+
+def _worker_main(conn, preload: Tuple[str, ...], memory_mb: int, max_output: int) -> None:
+    """Loop of a worker process: execute code in one persistent namespace until told to stop."""
+    import contextlib
+    import importlib
+    import io
+    import traceback
+
+    # BLAS thread pools reserve address space per thread and would eat into the limit
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(variable, "1")
+    if memory_mb:
+        try:
+            import resource
+
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass
+    namespace: Dict[str, Any] = {"__name__": "__main__"}
+    for module in preload:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            continue
+    conn.send({"ready": True})
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message.get("op") == "stop":
+            return
+        if message.get("op") == "set":
+            namespace.update(message.get("values", {}))
+            conn.send({"ok": True})
+            continue
+        buffer = io.StringIO()
+        error = None
+        try:
+            with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+                exec(message["code"], namespace)
+        except MemoryError:
+            error = f"MemoryError: the execution exceeded the {memory_mb} MB memory limit"
+        except BaseException as e:
+            lines = traceback.format_exception_only(type(e), e)
+            error = "".join(lines).strip()
+        try:
+            conn.send({"output": _truncate(buffer.getvalue(), max_output), "error": error})
+        except MemoryError:
+            conn.send({"output": "", "error": "MemoryError: the output could not be sent"})
+
+
+class REPLWorker:
+    """A warm Python process with its own namespace, leased to one coder session at a time."""
+
+    def __init__(self, preload: Tuple[str, ...], memory_mb: int, max_output: int):
+        import multiprocessing
+
+        # spawn, the agent process runs threads that fork would copy in a broken state
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, preload, memory_mb, max_output),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def _wait_ready(self) -> None:
+        if self.ready:
+            return
+        if not self.conn.poll(START_TIMEOUT):
+            raise RuntimeError("Python worker did not start")
+        self.conn.recv()
+        self.ready = True
+
+    def execute(self, code: str, timeout: float) -> Dict[str, Optional[str]]:
+        """Run `code`. Raises TimeoutError, after which the worker must be discarded."""
+        self._wait_ready()
+        self.conn.send({"op": "exec", "code": code})
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"execution timed out after {timeout:g}s")
+        try:
+            return self.conn.recv()
+        except EOFError:
+            self.process.join(timeout=1)
+            raise RuntimeError(f"Python worker died (exit code {self.process.exitcode})")
+
+    def set(self, values: Dict[str, Any]) -> None:
+        """Bind `values` as names in the worker's namespace."""
+        self._wait_ready()
+        self.conn.send({"op": "set", "values": values})
+        self.conn.recv()
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+@dataclass
+class ExecutionResult:
+    output: str
+    error: Optional[str] = None
+
+
+class REPLPool:
+    """
+    Pre-started worker processes for executing LLM-written code in isolation.
+
+    A session leases a worker and keeps its namespace until it is released. Released
+    workers are killed rather than reused, so no state leaks between sessions, and
+    replaced right away to keep `workers` processes warm. Executions that time out or
+    crash their worker get a fresh worker with an empty namespace.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        timeout: float = DEFAULT_TIMEOUT,
+        memory_mb: int = DEFAULT_MEMORY_MB,
+        max_output: int = MAX_OUTPUT_CHARS,
+        preload: Tuple[str, ...] = PRELOAD,
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_output = max_output
+        self.preload = preload
+        self._idle: List[REPLWorker] = []
+        self._sessions: Dict[Any, REPLWorker] = {}
+        self._lock = threading.Lock()
+        self._refill_lock = threading.Lock()
+
+    def _spawn(self) -> REPLWorker:
+        return REPLWorker(self.preload, self.memory_mb, self.max_output)
+
+    def _refill(self) -> None:
+        with self._refill_lock:
+            with self._lock:
+                missing = self.workers - len(self._idle)
+            for _ in range(missing):
+                worker = self._spawn()
+                with self._lock:
+                    self._idle.append(worker)
+
+    def warm(self) -> None:
+        """Start the idle workers now instead of on the first execution."""
+        self._refill()
+
+    def session(self, key: Any) -> REPLWorker:
+        """The worker of session `key`, leased from the idle workers on first use."""
+        with self._lock:
+            worker = self._sessions.pop(key, None)
+            if worker is not None and worker.alive():
+                self._sessions[key] = worker
+                return worker
+            dead, worker = worker, None
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive():
+                    break
+            else:
+                worker = None
+        if dead is not None:
+            dead.kill()
+        if worker is None:
+            worker = self._spawn()
+        with self._lock:
+            self._sessions[key] = worker
+        threading.Thread(target=self._refill, daemon=True).start()
+        return worker
+
+    def has_session(self, key: Any) -> bool:
+        with self._lock:
+            worker = self._sessions.get(key)
+        return worker is not None and worker.alive()
+
+    def execute(self, key: Any, code: str) -> ExecutionResult:
+        worker = self.session(key)
+        try:
+            result = worker.execute(code, self.timeout)
+            return ExecutionResult(result["output"], result["error"])
+        except (TimeoutError, RuntimeError) as e:
+            self.release(key)
+            logger.warning(f"Python worker discarded: {e}")
+            return ExecutionResult("", f"{e}. The interpreter was restarted, all variables are lost.")
+
+    def set(self, key: Any, values: Dict[str, Any]) -> None:
+        self.session(key).set(values)
+
+    def release(self, key: Any) -> None:
+        """End session `key` and kill its worker."""
+        with self._lock:
+            worker = self._sessions.pop(key, None)
+        if worker is not None:
+            worker.kill()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers = self._idle + list(self._sessions.values())
+            self._idle, self._sessions = [], {}
+        for worker in workers:
+            worker.kill()
+
+
+_pool: Optional[REPLPool] = None
+_pool_lock = threading.Lock()
+
+
+def configure(**kwargs: Any) -> REPLPool:
+    """Replace the shared pool with one built from `kwargs`, see REPLPool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = REPLPool(**kwargs)
+        return _pool
+
+
+def get_pool() -> REPLPool:
+    """The process-wide pool, its workers start with the first session."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = REPLPool()
+        return _pool
+
+
+@atexit.register
+def _shutdown() -> None:
+    if _pool is not None:
+        _pool.shutdown()
@@ -21,26 +21,49 @@
 
 import logging
 import os
-from tavily import TavilyClient
-from .tools import Tool
+from .search_cache import SearchCache, get_default_cache
+from .tools import Tool, get_tool_context
 from typing import Union, Dict
 
-from dotenv import load_dotenv
-load_dotenv()
-
 MAX_RESULTS = 2
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
 
 logger = logging.getLogger(__name__)
 
 
-client = TavilyClient(TAVILY_API_KEY)
-
-
 class TavilySearchTool(Tool):
-    def __init__(self):
+    single_line_input = True
+
+    def __init__(self, session=None, cache: SearchCache = None):
         super().__init__("search", "Useful for searching the web for information.")
-        self.client = TavilyClient(TAVILY_API_KEY)
+        self._session = session
+        self.cache = cache if cache is not None else get_default_cache()
+
+    @property
+    def session(self):
+        # resolved on first search, so constructing the tool does not import requests
+        if self._session is None:
+            from ..net.session import get_session
+            self._session = get_session()
+        return self._session
+
+    def search(self, query: str, max_results: int = MAX_RESULTS) -> Dict:
+        """Search through the run-wide cache, so repeated queries reach Tavily only once."""
+        return self.cache.get_or_search(
+            query, lambda: self._search(query, max_results), max_results=max_results
+        )
+
+    def _search(self, query: str, max_results: int = MAX_RESULTS) -> Dict:
+        """Call the Tavily search API over the shared keep-alive session."""
+        api_key = os.getenv("TAVILY_API_KEY")
+        if not api_key:
+            raise RuntimeError("TAVILY_API_KEY is not set, web search is unavailable")
+        # the API key goes per request so it never leaks into the shared session
+        headers = {"Authorization": f"Bearer {api_key}"}
+        payload = {"query": query, "max_results": max_results}
+        response = self.session.post(TAVILY_SEARCH_URL, headers=headers, json=payload)
+        response.raise_for_status()
+        return response.json()
 
     def clean_results(self, response):
         results = response["results"]
@@ -51,14 +74,21 @@ class TavilySearchTool(Tool):
             clean_result["url"] = result["url"]
             clean_result["content"] = result["content"]
             clean_result["score"] = result["score"]
-            if result["raw_content"]:
+            if result.get("raw_content"):
                 clean_result["raw_content"] = result["raw_content"]
             clean_results.append(clean_result)
         return clean_results
 
+    def _record(self, query: str, clean_results) -> None:
+        """Keep the results for the coder, see ArtifactStore."""
+        artifacts = get_tool_context().artifacts
+        if artifacts is not None:
+            artifacts.add_search(query, clean_results)
+
     def __call__(self, query: str) -> str:
-        response = self.client.search(query=query, max_results=MAX_RESULTS)
+        response = self.search(query)
         clean_results = self.clean_results(response)
+        self._record(query, clean_results)
         return ";".join(str(result) for result in clean_results)
     
     # According to our tool definition.
@@ -68,6 +98,7 @@ class TavilySearchTool(Tool):
         else:
             query = input
         
-        response = self.client.search(query=query, max_results=MAX_RESULTS)
+        response = self.search(query)
         clean_results = self.clean_results(response)
+        self._record(query, clean_results)
         return {"results": clean_results, "query": query}
\ No newline at end of file
@@ -0,0 +1,113 @@
+import json
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+from ..cache.sqlite_cache import SQLiteCache
+
+DEFAULT_CACHE_PATH = ".remind_cache/search.sqlite"
+DEFAULT_TTL = 24 * 3600
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace and surrounding quotes so near-identical queries match."""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.strip("\"'` ")
+
+
+class SearchCache:
+    """
+    Cache of search responses keyed by normalized query and canonicalized parameters.
+
+    Identical searches issued concurrently by different steps are coalesced: only the
+    first one reaches the search API and the others wait for its response.
+    `avoided` counts every search that was answered without calling the API.
+    """
+
+    def __init__(self, path: str = ":memory:", ttl: Optional[float] = DEFAULT_TTL):
+        self.store = SQLiteCache(path, ttl=ttl)
+        self.avoided = 0
+        self.searches = 0
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, **params: Any) -> str:
+        return json.dumps(
+            {"query": normalize_query(query), "params": params},
+            sort_keys=True,
+            default=str,
+        )
+
+    def get_or_search(
+        self, query: str, search: Callable[[], Dict], **params: Any
+    ) -> Dict:
+        """Return the cached response for `query`, calling `search()` only on a miss."""
+        key = self.key(query, **params)
+        cached = self.store.get(key)
+        if cached is not None:
+            with self._lock:
+                self.avoided += 1
+            return json.loads(cached)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self.avoided += 1
+        if not owner:
+            return future.result()
+
+        try:
+            # a previous owner may have stored its response and left between the
+            # lookup above and taking ownership
+            cached = self.store.get(key)
+            if cached is not None:
+                response = json.loads(cached)
+                with self._lock:
+                    self.avoided += 1
+                future.set_result(response)
+                return response
+            with self._lock:
+                self.searches += 1
+            response = search()
+            self.store.set(key, json.dumps(response))
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.store.stats()
+        # coalesced searches never hit the store, so count from the API's point of view
+        stats["hits"] = stats["avoided"] = self.avoided
+        stats["misses"] = self.searches
+        lookups = self.avoided + self.searches
+        stats["hit_rate"] = self.avoided / lookups if lookups else 0.0
+        return stats
+
+
+_default_cache: Optional[SearchCache] = None
+_default_lock = threading.Lock()
+
+
+def set_default_cache(cache: Optional[SearchCache]) -> None:
+    """Share `cache` with every TavilySearchTool created without an explicit cache."""
+    global _default_cache
+    with _default_lock:
+        _default_cache = cache
+
+
+def get_default_cache() -> SearchCache:
+    """The cache shared by the tools of this process, in memory unless configured."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SearchCache()
+        return _default_cache
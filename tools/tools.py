@@ -1,8 +1,64 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Union
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Union
+
+if TYPE_CHECKING:
+    from ..retrieval.index import ObservationIndex
+    from .artifacts import ArtifactStore
+
+
+@dataclass
+class ToolContext:
+    """What the agent calling a tool is working on: its task, the run's observation index and artifacts."""
+
+    query: str = ""
+    index: Optional["ObservationIndex"] = None
+    artifacts: Optional["ArtifactStore"] = None
+    # called when the agent run ends, e.g. to release resources a tool holds for it
+    on_close: List[Callable[[], None]] = field(default_factory=list)
+
+
+_tool_context: ContextVar[Optional[ToolContext]] = ContextVar("tool_context", default=None)
+
+
+def get_tool_context() -> ToolContext:
+    """The context of the enclosing `tool_context` block, outside of one a new empty context."""
+    context = _tool_context.get()
+    return context if context is not None else ToolContext()
+
+
+def in_tool_context() -> bool:
+    return _tool_context.get() is not None
+
+
+@contextmanager
+def tool_context(
+    query: str = "",
+    index: Optional["ObservationIndex"] = None,
+    artifacts: Optional["ArtifactStore"] = None,
+) -> Iterator[ToolContext]:
+    """
+    Make `query`, `index` and `artifacts` visible to the tools called in this block. Context
+    variables are per thread and per task, so concurrently running steps do not
+    see each other's context.
+    """
+    context = ToolContext(query, index, artifacts)
+    token = _tool_context.set(context)
+    try:
+        yield context
+    finally:
+        _tool_context.reset(token)
+        for callback in context.on_close:
+            callback()
 
 
 class Tool(ABC):
+    # whether the tool's plain-text input is always a single line, e.g. a query or a
+    # url; the agent can then stop reading the model's turn at the end of that line
+    single_line_input = False
+
     def __init__(self, tool_name : str, tool_description : str):
         self.name = tool_name
         self.description = tool_description
@@ -0,0 +1,4 @@
+from .tracer import Span, Tracer, enable, disable, get_tracer, current_span, span, start_span, traced_iter, atraced_iter, in_context
+from .export import to_chrome_trace, to_otlp, write_chrome_trace, write_otlp
+
+__all__ = ['Span', 'Tracer', 'enable', 'disable', 'get_tracer', 'current_span', 'span', 'start_span', 'traced_iter', 'atraced_iter', 'in_context', 'to_chrome_trace', 'to_otlp', 'write_chrome_trace', 'write_otlp']
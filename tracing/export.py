@@ -0,0 +1,97 @@
+import json
+import os
+from typing import Any, Dict, List
+
+from .tracer import Span, Tracer
+
+
+def _value(value: Any) -> Any:
+    return value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+
+
+def to_chrome_trace(tracer: Tracer) -> Dict[str, Any]:
+    """
+    The spans as Chrome trace events (complete events in microseconds), which
+    chrome://tracing and https://ui.perfetto.dev open directly.
+    """
+    pid = os.getpid()
+    spans = list(tracer.spans)
+    origin = min((span.start_ns for span in spans), default=0)
+    events: List[Dict[str, Any]] = [
+        {"ph": "M", "name": "process_name", "pid": pid, "tid": 0, "args": {"name": tracer.service_name}}
+    ]
+    events += [
+        {"ph": "M", "name": "thread_name", "pid": pid, "tid": lane, "args": {"name": name}}
+        for lane, name in tracer.lane_names.items()
+    ]
+    for span in sorted(spans, key=lambda span: span.start_ns):
+        events.append({
+            "ph": "X",
+            "name": span.name,
+            "cat": span.category,
+            "ts": (span.start_ns - origin) / 1000,
+            "dur": (span.end_ns - span.start_ns) / 1000,
+            "pid": pid,
+            "tid": span.lane,
+            "args": {key: _value(value) for key, value in span.attributes.items()},
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"dropped_spans": tracer.dropped}}
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        # int64 values are strings in OTLP/JSON
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    record = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        # SPAN_KIND_CLIENT for calls to other services, SPAN_KIND_INTERNAL otherwise
+        "kind": 3 if span.category in ("llm", "tool") else 1,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [_attribute("remind.category", span.category)]
+        + [_attribute(key, value) for key, value in span.attributes.items() if key != "error"],
+        "status": {"code": 2, "message": span.attributes["error"]} if "error" in span.attributes else {"code": 1},
+    }
+    if span.parent_id:
+        record["parentSpanId"] = span.parent_id
+    return record
+
+
+def to_otlp(tracer: Tracer) -> Dict[str, Any]:
+    """The spans as an OTLP/JSON ExportTraceServiceRequest, e.g. for an OpenTelemetry collector."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", tracer.service_name)]},
+            "scopeSpans": [{
+                "scope": {"name": "ReMind.tracing"},
+                "spans": [_otlp_span(span) for span in list(tracer.spans)],
+            }],
+        }]
+    }
+
+
+def _write(path: str, payload: Dict[str, Any]) -> str:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    return path
+
+
+def write_chrome_trace(tracer: Tracer, path: str) -> str:
+    return _write(path, to_chrome_trace(tracer))
+
+
+def write_otlp(tracer: Tracer, path: str) -> str:
+    return _write(path, to_otlp(tracer))
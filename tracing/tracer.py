@@ -0,0 +1,238 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+# spans kept per tracer, later ones are counted but dropped
+MAX_SPANS = 200000
+
+
+class Span:
+    """A timed operation with attributes; `set` adds attributes until the span ends."""
+
+    __slots__ = (
+        "name", "category", "attributes", "trace_id", "span_id", "parent_id",
+        "lane", "start_ns", "end_ns", "_start_perf", "_tracer", "_token",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self._tracer = tracer
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.lane = tracer.lane()
+        # wall clock for exports, a monotonic clock for the duration
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._start_perf = time.perf_counter_ns()
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = self.start_ns + time.perf_counter_ns() - self._start_perf
+            self._tracer.record(self)
+
+    @property
+    def duration(self) -> float:
+        """Seconds, up to now for spans that have not ended."""
+        end = self.end_ns if self.end_ns is not None else self.start_ns + time.perf_counter_ns() - self._start_perf
+        return (end - self.start_ns) / 1e9
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        _current.reset(self._token)
+        self.end()
+
+
+class _NoopSpan:
+    """Stands in for spans while tracing is disabled."""
+
+    attributes: Dict[str, Any] = {}
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Collects the finished spans of a process, see `enable`."""
+
+    def __init__(self, service_name: str = "remind", max_spans: int = MAX_SPANS):
+        self.service_name = service_name
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.lanes: Dict[Any, int] = {}
+        self.lane_names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def lane(self) -> int:
+        """
+        Small id of the thread, or of the asyncio task, the span runs on. Concurrent
+        tasks on one event loop get their own lanes so that their spans nest.
+        """
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = ("task", id(task)) if task is not None else ("thread", threading.get_ident())
+        with self._lock:
+            lane = self.lanes.get(key)
+            if lane is None:
+                lane = self.lanes[key] = len(self.lanes) + 1
+                self.lane_names[lane] = task.get_name() if task is not None else threading.current_thread().name
+            return lane
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Count and total seconds of the finished spans, by category and name."""
+        totals: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(lambda: defaultdict(lambda: {"count": 0, "seconds": 0.0}))
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            entry = totals[span.category][span.name]
+            entry["count"] += 1
+            entry["seconds"] += span.duration
+        return {category: dict(names) for category, names in totals.items()}
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable(service_name: str = "remind") -> Tracer:
+    """Start collecting spans in a new tracer."""
+    global _tracer
+    _tracer = Tracer(service_name)
+    return _tracer
+
+
+def disable() -> None:
+    global _tracer
+    _tracer = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def current_span() -> Optional[Span]:
+    return _current.get() if _tracer is not None else None
+
+
+def span(name: str, category: str = "function", **attributes: Any):
+    """
+    A span for a `with` block, the parent of the spans started inside it:
+
+        with span("crawl", "tool", url=url) as s:
+            ...
+            s.set(chars=len(markdown))
+
+    A shared no-op object while tracing is disabled.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return Span(tracer, name, category, _current.get(), attributes)
+
+
+def start_span(name: str, category: str = "function", **attributes: Any):
+    """A span that is not made current, for work that spans generator resumptions. Call `end`."""
+    return span(name, category, **attributes)
+
+
+def traced_iter(current: Span, iterator: Iterator[Any]) -> Iterator[Any]:
+    """
+    Iterate `iterator` with `current` as the current span while it runs, but not while
+    the consumer handles the items, and end the span with the iteration.
+    """
+    if current is NOOP_SPAN:
+        yield from iterator
+        return
+    try:
+        while True:
+            token = _current.set(current)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _current.reset(token)
+            yield item
+    finally:
+        # streams report their usage as they close
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            token = _current.set(current)
+            try:
+                close()
+            finally:
+                _current.reset(token)
+        current.end()
+
+
+async def atraced_iter(current: Span, iterator: AsyncIterator[Any]) -> AsyncIterator[Any]:
+    """Async counterpart of `traced_iter`."""
+    if current is NOOP_SPAN:
+        async for item in iterator:
+            yield item
+        return
+    try:
+        while True:
+            token = _current.set(current)
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                _current.reset(token)
+            yield item
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            token = _current.set(current)
+            try:
+                await aclose()
+            finally:
+                _current.reset(token)
+        current.end()
+
+
+def in_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    `fn` bound to a copy of the caller's context, to run on a pool thread: spans started
+    there keep their parent. Wrap once per submission, a context runs on one thread.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)